@@ -0,0 +1,261 @@
+"""
+Latency and throughput benchmark for the /api/auth endpoints.
+
+The FastAPI app is driven in-process through httpx.ASGITransport against
+a real database (SQLite by default, any DATABASE_URL works), Kafka is
+replaced with a stub that acknowledges immediately. Every endpoint is run
+as a separate phase, so queries per request are exact.
+
+    python benchmarks/auth_endpoints.py --users 200 --concurrency 20
+    python benchmarks/auth_endpoints.py --compare benchmarks/results/<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+sys.path.insert(0, str(ROOT / "src"))
+
+# Настройки читают окружение при импорте
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{RESULTS_DIR / 'benchmark.db'}")
+# Все запросы бенчмарка идут с одного адреса
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+class StubKafkaProducer:
+    """
+    AIOKafkaProducer replacement, every send is acknowledged at once.
+    """
+
+    def __init__(self):
+        self.sent = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def send(self, topic, value=None, key=None, **kwargs):
+        self.sent += 1
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+class QueryCounter:
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        for engine in engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(values: list[float], percent: float) -> float:
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_phase(name: str, requests: list, concurrency: int, queries: QueryCounter) -> dict:
+    """
+    Run the request coroutine factories with at most `concurrency` in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def timed(request):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before = queries.count
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(request) for request in requests))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": name,
+        "requests": len(requests),
+        "errors": errors,
+        "rps": round(len(requests) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "queries_per_request": round((queries.count - queries_before) / len(requests), 2),
+    }
+
+
+async def run(users: int, concurrency: int) -> list[dict]:
+    import httpx
+    from sqlalchemy import select
+
+    from infrastructure.broker.producer import BrokerProducer
+    from infrastructure.container import get_container
+    from infrastructure.models import EmailVerification as EmailVerificationModel
+    from infrastructure.postgres_db import Base
+    from infrastructure.repositories import BannedRefreshTokenRepository, revocation_cache
+    from interface.main import app
+
+    container = get_container()
+    container.broker_producer = BrokerProducer(producer=StubKafkaProducer(), topic="email_notifications")
+    database = container.database
+
+    async with database.engine.begin() as connection:
+        # Чужую базу не очищаем, пользователи каждого запуска уникальны
+        if database.engine.dialect.name == "sqlite":
+            await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with database.session_factory() as session:
+        await revocation_cache.load(BannedRefreshTokenRepository(session))
+
+    queries = QueryCounter([database.engine, *database.replica_engines])
+    run_id = int(time.time())
+    credentials = [
+        {"email": f"bench-{run_id}-{index}@example.com", "password": f"Password{index}"}
+        for index in range(users)
+    ]
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark/api/auth") as client:
+
+        results.append(await run_phase(
+            "register",
+            [
+                lambda body=body: client.post("/register", json={**body, "name": "Bench", "surname": "Mark"})
+                for body in credentials
+            ],
+            concurrency, queries,
+        ))
+
+        async with database.session_factory() as session:
+            codes = dict(
+                (await session.execute(select(EmailVerificationModel.email, EmailVerificationModel.code))).all()
+            )
+
+        results.append(await run_phase(
+            "verify",
+            [lambda body=body: client.get(f"/verify/{body['email']}/{codes[body['email']]}") for body in credentials],
+            concurrency, queries,
+        ))
+
+        refresh_tokens = []
+
+        async def login(body):
+            response = await client.post("/login", json=body)
+            refresh_tokens.append(response.cookies.get("refresh_token"))
+            return response
+
+        results.append(await run_phase(
+            "login", [lambda body=body: login(body) for body in credentials], concurrency, queries,
+        ))
+
+        new_refresh_tokens = []
+
+        async def refresh(token):
+            response = await client.get("/refresh", headers={"Cookie": f"refresh_token={token}"})
+            new_refresh_tokens.append(response.cookies.get("refresh_token"))
+            return response
+
+        results.append(await run_phase(
+            "refresh", [lambda token=token: refresh(token) for token in refresh_tokens], concurrency, queries,
+        ))
+
+        results.append(await run_phase(
+            "logout",
+            [
+                lambda token=token: client.get("/logout", headers={"Cookie": f"refresh_token={token}"})
+                for token in new_refresh_tokens
+            ],
+            concurrency, queries,
+        ))
+
+    await container.close()
+
+    return results
+
+
+def git_revision() -> str:
+
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: list[dict], baseline: dict | None = None) -> None:
+
+    columns = ["endpoint", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request"]
+    print(" ".join(f"{column:>20}" for column in columns))
+
+    for result in results:
+        row = []
+        for column in columns:
+            value = result[column]
+            previous = (baseline or {}).get(result["endpoint"], {}).get(column)
+            if previous and column not in ("endpoint", "requests"):
+                value = f"{value} ({(result[column] - previous) / previous:+.0%})"
+            row.append(f"{value!s:>20}")
+        print(" ".join(row))
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", type=Path, default=None, help="results JSON, defaults to benchmarks/results/<revision>.json")
+    parser.add_argument("--compare", type=Path, default=None, help="results JSON of a previous run")
+    args = parser.parse_args()
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    results = asyncio.run(run(args.users, args.concurrency))
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "database": os.environ["DATABASE_URL"].split("://")[0],
+        "results": results,
+    }
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        baseline = {result["endpoint"]: result for result in previous["results"]}
+
+    print_results(results, baseline)
+
+    output = args.output or RESULTS_DIR / f"{report['revision']}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
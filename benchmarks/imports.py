@@ -0,0 +1,132 @@
+"""
+Import time of the application modules. Every run is a fresh interpreter,
+so nothing is cached in sys.modules. Also reports the heaviest packages
+from `python -X importtime` and which client libraries got imported.
+
+    python benchmarks/imports.py
+    python benchmarks/imports.py --runs 20 --module worker --top 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Клиентские библиотеки, которые не должны загружаться при импорте приложения
+CLIENT_LIBRARIES = ("aiokafka", "aiosmtplib", "asyncpg", "aiosqlite")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def environment() -> dict:
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(ROOT / "src")
+    env.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{RESULTS_DIR / 'benchmark.db'}")
+    return env
+
+
+def measure(module: str, runs: int) -> dict:
+
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", PROBE.format(module=module)], cwd=ROOT, env=environment(), text=True
+        )
+        probe = json.loads(output.strip().splitlines()[-1])
+        timings.append(probe["seconds"])
+
+    timings.sort()
+    return {
+        "runs": runs,
+        "mean_ms": round(statistics.mean(timings) * 1000, 1),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 1),
+        "min_ms": round(timings[0] * 1000, 1),
+        "client_libraries": [
+            library for library in CLIENT_LIBRARIES if library in probe["modules"]
+        ],
+    }
+
+
+def heaviest_modules(module: str, top: int) -> list[dict]:
+    """
+    Top-level packages by their own import time summed over all submodules,
+    from one -X importtime run.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=environment(), text=True, capture_output=True, check=True,
+    )
+
+    packages: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_time, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+
+    return [
+        {"package": package, "self_ms": round(microseconds / 1000, 1)}
+        for package, microseconds in sorted(packages.items(), key=lambda item: -item[1])[:top]
+    ]
+
+
+def git_revision() -> str:
+
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", nargs="+", default=["interface.main", "worker"], help="modules to import")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=15, help="heaviest packages to show")
+    parser.add_argument("--output", type=Path, default=None, help="results JSON, defaults to benchmarks/results/imports-<revision>.json")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.module:
+        result = {"module": module, **measure(module, args.runs), "heaviest": heaviest_modules(module, args.top)}
+        results.append(result)
+
+        print(f"import {module}: mean {result['mean_ms']} ms, p50 {result['p50_ms']} ms, min {result['min_ms']} ms")
+        print(f"  client libraries imported: {', '.join(result['client_libraries']) or 'none'}")
+        for entry in result["heaviest"]:
+            print(f"  {entry['package']:<30} {entry['self_ms']:>10} ms")
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+    output = args.output or RESULTS_DIR / f"imports-{report['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
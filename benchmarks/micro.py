@@ -0,0 +1,241 @@
+"""
+Micro-benchmarks of the CPU hot spots: JWT encode/decode per algorithm,
+password hashing at different cost factors and the repository row to
+entity conversion. Runs offline, no database or broker is needed.
+
+    python benchmarks/micro.py
+    python benchmarks/micro.py --bcrypt-rounds 10 11 12 13 --budget-ms 250
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def measure(function, repeat: int) -> dict:
+    """
+    Call `function` `repeat` times, one warm-up call is not counted.
+    """
+    function()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    return {
+        "calls": repeat,
+        "mean_us": round(statistics.mean(timings) * 1e6, 1),
+        "p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+        "p99_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6, 1),
+        "ops_per_sec": round(1 / statistics.mean(timings), 1),
+    }
+
+
+def jwt_keys() -> dict[str, tuple]:
+    """
+    Signing and verification key per algorithm, generated in memory.
+    """
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    secret = os.urandom(32)
+
+    return {
+        "HS256": (secret, secret),
+        "RS256": (rsa_key, rsa_key.public_key()),
+        "ES256": (ec_key, ec_key.public_key()),
+        "EdDSA": (ed_key, ed_key.public_key()),
+    }
+
+
+def bench_jwt(repeat: int) -> list[dict]:
+    import jwt
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": str(uuid4()),
+        "active": True,
+        "type": "access",
+        "iat": now,
+        "exp": now + timedelta(minutes=30),
+    }
+
+    results = []
+    for algorithm, (signing_key, verifying_key) in jwt_keys().items():
+        token = jwt.encode(payload, signing_key, algorithm=algorithm)
+
+        results.append({
+            "name": f"jwt.encode {algorithm}",
+            **measure(lambda: jwt.encode(payload, signing_key, algorithm=algorithm), repeat),
+        })
+        results.append({
+            "name": f"jwt.decode {algorithm}",
+            **measure(lambda: jwt.decode(token, verifying_key, algorithms=[algorithm]), repeat),
+        })
+
+    return results
+
+
+def bench_tokens(repeat: int) -> list[dict]:
+    """
+    Token creation and decoding as the service does it, with the configured key ring.
+    """
+    from core.services.auth import AuthService
+    from core.services.tokens import decode_access_token, decode_token, key_ring
+
+    service = AuthService(auth_repository=None, banned_refresh_token_repository=None)
+    data = {"sub": str(uuid4()), "active": True}
+    access_token = service.create_access_token(data).token
+
+    return [
+        {
+            "name": "AuthService.create_access_token",
+            **measure(lambda: service.create_access_token(data), repeat),
+        },
+        {
+            "name": "AuthService.create_refresh_token",
+            **measure(lambda: service.create_refresh_token({**data, "jti": str(uuid4())}), repeat),
+        },
+        {"name": "key_ring.decode (uncached)", **measure(lambda: key_ring.decode(access_token), repeat)},
+        {"name": "decode_token (payload cache)", **measure(lambda: decode_token(access_token), repeat)},
+        {
+            "name": "decode_access_token (payload cache)",
+            **measure(lambda: decode_access_token(access_token), repeat),
+        },
+    ]
+
+
+def bench_passwords(rounds: list[int], repeat: int) -> list[dict]:
+    from passlib.context import CryptContext
+
+    password = "Password123"
+    contexts = {
+        f"bcrypt rounds={cost}": CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost)
+        for cost in rounds
+    }
+
+    try:
+        import argon2  # noqa: F401
+
+        contexts["argon2 (passlib defaults)"] = CryptContext(schemes=["argon2"])
+    except ImportError:
+        print("argon2-cffi is not installed, argon2 is skipped")
+
+    results = []
+    for name, context in contexts.items():
+        hashed = context.hash(password)
+
+        results.append({"name": f"hash {name}", **measure(lambda: context.hash(password), repeat)})
+        results.append({
+            "name": f"verify {name}",
+            **measure(lambda: context.verify(password, hashed), repeat),
+        })
+
+    return results
+
+
+def bench_to_user(repeat: int) -> list[dict]:
+    from infrastructure.models import User as UserModel
+    from infrastructure.repositories import AuthRepository
+
+    repository = AuthRepository(session=None)
+    now = datetime.utcnow()
+    values = dict(
+        id=uuid4(),
+        email="user@example.com",
+        password="$2b$12$" + "x" * 53,
+        name="Name",
+        surname="Surname",
+        is_active=True,
+        created_at=now,
+        updated_at=now,
+        timezone="Europe/Moscow",
+        image=None,
+    )
+    Row = namedtuple("Row", values)
+    row = Row(**values)
+    model = UserModel(**values)
+
+    return [
+        {"name": "_to_user from Core row", **measure(lambda: repository._to_user(row), repeat)},
+        {"name": "_to_user from ORM model", **measure(lambda: repository._to_user(model), repeat)},
+    ]
+
+
+def git_revision() -> str:
+
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per JWT and conversion benchmark")
+    parser.add_argument("--hash-repeat", type=int, default=5, help="calls per password hashing benchmark")
+    parser.add_argument("--bcrypt-rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--budget-ms", type=float, default=None, help="login latency budget for password verification")
+    parser.add_argument("--output", type=Path, default=None, help="results JSON, defaults to benchmarks/results/micro-<revision>.json")
+    args = parser.parse_args()
+
+    results = [
+        *bench_jwt(args.repeat),
+        *bench_tokens(args.repeat),
+        *bench_to_user(args.repeat),
+        *bench_passwords(args.bcrypt_rounds, args.hash_repeat),
+    ]
+
+    print(f"{'benchmark':<40} {'mean_us':>12} {'p50_us':>12} {'p99_us':>12} {'ops_per_sec':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<40} {result['mean_us']:>12} {result['p50_us']:>12} "
+            f"{result['p99_us']:>12} {result['ops_per_sec']:>12}"
+        )
+
+    if args.budget_ms is not None:
+        # Login проверяет пароль один раз, берем самую дорогую стоимость в пределах бюджета
+        fitting = [
+            cost for cost in args.bcrypt_rounds
+            if next(r for r in results if r["name"] == f"verify bcrypt rounds={cost}")["p99_us"] / 1000 <= args.budget_ms
+        ]
+        if fitting:
+            print(f"\nPASSWORD_BCRYPT_ROUNDS={max(fitting)} fits the {args.budget_ms} ms budget")
+        else:
+            print(f"\nNo measured bcrypt cost fits the {args.budget_ms} ms budget")
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+    output = args.output or RESULTS_DIR / f"micro-{report['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
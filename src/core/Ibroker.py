@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from core.entities import EmailMessage
 
@@ -5,7 +6,39 @@ from core.entities import EmailMessage
 class IBrokerProducer(ABC):
 
     @abstractmethod
-    async def send_email(self, email_message: EmailMessage) -> None:
+    async def send_email(self, email_message: EmailMessage) -> asyncio.Future:
+        """
+        Enqueue an email, the returned future resolves on broker acknowledgement.
+        """
 
+        raise NotImplementedError
 
-        raise NotImplementedError
\ No newline at end of file
+    @abstractmethod
+    async def send_many(self, email_messages: list[EmailMessage]) -> list[asyncio.Future]:
+        """
+        Enqueue a batch of emails, one delivery future per message.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def send_event(self, topic: str, payload: dict) -> asyncio.Future:
+        """
+        Enqueue an event, the returned future resolves on broker acknowledgement.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def send_raw(
+        self,
+        topic: str,
+        value: bytes,
+        key: bytes | None = None,
+        headers: list[tuple[str, bytes]] | None = None,
+    ) -> asyncio.Future:
+        """
+        Enqueue an already encoded message, the returned future resolves on broker acknowledgement.
+        """
+
+        raise NotImplementedError
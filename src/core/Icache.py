@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class ICacheBackend(ABC):
+    """
+    Key-value store shared by the repositories of a worker
+    or, for an external store, by all workers.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        """
+        Return the cached value or None.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """
+        Store a value, ttl in seconds overrides the default time to live.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self) -> None:
+
+        raise NotImplementedError
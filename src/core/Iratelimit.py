@@ -0,0 +1,17 @@
+from abc import ABC, abstractmethod
+
+
+class IRateLimitBackend(ABC):
+    """
+    Request counters shared by the rate limiters of a worker
+    or, for an external store, by all workers.
+    """
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: int, period: float) -> float:
+        """
+        Count a request for key, at most `limit` requests are allowed per `period` seconds.
+        Returns 0 if the request is allowed, otherwise seconds until the next one will be.
+        """
+
+        raise NotImplementedError
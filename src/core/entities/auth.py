@@ -64,5 +64,6 @@ class BannedRefreshToken:
     """
 
     jti: str
+    expires_at: datetime | None = field(default=None)
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
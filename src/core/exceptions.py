@@ -37,4 +37,10 @@ class InvalidTokenError(Exception):
 class InvalidRequestError(Exception):
     """Invalid request."""
 
+    pass
+
+
+class ServiceUnavailableError(Exception):
+    """Service is temporarily overloaded."""
+
     pass
\ No newline at end of file
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator
 from uuid import UUID
 from core.entities import User
 from core.entities.auth import EmailVerification
@@ -16,6 +18,16 @@ class IAuthRepository(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def create_user_with_verification(
+        self, user: User, email_verification: EmailVerification
+    ) -> tuple[User, EmailVerification]:
+        """
+        Create a user together with its email verification in one transaction.
+        Raises DuplicateEntryError if the email is taken.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def get_user(self, **fields) -> User:
         """
@@ -35,10 +47,39 @@ class IAuthRepository(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_user_by_id(self, user_id: UUID) -> User | None:
+        """
+        Get a user by id.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_user_by_email(self, email: str) -> User | None:
+        """
+        Get a user by email, the comparison is case-insensitive.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_user_emails(self) -> AsyncIterator[str]:
+        """
+        Iterate over the email of every user.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def user_exists(self, user_id: UUID, active_only: bool = False) -> bool:
+        """
+        Check a user with this id exists, with active_only it also has to be active.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def update_user(self, user: User) -> User:
         """
-        Update an existing user.
+        Update an existing user by id.
+        Raises NotFoundError if there is no such user.
         """
         raise NotImplementedError
     
@@ -63,9 +104,17 @@ class IBannedRefreshTokenRepository(ABC):
     """
 
     @abstractmethod
-    async def create_banned_refresh_token(self, jti: UUID) -> None:
+    async def create_banned_refresh_token(self, jti: UUID, expires_at: datetime | None = None) -> None:
         """
         Create a new banned refresh token.
+        expires_at is the exp of the token, after it the row can be deleted.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_banned_refresh_token(self, jti: UUID) -> None:
+        """
+        Remove a ban, used when it could not be announced to other workers.
         """
         raise NotImplementedError
 
@@ -74,4 +123,19 @@ class IBannedRefreshTokenRepository(ABC):
         """
         Check if a refresh token is banned.
         """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_banned_jtis(self) -> AsyncIterator[str]:
+        """
+        Iterate over the jti of every banned refresh token that is not expired.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_expired_banned_refresh_tokens(self, batch_size: int) -> int:
+        """
+        Delete at most batch_size expired banned refresh tokens.
+        Returns the number of deleted rows.
+        """
         raise NotImplementedError
\ No newline at end of file
@@ -1,8 +1,11 @@
 from .auth import AuthService
 from .mail import MailService
+from .password import PasswordHasher, get_password_hasher
 
 
 __all__ = [
   "AuthService", 
-  "MailService"
+  "MailService",
+  "PasswordHasher",
+  "get_password_hasher",
 ]
\ No newline at end of file
@@ -1,7 +1,6 @@
 import jwt
 from dataclasses import dataclass
 from uuid import UUID, uuid4
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 
 from core.entities import User, AccessToken, RefreshToken, Token
@@ -10,6 +9,8 @@ from core.interfaceRepositories import (
     IAuthRepository, 
     IBannedRefreshTokenRepository,
 )
+from core.services.password import PasswordHasher, get_password_hasher
+from core.services.tokens import decode_access_token, decode_token, encode_token, token_cutoffs
 from core.exceptions import (
     DuplicateEntryError,
     NotFoundError,
@@ -27,11 +28,12 @@ class AuthService:
         self,
         auth_repository: IAuthRepository,
         banned_refresh_token_repository: IBannedRefreshTokenRepository,
+        password_hasher: PasswordHasher | None = None,
     ):
         
         self.auth_repository = auth_repository
         self.banned_refresh_token_repository = banned_refresh_token_repository
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.password_hasher = password_hasher or get_password_hasher()
 
 
     async def create_user(self, user: User) -> User:
@@ -39,14 +41,29 @@ class AuthService:
         Create a new user.
         """
 
-        if await self.auth_repository.get_user(email=user.email):
-            raise DuplicateEntryError("User with this email already exists")
-        
-        user.password = self.pwd_context.hash(user.password)
+        # Уникальность email проверяет ограничение в базе, DuplicateEntryError поднимает репозиторий
+        user.password = await self.password_hasher.hash(user.password)
 
         return await self.auth_repository.create_user(user)
 
 
+    async def register(self, user: User) -> tuple[User, EmailVerification]:
+        """
+        Create a new user with its email verification code in one transaction.
+        """
+
+        user.password = await self.password_hasher.hash(user.password)
+
+        email_verification = EmailVerification(
+            code=uuid4(),
+            email=user.email
+        )
+
+        return await self.auth_repository.create_user_with_verification(
+            user=user, email_verification=email_verification
+        )
+
+
     async def get_user(self, **fields) -> User:
         """
         Get a user by some fields.
@@ -69,17 +86,27 @@ class AuthService:
         return user
 
 
+    async def get_user_by_email(self, email: str) -> User | None:
+        """
+        Get a user by email, case-insensitive.
+        """
+
+        return await self.auth_repository.get_user_by_email(email)
+
+
     async def update_user(self, user: User) -> User:
         """
         Update an existing user.
         """
 
-        if not self.auth_repository.get_user(id=user.id):
-            raise NotFoundError("User not found")
-        
-        user.password = self.pwd_context.hash(user.password)
+        user.password = await self.password_hasher.hash(user.password)
+
+        updated_user = await self.auth_repository.update_user(user)
+
+        # Выданные ранее access токены больше не действительны
+        await token_cutoffs.revoke(str(user.id))
 
-        return await self.auth_repository.update_user(user)
+        return updated_user
 
 
     async def login(self, email: str, password: str) -> Token:
@@ -87,19 +114,21 @@ class AuthService:
         Login a user.
         """
 
-        user = await self.get_user(email=email)
+        user = await self.auth_repository.get_user_by_email(email)
 
         if not user:
-            raise NotFoundError("User not found")
+            # Столько же работы, сколько для неверного пароля, и та же ошибка
+            await self.password_hasher.verify_dummy(password)
+            raise NotFoundError("Invalid email or password")
         
-        if not self.pwd_context.verify(password, user.password):
+        if not await self.password_hasher.verify(password, user.password):
             raise NotFoundError("Invalid email or password")
         
         if not user.is_active:
             raise InvalidCredentialsError("User email is not verified! Check email!")
         
         access_token = self.create_access_token(
-            {"sub": str(user.id)}
+            {"sub": str(user.id), "active": user.is_active}
         )
         refresh_token = self.create_refresh_token(
             {"sub": str(user.id), "jti": str(uuid4())}
@@ -116,16 +145,18 @@ class AuthService:
         Logout a user.
         """
 
-        payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
-        )
+        payload = decode_token(token)
         jti: str = payload.get("jti")
 
-        banned_token = (
-            await self.banned_refresh_token_repository.create_banned_refresh_token(
-                jti=jti
+        try:
+            banned_token = (
+                await self.banned_refresh_token_repository.create_banned_refresh_token(
+                    jti=jti, expires_at=self._token_expires_at(payload)
+                )
             )
-        )
+        except DuplicateEntryError:
+            # Повторный выход: токен уже забанен
+            return None
 
         return banned_token
     
@@ -135,9 +166,6 @@ class AuthService:
         Create a verification code.
         """
 
-        if await self.auth_repository.get_email_verification(email=user.email):
-            raise DuplicateEntryError("Verification with this email already exists")
-        
         email_verification = EmailVerification(
             code=uuid4(),
             email=user.email
@@ -152,7 +180,7 @@ class AuthService:
         if email_verificatiion is None:
             raise NotFoundError("Veriification not found")
 
-        if email_verificatiion.code != UUID(code):
+        if email_verificatiion.code != UUID(str(code)):
             raise NotFoundError("Verification not found")
         
         user.is_active = True
@@ -173,15 +201,13 @@ class AuthService:
         Refresh a user's JWT token.
         """
 
-        payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
-        )
+        payload = decode_token(token)
 
         user_id: str = payload.get("sub")
         if user_id is None:
             raise NotFoundError("User not found")
        
-        user = await self.auth_repository.get_user(id=UUID(user_id))
+        user = await self.auth_repository.get_user_by_id(UUID(user_id))
         if user is None:
             raise NotFoundError("User not found")
         
@@ -196,10 +222,16 @@ class AuthService:
         if banned_token:
             raise NotFoundError("Token is banned")
         
-        await self.banned_refresh_token_repository.create_banned_refresh_token(jti=jti)
+        try:
+            await self.banned_refresh_token_repository.create_banned_refresh_token(
+                jti=jti, expires_at=self._token_expires_at(payload)
+            )
+        except DuplicateEntryError:
+            # Параллельный refresh того же токена успел забанить его первым
+            raise NotFoundError("Token is banned")
         
         access_token = self.create_access_token(
-            {"sub": str(user.id)}
+            {"sub": str(user.id), "active": user.is_active}
         )
         refresh_token = self.create_refresh_token(
             {"sub": str(user.id), "jti": str(uuid4())}
@@ -211,18 +243,28 @@ class AuthService:
         )
 
 
+    @staticmethod
+    def _token_expires_at(payload: dict) -> datetime | None:
+
+        exp = payload.get("exp")
+        if exp is None:
+            return None
+
+        return datetime.fromtimestamp(exp, tz=timezone.utc)
+
+
     def create_access_token(self, data: dict) -> AccessToken:
 
         to_encode = data.copy()
 
-        expire = datetime.now(timezone.utc) + timedelta(
+        issued_at = datetime.now(timezone.utc)
+        expire = issued_at + timedelta(
             minutes=settings.access_token_expire_minutes
         )
-        to_encode.update({"exp": expire, "type": "access"})
+        # iat с долями секунды, иначе токен, выданный сразу после revoke, окажется старше отсечки
+        to_encode.update({"exp": expire, "iat": issued_at.timestamp(), "type": "access"})
 
-        encoded_jwt = jwt.encode(
-            to_encode, settings.secret_key, algorithm=settings.algorithm
-        )
+        encoded_jwt = encode_token(to_encode)
 
         return AccessToken(
             token=encoded_jwt,
@@ -240,9 +282,7 @@ class AuthService:
         )
         to_encode.update({"exp": expire, "type": "refresh"})
 
-        encoded_jwt = jwt.encode(
-            to_encode, settings.secret_key, algorithm=settings.algorithm
-        )
+        encoded_jwt = encode_token(to_encode)
 
         return RefreshToken(
             token=encoded_jwt,
@@ -253,37 +293,31 @@ class AuthService:
 
 
     async def verify_access_token(self, token: str) -> bool:
+        """
+        Verify an access token.
 
-        try:
+        In stateless mode the signed claims and the per-user cutoff are
+        trusted, otherwise the user is also looked up in the repository.
+        """
 
-            payload = jwt.decode(
-                token, settings.secret_key, algorithms=[settings.algorithm]
-            )
+        payload = decode_access_token(token)
+        if payload is None:
+            return None
 
-            if payload.get("type") != "access":
-                return None
-            
-            user_id: str = payload.get("sub")
-            if user_id is None:
-                return None
-            
-            user = await self.auth_repository.get_user(id=UUID(user_id))
-            if user is None:
-                return None
-            
+        if settings.access_token_stateless:
             return True
-        
-        except jwt.PyJWTError:
+
+        if not await self.auth_repository.user_exists(UUID(payload["sub"]), active_only=True):
             return None
 
+        return True
+
 
     async def verify_refresh_token(self, token: str) -> bool:
 
         try:
 
-            payload = jwt.decode(
-                token, settings.secret_key, algorithms=[settings.algorithm]
-            )
+            payload = decode_token(token)
 
             if payload.get("type") != "refresh":
                 return None
@@ -292,7 +326,8 @@ class AuthService:
             if user_id is None:
                 return None
             
-            user = await self.auth_repository.get_user(id=UUID(user_id))
+            # Загруженный пользователь остается в кеше запроса для refresh
+            user = await self.auth_repository.get_user_by_id(UUID(user_id))
             if user is None:
                 return None
             
@@ -1,13 +1,16 @@
+import asyncio
 from dataclasses import dataclass
 from uuid import UUID
 
 from core.entities import EmailMessage
 from core.Ibroker import IBrokerProducer
+from logger import get_logger
 
 from settings import get_settings
 
 
 settings = get_settings()
+logger = get_logger()
 
 @dataclass
 class MailService:
@@ -31,9 +34,34 @@ class MailService:
         )
 
 
-        await self.broker_producer.send_email(email_message=email_message)
+        delivery = await self.broker_producer.send_email(email_message=email_message)
+
+        # Подтверждение придет вместе с батчем продюсера, запрос его не ждет
+        delivery.add_done_callback(self._verify_code_delivered)
 
         return
 
 
+    @staticmethod
+    def _verify_code_delivered(delivery: asyncio.Future) -> None:
+
+        if delivery.cancelled():
+            return
+
+        error = delivery.exception()
+        if error is not None:
+            logger.error(f"Failed to deliver verification email to the broker: {error}")
+
+
+    async def send_many(self, email_messages: list[EmailMessage], wait: bool = False) -> list[asyncio.Future]:
+        """
+        Send bulk notifications in batches.
+        With wait=True returns only after every message is acknowledged by the broker.
+        """
+
+        delivery_futures = await self.broker_producer.send_many(email_messages=email_messages)
+
+        if wait:
+            await asyncio.gather(*delivery_futures)
 
+        return delivery_futures
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from passlib.context import CryptContext
+
+from core.exceptions import ServiceUnavailableError
+from metrics import get_metrics
+from settings import get_settings
+
+
+settings = get_settings()
+
+_pwd_context: CryptContext | None = None
+
+
+def _get_pwd_context() -> CryptContext:
+    """
+    CryptContext of the current process, created lazily inside pool workers.
+    """
+    global _pwd_context
+    if not _pwd_context:
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.password_bcrypt_rounds
+        )
+    return _pwd_context
+
+
+def _hash(password: str) -> str:
+    return _get_pwd_context().hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return _get_pwd_context().verify(password, hashed_password)
+
+
+def _timed(func, *args):
+    """
+    Run func in the worker and return its result with the CPU time spent,
+    the queue wait of the pool is not included.
+    """
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded worker pool
+    so that the event loop is never blocked by a hashing round.
+
+    mode: "thread" or "process"
+    max_workers: pool size
+    max_queue: how many calls may wait for a free worker before
+               ServiceUnavailableError is raised
+    """
+
+    MODES = ("thread", "process")
+
+    def __init__(self, mode: str = "thread", max_workers: int | None = None, max_queue: int = 64):
+
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown password hasher mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.pending = 0
+        self._executor: Executor | None = None
+        self._dummy_hash: str | None = None
+        self.latency = get_metrics().histogram(
+            "password_hasher_seconds", "Password hashing latency including queue wait"
+        )
+        self.bcrypt_latency = get_metrics().histogram(
+            "password_bcrypt_seconds", "Time spent in bcrypt itself"
+        )
+        get_metrics().gauge(
+            "password_hasher_pending", "Hashing calls running or queued", lambda: self.pending
+        )
+
+
+    @property
+    def executor(self) -> Executor:
+
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+
+    async def hash(self, password: str) -> str:
+
+        return await self._run("hash", _hash, password)
+
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+
+        return await self._run("verify", _verify, password, hashed_password)
+
+
+    async def verify_dummy(self, password: str) -> bool:
+        """
+        Spend the time of a real verification for an unknown user,
+        so response time does not tell whether an email is registered.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+
+        await self.verify(password, self._dummy_hash)
+        return False
+
+
+    async def _run(self, operation: str, func, *args):
+
+        if self.pending >= self.max_workers + self.max_queue:
+            raise ServiceUnavailableError("Too many login attempts in progress, try again later")
+
+        self.pending += 1
+        try:
+            with self.latency.time(operation=operation):
+                loop = asyncio.get_running_loop()
+                result, elapsed = await loop.run_in_executor(self.executor, _timed, func, *args)
+
+            self.bcrypt_latency.observe(elapsed, operation=operation)
+            return result
+        finally:
+            self.pending -= 1
+
+
+    def shutdown(self) -> None:
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Возвращает глобальный пул хеширования паролей
+    """
+    global password_hasher
+
+    if not password_hasher:
+        password_hasher = PasswordHasher(
+            mode=settings.password_hasher_mode,
+            max_workers=settings.password_hasher_workers,
+            max_queue=settings.password_hasher_max_queue,
+        )
+    return password_hasher
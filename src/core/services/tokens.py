@@ -0,0 +1,350 @@
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import jwt
+
+from core.cache import LRUCache
+from logger import get_logger
+from settings import get_settings
+
+
+logger = get_logger()
+
+
+settings = get_settings()
+
+
+CutoffListener = Callable[[str, float], Awaitable[None]]
+
+
+class TokenCutoffRegistry:
+    """
+    Per-user "not before" timestamps used to invalidate access tokens
+    without looking the user up: a token whose iat is before the cutoff
+    of its subject is rejected. Entries live as long as an access token.
+    Access tokens carry a fractional iat, so cutoffs are compared with the
+    same precision they are taken with.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 100_000):
+        self.cutoffs = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.listeners: list[CutoffListener] = []
+
+
+    async def revoke(self, user_id: str, cutoff: float | None = None) -> float:
+        """
+        Invalidate every access token issued to the user until now
+        and notify the listeners (other workers). A listener error is
+        raised to the caller; the local cutoff is kept.
+        """
+        cutoff = self.set_cutoff(str(user_id), cutoff)
+
+        for listener in self.listeners:
+            await listener(str(user_id), cutoff)
+
+        return cutoff
+
+
+    def set_cutoff(self, user_id: str, cutoff: float | None = None) -> float:
+
+        cutoff = time.time() if cutoff is None else cutoff
+
+        current = self.cutoffs.get(user_id)
+        if current is None or current < cutoff:
+            self.cutoffs.set(user_id, cutoff)
+
+        return cutoff
+
+
+    def is_revoked(self, user_id: str, issued_at: float | None) -> bool:
+
+        cutoff = self.cutoffs.get(str(user_id))
+        if cutoff is None:
+            return False
+
+        return issued_at is None or issued_at < cutoff
+
+
+    async def handle_event(self, payload: dict) -> None:
+
+        self.set_cutoff(payload["sub"], payload["cutoff"])
+
+
+class KeyRing:
+    """
+    Keys used to sign and verify tokens.
+
+    Without `keys_dir` tokens are signed with the HMAC secret_key.
+    Otherwise every `<kid>.pem` in the directory is loaded once into a key
+    object: private keys can sign, public-only (retired) keys still verify.
+    The active key is `active_kid` or the newest private key. Changes in
+    the directory are picked up every `reload_interval` seconds, so keys can
+    be rotated by adding the new key first and removing the old one after
+    refresh_token_expire_days. A token with an unknown kid forces a reload,
+    at most once per `reload_interval` because anyone can send such a token.
+    """
+
+    ALGORITHMS = {"RSA": "RS256", "Ed25519": "EdDSA"}
+
+    def __init__(
+        self,
+        secret_key: str,
+        algorithm: str,
+        keys_dir: str = "",
+        active_kid: str = "",
+        reload_interval: float = 30,
+    ):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.keys_dir = Path(keys_dir) if keys_dir else None
+        self.active_kid = active_kid
+        self.reload_interval = reload_interval
+        self.keys: dict[str, dict[str, Any]] = {}
+        self.active: str | None = None
+        self.listeners: list[Callable[[], None]] = []
+        self._checked_at = float("-inf")
+        self._forced_at = float("-inf")
+        self._mtime: int | None = None
+        self._lock = threading.Lock()
+
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.keys_dir is not None
+
+
+    def reload(self, force: bool = False) -> None:
+
+        if not self.asymmetric:
+            return
+
+        now = time.monotonic()
+        checked_at = self._forced_at if force else self._checked_at
+        if now - checked_at < self.reload_interval:
+            return
+
+        with self._lock:
+            # Другой поток мог перезагрузить ключи, пока мы ждали блокировку
+            if force:
+                if now - self._forced_at < self.reload_interval:
+                    return
+                self._forced_at = now
+
+            self._checked_at = now
+            mtime = os.stat(self.keys_dir).st_mtime_ns
+            if not force and mtime == self._mtime:
+                return
+
+            keys = {path.stem: self._load_key(path) for path in sorted(self.keys_dir.glob("*.pem"))}
+            signing = [kid for kid, key in keys.items() if key["private"] is not None]
+
+            if self.active_kid and self.active_kid in signing:
+                active = self.active_kid
+            elif signing:
+                active = max(signing, key=lambda kid: keys[kid]["mtime"])
+            else:
+                raise ValueError(f"No private key found in {self.keys_dir}")
+
+            removed = set(self.keys) - set(keys)
+            self.keys, self.active, self._mtime = keys, active, mtime
+
+        logger.info(f"Key ring loaded {len(keys)} keys, active kid {active}.")
+
+        if removed:
+            for listener in self.listeners:
+                listener()
+
+
+    @classmethod
+    def _load_key(cls, path: Path) -> dict[str, Any]:
+        from cryptography.hazmat.primitives import serialization
+
+        data = path.read_bytes()
+
+        if b"PRIVATE KEY" in data:
+            private_key = serialization.load_pem_private_key(data, password=None)
+            public_key = private_key.public_key()
+        else:
+            private_key = None
+            public_key = serialization.load_pem_public_key(data)
+
+        key_type = type(public_key).__name__
+        algorithm = next(
+            (algorithm for prefix, algorithm in cls.ALGORITHMS.items() if key_type.startswith(prefix)),
+            None,
+        )
+        if algorithm is None:
+            raise ValueError(f"Unsupported key type {key_type} in {path}")
+
+        return {
+            "private": private_key,
+            "public": public_key,
+            "algorithm": algorithm,
+            "mtime": path.stat().st_mtime_ns,
+        }
+
+
+    def encode(self, payload: dict) -> str:
+
+        if not self.asymmetric:
+            return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+
+        self.reload()
+        key = self.keys[self.active]
+
+        return jwt.encode(
+            payload, key["private"], algorithm=key["algorithm"], headers={"kid": self.active}
+        )
+
+
+    def decode(self, token: str) -> dict:
+
+        if not self.asymmetric:
+            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+
+        kid = jwt.get_unverified_header(token).get("kid")
+
+        try:
+            self.reload()
+            key = self.keys.get(kid)
+            if key is None:
+                self.reload(force=True)
+                key = self.keys.get(kid)
+        except (OSError, ValueError) as e:
+            raise jwt.InvalidKeyError(f"Keys could not be loaded: {e}") from e
+
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown key id {kid}")
+
+        return jwt.decode(token, key["public"], algorithms=[key["algorithm"]])
+
+
+    def jwks(self) -> list[dict]:
+        """
+        Public keys in JWK format, empty for HMAC signing.
+        """
+        from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+        if not self.asymmetric:
+            return []
+
+        self.reload()
+        jwks = []
+
+        for kid, key in self.keys.items():
+            algorithm = RSAAlgorithm if key["algorithm"] == "RS256" else OKPAlgorithm
+            jwk = algorithm.to_jwk(key["public"], as_dict=True)
+            jwk.update({"kid": kid, "alg": key["algorithm"], "use": "sig"})
+            jwks.append(jwk)
+
+        return jwks
+
+
+class TokenPayloadCache:
+    """
+    Verified token payloads keyed by the token digest, so the signature
+    of a token is checked once per worker. An entry never outlives the
+    exp of its token nor `max_ttl` seconds.
+    """
+
+    def __init__(self, maxsize: int, max_ttl: float):
+        self.max_ttl = max_ttl
+        self.payloads = LRUCache(maxsize=maxsize)
+
+
+    @property
+    def hits(self) -> int:
+        return self.payloads.hits
+
+
+    @property
+    def misses(self) -> int:
+        return self.payloads.misses
+
+
+    def decode(self, token: str) -> dict:
+        """
+        Decode and verify a token, raises jwt.PyJWTError like jwt.decode.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+
+        payload = self.payloads.get(key)
+        if payload is not None:
+            return dict(payload)
+
+        payload = key_ring.decode(token)
+
+        ttl = self.max_ttl
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+
+        if ttl > 0:
+            self.payloads.set(key, payload, ttl=ttl)
+
+        return dict(payload)
+
+
+    def clear(self) -> None:
+
+        self.payloads.clear()
+
+
+key_ring = KeyRing(
+    secret_key=settings.secret_key,
+    algorithm=settings.algorithm,
+    keys_dir=settings.jwt_keys_dir,
+    active_kid=settings.jwt_active_kid,
+)
+
+token_cutoffs = TokenCutoffRegistry(ttl=settings.access_token_expire_minutes * 60)
+
+token_payloads = TokenPayloadCache(
+    maxsize=settings.token_cache_size, max_ttl=settings.token_cache_ttl
+)
+
+
+key_ring.listeners.append(token_payloads.clear)
+
+
+def encode_token(payload: dict) -> str:
+    """
+    Sign a JWT with the active key of the key ring.
+    """
+    return key_ring.encode(payload)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Decode a JWT through the payload cache, raises jwt.PyJWTError.
+    """
+    return token_payloads.decode(token)
+
+
+def decode_access_token(token: str) -> dict | None:
+    """
+    Verify an access token using only its signature and claims.
+    Returns the payload or None when the token must be rejected.
+    """
+    try:
+        payload = decode_token(token)
+    except jwt.PyJWTError:
+        return None
+
+    if payload.get("type") != "access":
+        return None
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    if payload.get("active") is False:
+        return None
+
+    if token_cutoffs.is_revoked(user_id, payload.get("iat")):
+        return None
+
+    return payload
@@ -1,3 +1,7 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from email.message import EmailMessage as EmailMessageOrig
 import aiosmtplib
 from core.entities.mail import EmailMessage
@@ -8,54 +12,231 @@ logger = get_logger()
 settings = get_settings()
 
 
-class AsyncSMTPMailer:
+# Ошибки, после которых соединение нельзя переиспользовать
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    5xx replies and refused recipients will fail again on retry.
+    """
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return True
+
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+
+class SMTPConnection:
 
     def __init__(self):
 
         self.smtp = aiosmtplib.SMTP(
             hostname=settings.smtp_server,
             port=int(settings.smtp_port),
-            use_tls=True
+            use_tls=True,
+            timeout=settings.smtp_timeout,
         )
-        self.connected = False
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+    @property
+    def connected(self) -> bool:
+        return self.smtp.is_connected
 
 
     async def connect(self):
-        
+
+        await self.smtp.connect()
+        await self.smtp.login(settings.smtp_username, settings.smtp_password)
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+    async def is_healthy(self) -> bool:
+
         if not self.connected:
+            return False
 
-            await self.smtp.connect()
-            await self.smtp.login(settings.smtp_username, settings.smtp_password)
-            self.connected = True
+        try:
+            await self.smtp.noop()
+            return True
+        # Оборванное сервером соединение дает OSError, а не SMTPException
+        except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+            return False
 
 
-    async def send_email(self, email_message: EmailMessage):
+    async def send_message(self, msg: EmailMessageOrig):
+
+        await self.smtp.send_message(msg)
+        self.messages_sent += 1
+        self.last_used = time.monotonic()
+
+
+    async def close(self):
+
+        if self.connected:
+            try:
+                await self.smtp.quit()
+            except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                self.smtp.close()
+
+
+class SMTPConnectionPool:
+    """
+    Up to `size` authenticated SMTP sessions kept open between sends.
+
+    A session idle for longer than `keepalive` seconds is checked with NOOP
+    before reuse, broken sessions are reconnected, and a session is closed
+    after `max_messages` messages.
+    """
+
+    def __init__(self, size: int, max_messages: int, keepalive: float):
+        self.size = size
+        self.max_messages = max_messages
+        self.keepalive = keepalive
+        self._idle: deque[SMTPConnection] = deque()
+        self._semaphore = asyncio.Semaphore(size)
+
+
+    @asynccontextmanager
+    async def acquire(self):
+
+        async with self._semaphore:
+
+            connection = await self._get_connection()
+
+            try:
+                yield connection
+
+            except CONNECTION_ERRORS:
+                await connection.close()
+                raise
+
+            except aiosmtplib.SMTPException:
+                await self._release(connection)
+                raise
+
+            except BaseException:
+                connection.smtp.close()
+                raise
+
+            else:
+                await self._release(connection)
+
+
+    async def _release(self, connection: SMTPConnection):
+
+        if connection.messages_sent >= self.max_messages or not connection.connected:
+            await connection.close()
+        else:
+            self._idle.append(connection)
+
+
+    async def _get_connection(self) -> SMTPConnection:
+
+        while self._idle:
+
+            connection = self._idle.pop()
+
+            if time.monotonic() - connection.last_used < self.keepalive and connection.connected:
+                return connection
+
+            if await connection.is_healthy():
+                return connection
+
+            await connection.close()
+
+        connection = SMTPConnection()
+        try:
+            await connection.connect()
+        except BaseException:
+            connection.smtp.close()
+            raise
+
+        return connection
+
+
+    async def close(self):
+
+        while self._idle:
+            await self._idle.pop().close()
+
+
+class AsyncSMTPMailer:
+
+    def __init__(self, pool: SMTPConnectionPool):
+
+        self.pool = pool
+
+
+    @staticmethod
+    def build_message(email_message: EmailMessage) -> EmailMessageOrig:
 
-        await self.connect()
-        
         msg = EmailMessageOrig()
         msg['Subject'] = email_message.subject
         msg['From'] = settings.mail_from
         msg['To'] = email_message.email
         msg.set_content(email_message.body)
 
+        return msg
+
+
+    async def send_email(self, email_message: EmailMessage):
+        """
+        Send an email, raises aiosmtplib.SMTPException or OSError on failure.
+        """
+
+        msg = self.build_message(email_message)
+
+        # Одна повторная попытка на новом соединении, если старое оборвалось
+        for attempt in range(2):
+
+            try:
+                async with self.pool.acquire() as connection:
+                    await connection.send_message(msg)
+                logger.info(f"Email sent to {email_message.email}")
+                return
+
+            except CONNECTION_ERRORS:
+                if attempt:
+                    raise
+
+
+    async def send_many(self, email_messages: list[EmailMessage]) -> list[Exception | None]:
+        """
+        Send emails over a single SMTP session.
+        Returns the error of every message, None for the delivered ones.
+        """
+
+        results: list[Exception | None] = []
+
         try:
-            await self.smtp.send_message(msg)
-            logger.info(f"Email sent to {email_message.email}")
-        
-        except aiosmtplib.SMTPException as e:
-            logger.error(f"Failed to send email to {email_message.email}: {e}")
+            async with self.pool.acquire() as connection:
 
-        finally:
-            await self.close()
+                for email_message in email_messages:
+                    try:
+                        await connection.send_message(self.build_message(email_message))
+                        results.append(None)
+                        logger.info(f"Email sent to {email_message.email}")
+                    except CONNECTION_ERRORS:
+                        raise
+                    except aiosmtplib.SMTPException as e:
+                        results.append(e)
 
+        except Exception as e:
+            results.extend([e] * (len(email_messages) - len(results)))
 
-    async def close(self):
-        
-        if self.connected:
+        return results
 
-            await self.smtp.quit()
-            self.connected = False
 
+    async def close(self):
+
+        await self.pool.close()
 
-SMTPClient: AsyncSMTPMailer = AsyncSMTPMailer()
@@ -1,9 +1,7 @@
-from .consumer import BrokerConsumer, broker_consumer
-from .producer import BrokerProducer, broker_producer
+from .consumer import BrokerConsumer
+from .producer import BrokerProducer
 
 __all__ = (
     "BrokerConsumer",
     "BrokerProducer",
-    "broker_producer",
-    "broker_consumer",
-)
\ No newline at end of file
+)
@@ -1,24 +1,161 @@
+import hashlib
 import json
+import random
 import asyncio
-from dataclasses import dataclass
-from aiokafka import AIOKafkaConsumer
+from dataclasses import dataclass, field
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
 
+from core.cache import LRUCache
 from core.entities.mail import EmailMessage
 from logger import get_logger
-from settings import get_settings
 
-from infrastructure.SMTPclient import SMTPClient
+from infrastructure.SMTPclient import AsyncSMTPMailer, is_permanent_error
+from infrastructure.broker.producer import BrokerProducer
 
 logger = get_logger()
-settings = get_settings()
+
+
+class OffsetTracker:
+    """
+    Tracks in-flight offsets per partition while messages are processed
+    concurrently. The committable offset of a partition is the lowest
+    offset still in flight, so nothing unprocessed is ever committed.
+
+    A revoked partition is reset and its generation changes: messages
+    taken before the revoke no longer affect it when they finish.
+    """
+
+    def __init__(self):
+        self.pending: dict[TopicPartition, set[int]] = {}
+        self.processed: dict[TopicPartition, int] = {}
+        self.committed: dict[TopicPartition, int] = {}
+        self.fetched: dict[TopicPartition, int] = {}
+        self.generations: dict[TopicPartition, int] = {}
+
+
+    def start(self, partition: TopicPartition, offset: int) -> int:
+        """
+        Returns the generation of the partition, pass it to done / rewind.
+        """
+        self.pending.setdefault(partition, set()).add(offset)
+        self.fetched[partition] = max(self.fetched.get(partition, -1), offset)
+        return self.generations.get(partition, 0)
+
+
+    def done(self, partition: TopicPartition, offset: int, generation: int | None = None) -> None:
+
+        if generation is not None and generation != self.generations.get(partition, 0):
+            return
+
+        self.pending[partition].discard(offset)
+        self.processed[partition] = max(self.processed.get(partition, -1), offset)
+
+
+    def rewind(self, partition: TopicPartition, offset: int, generation: int | None = None) -> bool:
+        """
+        A message failed: returns whether the consumer has to seek back to it.
+        The offset stays pending, so it is not committed until it is processed.
+        """
+        if generation is not None and generation != self.generations.get(partition, 0):
+            return False
+
+        # После предыдущего seek позиция уже может быть ниже
+        if offset > self.fetched.get(partition, -1):
+            return False
+
+        self.fetched[partition] = offset - 1
+        return True
+
+
+    def reset(self, partitions) -> None:
+
+        for partition in partitions:
+            self.pending.pop(partition, None)
+            self.processed.pop(partition, None)
+            self.committed.pop(partition, None)
+            self.fetched.pop(partition, None)
+            self.generations[partition] = self.generations.get(partition, 0) + 1
+
+
+    def committable(self) -> dict[TopicPartition, int]:
+
+        offsets = {}
+
+        for partition, processed in self.processed.items():
+            pending = self.pending.get(partition)
+            offset = min(pending) if pending else processed + 1
+
+            if offset > self.committed.get(partition, -1):
+                offsets[partition] = offset
+
+        return offsets
+
+
+    def mark_committed(self, offsets: dict[TopicPartition, int]) -> None:
+        self.committed.update(offsets)
+
+
+class TrackerRebalanceListener(ConsumerRebalanceListener):
+    """
+    Commits what was processed before partitions are taken away and
+    resets them in the tracker, their new owner starts from that commit.
+    """
+
+    def __init__(self, broker_consumer: "BrokerConsumer"):
+        self.broker_consumer = broker_consumer
+
+
+    async def on_partitions_revoked(self, revoked) -> None:
+
+        try:
+            await self.broker_consumer.commit()
+        except Exception as e:
+            logger.error(f"Error committing offsets before rebalance: {e}")
+
+        self.broker_consumer.tracker.reset(revoked)
+
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        pass
+
 
 @dataclass
 class BrokerConsumer:
-    
+    """
+    Email notification consumer.
+
+    At most `concurrency` emails are sent at once, a failed send is retried
+    `max_retries` times with exponential backoff and then published to the
+    dead letter topic. Offsets are committed only for messages that were
+    delivered or dead-lettered, which gives at-least-once delivery: the
+    partition is rewound to a message that was neither, so it is read again.
+
+    In batch mode records are fetched with getmany, identical emails (same
+    recipient, subject and body) within `dedup_window` seconds are dropped, each
+    group of messages is sent over one SMTP session and offsets are
+    committed once per batch.
+    """
+
     consumer: AIOKafkaConsumer
+    mailer: AsyncSMTPMailer
+    producer: BrokerProducer
+    topic: str = "email_notifications"
+    concurrency: int = 10
+    max_retries: int = 5
+    retry_backoff: float = 1.0
+    dead_letter_topic: str = "email_notifications_dlq"
+    commit_interval: float = 1.0
+    batch_mode: bool = False
+    batch_size: int = 100
+    dedup_window: float = 60
+    tracker: OffsetTracker = field(default_factory=OffsetTracker)
+    tasks: set[asyncio.Task] = field(default_factory=set)
+    recently_sent: LRUCache = field(default_factory=lambda: LRUCache(maxsize=100_000))
+    stopping: bool = False
 
 
     async def open_connection(self) -> None:
+        self.consumer.subscribe(topics=[self.topic], listener=TrackerRebalanceListener(self))
         await self.consumer.start()
 
 
@@ -26,29 +163,254 @@ class BrokerConsumer:
         await self.consumer.stop()
 
 
+    async def run(self) -> None:
+
+        if self.batch_mode:
+            await self.consume_batches()
+        else:
+            await self.consume_callback_message()
+
+
     async def consume_callback_message(self) -> None:
-        
-        async for message in self.consumer:
-            
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        commit_task = asyncio.create_task(self._commit_periodically())
+
+        try:
+
+            async for message in self.consumer:
+
+                await semaphore.acquire()
+
+                partition = TopicPartition(message.topic, message.partition)
+                generation = self.tracker.start(partition, message.offset)
+
+                task = asyncio.create_task(self._process(message))
+                self.tasks.add(task)
+                task.add_done_callback(
+                    lambda task, partition=partition, offset=message.offset, generation=generation: self._on_done(
+                        task, partition, offset, generation, semaphore
+                    )
+                )
+
+        finally:
+            commit_task.cancel()
+            await self.commit()
+
+
+    async def shutdown(self, consumer_task: asyncio.Task, timeout: float) -> None:
+        """
+        Stop fetching, wait up to `timeout` seconds for the messages already
+        taken and commit their offsets. Unfinished messages will be consumed again.
+        """
+        self.stopping = True
+
+        if self.batch_mode:
+            await asyncio.wait([consumer_task], timeout=timeout)
+
+        if not consumer_task.done():
+            consumer_task.cancel()
+        try:
+            await consumer_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Consumer stopped with error: {e}")
+
+        if self.tasks:
+            await asyncio.wait(self.tasks, timeout=timeout)
+
+        await self.commit()
+
+
+    def _on_done(
+        self, task: asyncio.Task, partition: TopicPartition, offset: int, generation: int, semaphore: asyncio.Semaphore
+    ) -> None:
+
+        self.tasks.discard(task)
+        semaphore.release()
+
+        # Отмена бывает только при остановке, сообщение остается незакоммиченным
+        if task.cancelled():
+            return
+
+        if task.exception() is None:
+            self.tracker.done(partition, offset, generation)
+            return
+
+        # Ни отправлено, ни в dead letter: перечитываем партицию с этого сообщения,
+        # следующие за ним могут быть отправлены повторно
+        if self.tracker.rewind(partition, offset, generation):
+            logger.error(f"Message at offset {offset} of {partition} failed, seeking back to it")
+            self.consumer.seek(partition, offset)
+
+
+    async def consume_batches(self) -> None:
+
+        while not self.stopping:
+
+            batches = await self.consumer.getmany(timeout_ms=1000, max_records=self.batch_size)
+            if not batches:
+                continue
+
+            messages = [message for records in batches.values() for message in records]
+            failed = await self._process_batch(messages)
+
+            offsets = {}
+            for partition, records in batches.items():
+                failed_offsets = [
+                    message.offset for message in failed
+                    if TopicPartition(message.topic, message.partition) == partition
+                ]
+
+                if failed_offsets:
+                    # Перечитываем партицию начиная с первого не доставленного сообщения
+                    offsets[partition] = min(failed_offsets)
+                    self.consumer.seek(partition, offsets[partition])
+                else:
+                    offsets[partition] = records[-1].offset + 1
+
+            await self.consumer.commit(offsets)
+
+
+    async def _process_batch(self, messages: list) -> list:
+        """
+        Deliver a batch, returns the messages that were neither delivered nor dead-lettered.
+        """
+
+        unique: dict[tuple[str, str, bytes], tuple] = {}
+        pending = []
+
+        for message in messages:
+            try:
+                email_message = EmailMessage(**json.loads(message.value.decode("utf-8")))
+            except Exception as e:
+                logger.error(f"Invalid email message at offset {message.offset}: {e}")
+                pending.append((message, self._dead_letter(message, e)))
+                continue
+
+            key = self._dedup_key(email_message)
+            if self.recently_sent.get(key):
+                continue
+
+            # Из повторов в одной пачке отправляем последнее сообщение
+            unique[key] = (message, email_message)
+
+        groups = [[] for _ in range(min(self.concurrency, len(unique)))]
+        for index, item in enumerate(unique.values()):
+            groups[index % len(groups)].append(item)
+
+        results = await asyncio.gather(
+            *(self.mailer.send_many([email_message for _, email_message in group]) for group in groups)
+        )
+
+        for group, errors in zip(groups, results):
+            for (message, email_message), error in zip(group, errors):
+                if error is None:
+                    self.recently_sent.set(self._dedup_key(email_message), True, ttl=self.dedup_window)
+                else:
+                    pending.append((message, self._deliver(message, email_message, attempt=1, error=error)))
+
+        outcomes = await asyncio.gather(*(coroutine for _, coroutine in pending), return_exceptions=True)
+        failed = [message for (message, _), outcome in zip(pending, outcomes) if isinstance(outcome, Exception)]
+
+        if failed:
+            logger.error(f"{len(failed)} messages will be consumed again")
+
+        return failed
+
+
+    async def _process(self, message) -> None:
+
+        try:
+            email_message = EmailMessage(**json.loads(message.value.decode("utf-8")))
+        except Exception as e:
+            logger.error(f"Invalid email message at offset {message.offset}: {e}")
+            await self._dead_letter(message, e)
+            return
+
+        await self._deliver(message, email_message)
+
+
+    @staticmethod
+    def _dedup_key(email_message: EmailMessage) -> tuple[str, str, bytes]:
+        """
+        The whole email is the key: a second verification email has the same
+        recipient and subject but a new code in the body, it must be sent.
+        """
+        return (
+            email_message.email,
+            email_message.subject,
+            hashlib.sha256(email_message.body.encode()).digest(),
+        )
+
+
+    async def _deliver(
+        self, message, email_message: EmailMessage, attempt: int = 0, error: Exception | None = None
+    ) -> None:
+
+        for attempt in range(attempt, self.max_retries + 1):
+
             try:
-            
-                email_message = EmailMessage(**message.value)
                 logger.info(f"sending email...")
-                asyncio.create_task(SMTPClient.send_email(email_message))
-                
-            
+                await self.mailer.send_email(email_message)
+                self.recently_sent.set(self._dedup_key(email_message), True, ttl=self.dedup_window)
+                return
+
+            except Exception as e:
+                error = e
+                logger.error(f"Failed to send email to {email_message.email} (attempt {attempt + 1}): {e}")
+
+                if is_permanent_error(e):
+                    break
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt))
+
+        await self._dead_letter(message, error)
+
+
+    def _backoff(self, attempt: int) -> float:
+
+        delay = self.retry_backoff * 2 ** attempt
+        return delay + random.uniform(0, delay / 2)
+
+
+    async def _dead_letter(self, message, error: Exception) -> None:
+
+        for attempt in range(self.max_retries + 1):
+
+            try:
+                delivery = await self.producer.send_raw(
+                    topic=self.dead_letter_topic,
+                    value=message.value,
+                    key=message.key,
+                    headers=[("error", str(error).encode()), ("source_offset", str(message.offset).encode())],
+                )
+                await delivery
+                return
+
+            except Exception as e:
+                logger.error(f"Failed to publish to {self.dead_letter_topic}: {e}")
+                await asyncio.sleep(self._backoff(attempt))
+
+        raise RuntimeError(f"Message at offset {message.offset} was neither delivered nor dead-lettered")
+
+
+    async def _commit_periodically(self) -> None:
+
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            try:
+                await self.commit()
             except Exception as e:
-                logger.error(f"Error processing message: {e}")
-        
+                logger.error(f"Error committing offsets: {e}")
 
 
+    async def commit(self) -> None:
 
+        offsets = self.tracker.committable()
+        if offsets:
+            await self.consumer.commit(offsets)
+            self.tracker.mark_committed(offsets)
 
-broker_consumer = BrokerConsumer(
-    consumer=AIOKafkaConsumer(
-        'email_notifications',
-        group_id="email_notification_group",
-        bootstrap_servers=settings.kafka_bootstrap_servers,
-        value_deserializer=lambda message: json.loads(message.decode("utf-8")),
-    )
-)
\ No newline at end of file
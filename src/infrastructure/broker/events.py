@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+import json
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from aiokafka import AIOKafkaConsumer, TopicPartition
+
+from logger import get_logger
+
+logger = get_logger()
+
+
+EventHandler = Callable[[dict], Awaitable[None] | None]
+
+
+@dataclass
+class BrokerEventConsumer:
+    """
+    Broadcast consumer for cache synchronisation events.
+
+    It has no consumer group, so every API worker receives every event
+    and applies it through the handler registered for the topic. Events
+    are decoded here, so one malformed record is logged and skipped
+    instead of ending the consumption.
+    """
+
+    consumer: AIOKafkaConsumer
+    handlers: dict[str, EventHandler] = field(default_factory=dict)
+    assignment_timeout: float = 10
+    start_offsets: dict[TopicPartition, int] = field(default_factory=dict)
+
+
+    def subscribe(self, topic: str, handler: EventHandler) -> None:
+        self.handlers[topic] = handler
+
+
+    async def open_connection(self) -> None:
+        """
+        Start the consumer and pin the current end of every partition.
+
+        Call it before the caches are loaded: events published while they
+        load are consumed right after, handlers are idempotent. Partitions
+        of topics created later are read from their beginning.
+        """
+        self.consumer.subscribe(topics=list(self.handlers))
+        await self.consumer.start()
+
+        existing = await self.consumer.topics()
+        partitions = {
+            TopicPartition(topic, partition)
+            for topic in self.handlers
+            if topic in existing
+            for partition in self.consumer.partitions_for_topic(topic) or ()
+        }
+
+        # Без группы партиции назначаются по метаданным, дожидаемся назначения
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.assignment_timeout
+        while not partitions <= self.consumer.assignment():
+            if loop.time() > deadline:
+                raise TimeoutError(f"Event partitions were not assigned in {self.assignment_timeout} s")
+            await asyncio.sleep(0.05)
+
+        if partitions:
+            await self.consumer.seek_to_end(*partitions)
+            self.start_offsets = {
+                partition: await self.consumer.position(partition) for partition in partitions
+            }
+
+
+    async def close_connection(self) -> None:
+        await self.consumer.stop()
+
+
+    async def consume_events(self) -> None:
+
+        async for message in self.consumer:
+
+            try:
+
+                payload = json.loads(message.value.decode("utf-8"))
+                result = self.handlers[message.topic](payload)
+                if inspect.isawaitable(result):
+                    await result
+
+            except Exception as e:
+                logger.error(f"Error processing event from {message.topic} at offset {message.offset}: {e}")
+
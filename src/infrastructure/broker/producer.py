@@ -4,10 +4,8 @@ from dataclasses import dataclass
 from aiokafka import AIOKafkaProducer
 
 from core.entities import EmailMessage
+from metrics import get_metrics
 
-from settings import get_settings
-
-settings = get_settings()
 
 @dataclass
 class BrokerProducer:
@@ -15,6 +13,11 @@ class BrokerProducer:
     producer: AIOKafkaProducer
     topic: str
 
+    def __post_init__(self):
+        self.produce_latency = get_metrics().histogram(
+            "kafka_produce_seconds", "Time to enqueue a message into the producer batch"
+        )
+
     async def open_connection(self) -> None:
         await self.producer.start()
 
@@ -22,15 +25,41 @@ class BrokerProducer:
         await self.producer.stop()
 
 
-    async def send_email(self, email_message: EmailMessage) -> None:
-        
+    async def send_email(self, email_message: EmailMessage) -> asyncio.Future:
+        """
+        Enqueue the email into the current batch and return its delivery future,
+        await it to wait for the broker acknowledgement.
+        """
         encode_email_data = json.dumps(email_message.__dict__).encode()
-        await self.producer.send(topic=self.topic, value=encode_email_data)
+        with self.produce_latency.time(topic=self.topic):
+            return await self.producer.send(
+                topic=self.topic, value=encode_email_data, key=email_message.email.encode()
+            )
+
+
+    async def send_many(self, email_messages: list[EmailMessage]) -> list[asyncio.Future]:
+        """
+        Enqueue many emails at once, they are sent in as few batches as linger_ms allows.
+        """
+        return [await self.send_email(email_message) for email_message in email_messages]
+
+
+    async def send_event(self, topic: str, payload: dict) -> asyncio.Future:
+
+        encode_event_data = json.dumps(payload).encode()
+        return await self.send_raw(topic=topic, value=encode_event_data)
 
 
-event_loop = asyncio.get_event_loop()
+    async def send_raw(
+        self,
+        topic: str,
+        value: bytes,
+        key: bytes | None = None,
+        headers: list[tuple[str, bytes]] | None = None,
+    ) -> asyncio.Future:
+        """
+        Enqueue an already encoded message as is, e.g. one moved to a dead letter topic.
+        """
+        with self.produce_latency.time(topic=topic):
+            return await self.producer.send(topic=topic, value=value, key=key, headers=headers)
 
-broker_producer = BrokerProducer(
-    producer=AIOKafkaProducer(bootstrap_servers=settings.kafka_bootstrap_servers, loop=event_loop),
-    topic="email_notifications"
-)
\ No newline at end of file
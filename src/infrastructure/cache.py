@@ -0,0 +1,30 @@
+from typing import Any
+
+from core.cache import LRUCache
+from core.Icache import ICacheBackend
+
+
+class LocalCacheBackend(ICacheBackend):
+    """
+    In-process TTL LRU cache, every worker has its own copy.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+    async def get(self, key: str) -> Any | None:
+        return self.cache.get(key)
+
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self.cache.set(key, value, ttl=ttl)
+
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.cache.delete(key)
+
+
+    async def clear(self) -> None:
+        self.cache.clear()
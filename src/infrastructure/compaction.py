@@ -0,0 +1,179 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import text
+
+from infrastructure.models import BannedRefreshToken as BannedRefreshTokenModel
+from infrastructure.postgres_db import Database
+from infrastructure.repositories import BannedRefreshTokenRepository
+from logger import get_logger
+from settings import get_settings
+
+logger = get_logger()
+settings = get_settings()
+
+
+PARTITION_SUFFIX_FORMAT = "%Y%m%d"
+
+# Ключ advisory lock компактора, одинаковый во всех воркерах
+ADVISORY_LOCK_KEY = 7_310_262_019
+
+
+@dataclass
+class BannedRefreshTokenCompactor:
+    """
+    Background task that removes banned refresh tokens after their exp.
+
+    Without partitioning expired rows are deleted in batches of
+    `batch_size`, pausing `batch_pause` seconds between batches so that
+    compaction never holds long locks.
+
+    The task runs in every API worker; a round takes a PostgreSQL advisory
+    lock first and is skipped while another worker holds it.
+
+    With `partitioned=True` the table is expected to be
+    PARTITION BY RANGE (expires_at) with one partition per day; then the
+    task creates partitions ahead of time and drops whole expired ones.
+    Partitions are kept `partitions_ahead` days ahead, by default one day
+    past the refresh token lifetime, so every ban has a partition to go to:
+
+        CREATE TABLE "BannedRefreshTokens" (...,
+            PRIMARY KEY (id, expires_at), UNIQUE (jti, expires_at)
+        ) PARTITION BY RANGE (expires_at);
+    """
+
+    database: Database
+    interval: float = 3600
+    batch_size: int = 1000
+    batch_pause: float = 0.1
+    partitioned: bool = False
+    partitions_ahead: int = field(default_factory=lambda: settings.refresh_token_expire_days + 1)
+
+
+    async def run(self) -> None:
+
+        while True:
+
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting banned refresh tokens: {e}")
+
+            await asyncio.sleep(self.interval)
+
+
+    async def compact(self) -> bool:
+        """
+        One compaction round, returns False if another worker is running it.
+        """
+        async with self.lock() as acquired:
+
+            if not acquired:
+                return False
+
+            if self.partitioned:
+                await self.maintain_partitions()
+            else:
+                await self.delete_expired()
+
+        return True
+
+
+    @asynccontextmanager
+    async def lock(self):
+
+        # Advisory locks есть только в PostgreSQL, в тестах на SQLite воркер один
+        if self.database.engine.dialect.name != "postgresql":
+            yield True
+            return
+
+        async with self.database.engine.connect() as conn:
+
+            acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            # Блокировка уровня сессии, транзакцию держать открытой не нужно
+            await conn.commit()
+
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                    await conn.commit()
+
+
+    async def delete_expired(self) -> int:
+
+        deleted = 0
+
+        while True:
+
+            async with self.database.session_factory() as session:
+                repository = BannedRefreshTokenRepository(session)
+                batch = await repository.delete_expired_banned_refresh_tokens(batch_size=self.batch_size)
+
+            deleted += batch
+            if batch < self.batch_size:
+                break
+
+            await asyncio.sleep(self.batch_pause)
+
+        if deleted:
+            logger.info(f"Deleted {deleted} expired banned refresh tokens.")
+
+        return deleted
+
+
+    async def maintain_partitions(self) -> None:
+
+        table = BannedRefreshTokenModel.__tablename__
+        today = datetime.now(timezone.utc).date()
+
+        async with self.database.engine.begin() as conn:
+
+            is_partitioned = await conn.scalar(
+                text("SELECT count(*) FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+                {"table": f'"{table}"'},
+            )
+            if not is_partitioned:
+                logger.error(f"Table {table} is not partitioned, falling back to batched deletes.")
+                self.partitioned = False
+                return
+
+            for offset in range(self.partitions_ahead + 1):
+                day = today + timedelta(days=offset)
+                await conn.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS "{self.partition_name(day)}" PARTITION OF "{table}" '
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                ))
+
+            partitions = await conn.scalars(
+                text(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                    "WHERE pg_inherits.inhparent = to_regclass(:table)"
+                ),
+                {"table": f'"{table}"'},
+            )
+
+            for partition in partitions.all():
+                day = self.partition_day(partition)
+                if day is not None and day < today:
+                    await conn.execute(text(f'DROP TABLE IF EXISTS "{partition}"'))
+                    logger.info(f"Dropped expired partition {partition}.")
+
+
+    @staticmethod
+    def partition_name(day: date) -> str:
+
+        return f"{BannedRefreshTokenModel.__tablename__}_p{day.strftime(PARTITION_SUFFIX_FORMAT)}"
+
+
+    @staticmethod
+    def partition_day(partition: str) -> date | None:
+
+        _, _, suffix = partition.rpartition("_p")
+        try:
+            return datetime.strptime(suffix, PARTITION_SUFFIX_FORMAT).date()
+        except ValueError:
+            return None
@@ -0,0 +1,156 @@
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from logger import get_logger
+from settings import Settings, get_settings
+
+if TYPE_CHECKING:
+    from infrastructure.SMTPclient import AsyncSMTPMailer
+    from infrastructure.broker.consumer import BrokerConsumer
+    from infrastructure.broker.events import BrokerEventConsumer
+    from infrastructure.broker.producer import BrokerProducer
+    from infrastructure.postgres_db import Database
+
+logger = get_logger()
+
+# Порядок закрытия: консьюмеры, затем SMTP пул и producer, которые они используют, база последней
+CLOSE_ORDER = (
+    ("broker_consumer", "close_connection"),
+    ("broker_event_consumer", "close_connection"),
+    ("smtp_client", "close"),
+    ("broker_producer", "close_connection"),
+    ("database", "dispose"),
+)
+
+
+class Container:
+    """
+    Infrastructure clients of the process.
+
+    Every client is built on first access, client libraries are imported
+    there too, so importing the application opens no connections and the
+    Kafka clients are created inside the running event loop. Tests and
+    benchmarks replace a client by assigning the attribute.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+
+    @cached_property
+    def database(self) -> "Database":
+        from infrastructure.postgres_db import Database
+
+        return Database(
+            self.settings.database_url,
+            replica_urls=self.settings.database_replica_urls,
+            pool_size=self.settings.db_pool_size,
+            max_overflow=self.settings.db_max_overflow,
+            pool_timeout=self.settings.db_pool_timeout,
+            pool_recycle=self.settings.db_pool_recycle,
+            pool_pre_ping=self.settings.db_pool_pre_ping,
+            statement_cache_size=self.settings.db_statement_cache_size,
+        )
+
+
+    @cached_property
+    def broker_producer(self) -> "BrokerProducer":
+        from aiokafka import AIOKafkaProducer
+        from infrastructure.broker.producer import BrokerProducer
+
+        return BrokerProducer(
+            producer=AIOKafkaProducer(
+                bootstrap_servers=self.settings.kafka_bootstrap_servers,
+                linger_ms=self.settings.kafka_linger_ms,
+                max_batch_size=self.settings.kafka_max_batch_size,
+                compression_type=self.settings.kafka_compression_type or None,
+                enable_idempotence=self.settings.kafka_enable_idempotence,
+                acks="all" if self.settings.kafka_enable_idempotence else self.settings.kafka_acks,
+            ),
+            topic="email_notifications",
+        )
+
+
+    @cached_property
+    def broker_event_consumer(self) -> "BrokerEventConsumer":
+        from aiokafka import AIOKafkaConsumer
+        from infrastructure.broker.events import BrokerEventConsumer
+
+        return BrokerEventConsumer(
+            consumer=AIOKafkaConsumer(
+                bootstrap_servers=self.settings.kafka_bootstrap_servers,
+                # Существующие партиции начинаются с конца, см. BrokerEventConsumer.open_connection
+                auto_offset_reset="earliest",
+            )
+        )
+
+
+    @cached_property
+    def smtp_client(self) -> "AsyncSMTPMailer":
+        from infrastructure.SMTPclient import AsyncSMTPMailer, SMTPConnectionPool
+
+        return AsyncSMTPMailer(
+            pool=SMTPConnectionPool(
+                size=self.settings.smtp_pool_size,
+                max_messages=self.settings.smtp_max_messages_per_connection,
+                keepalive=self.settings.smtp_keepalive,
+            )
+        )
+
+
+    @cached_property
+    def broker_consumer(self) -> "BrokerConsumer":
+        from aiokafka import AIOKafkaConsumer
+        from infrastructure.broker.consumer import BrokerConsumer
+
+        return BrokerConsumer(
+            consumer=AIOKafkaConsumer(
+                group_id="email_notification_group",
+                bootstrap_servers=self.settings.kafka_bootstrap_servers,
+                enable_auto_commit=False,
+            ),
+            mailer=self.smtp_client,
+            producer=self.broker_producer,
+            topic="email_notifications",
+            concurrency=self.settings.email_consumer_concurrency,
+            max_retries=self.settings.email_max_retries,
+            retry_backoff=self.settings.email_retry_backoff,
+            dead_letter_topic=self.settings.email_dead_letter_topic,
+            batch_mode=self.settings.email_consumer_batch_mode,
+            batch_size=self.settings.email_consumer_batch_size,
+            dedup_window=self.settings.email_dedup_window,
+        )
+
+
+    def created(self, name: str) -> bool:
+        return name in self.__dict__
+
+
+    async def close(self) -> None:
+        """
+        Close the clients that were created in CLOSE_ORDER.
+        A client that fails to close is logged and the rest are still closed.
+        """
+        for name, method in CLOSE_ORDER:
+
+            if not self.created(name):
+                continue
+
+            try:
+                await getattr(getattr(self, name), method)()
+            except Exception as e:
+                logger.error(f"Error closing {name}: {e}")
+
+
+container: Container | None = None
+
+
+def get_container() -> Container:
+    """
+    Возвращает глобальный контейнер инфраструктурных клиентов
+    """
+    global container
+    if not container:
+        container = Container(get_settings())
+
+    return container
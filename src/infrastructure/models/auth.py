@@ -1,5 +1,6 @@
+from datetime import datetime
 from uuid import UUID
-from sqlalchemy import String
+from sqlalchemy import Index, String, func
 from sqlalchemy.orm import mapped_column, Mapped
 from infrastructure.models.base import BaseModelMixin
 from infrastructure.postgres_db import Base
@@ -10,6 +11,7 @@ class BannedRefreshToken(Base, BaseModelMixin):
     __tablename__ = "BannedRefreshTokens"
 
     jti: Mapped[str] = mapped_column(nullable=False, unique=True)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
 
 
 class User(Base, BaseModelMixin):
@@ -24,6 +26,9 @@ class User(Base, BaseModelMixin):
     image: Mapped[str] = mapped_column(nullable=True)
 
 
+# Поиск и уникальность email без учета регистра
+Index("ix_users_email_lower", func.lower(User.email), unique=True)
+
 
 class EmailVerification(Base, BaseModelMixin):
     __tablename__ = "email_verifications"
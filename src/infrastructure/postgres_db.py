@@ -1,27 +1,180 @@
+import random
+import time
 from asyncio import current_task
+from sqlalchemy import Select, event
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
     AsyncSession,
     async_scoped_session,
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from settings import get_settings
-
-settings = get_settings()
+from metrics import get_metrics, request_stats
 
 Base = declarative_base()
 
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that counts callers waiting for a connection
+    and records how long each checkout took.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiters = 0
+        self.checkout_latency = get_metrics().histogram(
+            "db_pool_checkout_seconds", "Time spent waiting for a database connection"
+        )
+
+
+    def _do_get(self):
+
+        # Ждет только тот, кому не досталось ни свободного соединения, ни overflow
+        waiting = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        if waiting:
+            self.waiters += 1
+
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if waiting:
+                self.waiters -= 1
+            self.checkout_latency.observe(time.perf_counter() - started)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to a random replica.
+
+    The first write, flush or locking read pins the session to the primary
+    for the rest of its life, so a request always reads its own writes.
+    A single read can be sent to the primary without pinning by executing
+    it with `bind_arguments={"primary": True}`.
+    """
+
+    def __init__(self, *args, replicas: list | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas or []
+        self.pinned = False
+
+
+    @property
+    def reads_from_replica(self) -> bool:
+
+        return bool(self.replicas) and not self.pinned
+
+
+    def get_bind(self, mapper=None, clause=None, primary: bool = False, **kwargs):
+
+        primary_bind = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+        if primary or not self.reads_from_replica:
+            return primary_bind
+
+        is_read = (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not self._flushing
+        )
+        if not is_read:
+            self.pinned = True
+            return primary_bind
+
+        return random.choice(self.replicas)
+
+
 class Database:
 
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(url=url, echo=echo)
+    def __init__(
+        self,
+        url: str,
+        replica_urls: list[str] | None = None,
+        echo: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int | None = None,
+    ):
+        connect_args = {}
+        if statement_cache_size is not None and url.startswith("postgresql+asyncpg"):
+            connect_args["statement_cache_size"] = statement_cache_size
+            connect_args["prepared_statement_cache_size"] = statement_cache_size
+
+        engine_options = dict(
+            echo=echo,
+            poolclass=InstrumentedPool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=connect_args,
+        )
+
+        self.engine = create_async_engine(url=url, **engine_options)
+        self.replica_engines = [
+            create_async_engine(url=replica_url, **engine_options)
+            for replica_url in replica_urls or []
+        ]
+
+        self.query_latency = get_metrics().histogram("db_query_seconds", "SQL statement execution time")
+        for engine in (self.engine, *self.replica_engines):
+            event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
 
         self.session_factory = async_sessionmaker(
-            bind=self.engine, autoflush=False, autocommit=False, expire_on_commit=False
+            bind=self.engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            sync_session_class=RoutingSession,
+            replicas=[engine.sync_engine for engine in self.replica_engines],
         )
 
+        metrics = get_metrics()
+        metrics.gauge("db_pool_size", "Configured pool size", lambda: self.pool.size())
+        metrics.gauge("db_pool_checked_out", "Connections in use", lambda: self.pool.checkedout())
+        metrics.gauge("db_pool_overflow", "Connections above pool_size", lambda: self.pool.overflow())
+        metrics.gauge("db_pool_waiters", "Callers waiting for a connection", lambda: self.pool.waiters)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+
+        elapsed = time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+        self.query_latency.observe(elapsed)
+
+        # Счетчики запроса, если он обрабатывается middleware метрик
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += elapsed
+
+    @property
+    def pool(self) -> InstrumentedPool:
+        return self.engine.sync_engine.pool
+
+    def pool_status(self) -> dict:
+        return {
+            "size": self.pool.size(),
+            "checked_in": self.pool.checkedin(),
+            "checked_out": self.pool.checkedout(),
+            "overflow": self.pool.overflow(),
+            "waiters": self.pool.waiters,
+        }
+
+    async def dispose(self) -> None:
+        for engine in (self.engine, *self.replica_engines):
+            await engine.dispose()
+
     def get_scope_session(self):
         return async_scoped_session(
             session_factory=self.session_factory, scopefunc=current_task
@@ -40,5 +193,3 @@ class Database:
         finally:
             await session.close()
 
-
-database: Database = Database(settings.database_url)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import time
+
+from core.cache import LRUCache
+from core.Iratelimit import IRateLimitBackend
+
+
+class TokenBucketBackend(IRateLimitBackend):
+    """
+    Token bucket per key: holds up to `limit` tokens, refilled
+    at limit / period tokens per second. Allows bursts up to `limit`.
+    """
+
+    def __init__(self, maxsize: int):
+        self.buckets = LRUCache(maxsize=maxsize)
+
+
+    async def acquire(self, key: str, limit: int, period: float) -> float:
+
+        now = time.monotonic()
+        refill_rate = limit / period
+
+        tokens, updated_at = self.buckets.get(key) or (limit, now)
+        tokens = min(limit, tokens + (now - updated_at) * refill_rate)
+
+        if tokens < 1:
+            self.buckets.set(key, (tokens, now), ttl=period)
+            return (1 - tokens) / refill_rate
+
+        # Полная корзина через period секунд равна отсутствующей, запись можно выбросить
+        self.buckets.set(key, (tokens - 1, now), ttl=period)
+        return 0
+
+
+class SlidingWindowBackend(IRateLimitBackend):
+    """
+    Sliding window counter per key: the count of the previous fixed window
+    is weighted by its overlap with the last `period` seconds.
+    """
+
+    def __init__(self, maxsize: int):
+        self.windows = LRUCache(maxsize=maxsize)
+
+
+    async def acquire(self, key: str, limit: int, period: float) -> float:
+
+        now = time.time()
+        window = int(now // period)
+        elapsed = now - window * period
+
+        current_window, current, previous = self.windows.get(key) or (window, 0, 0)
+        if current_window != window:
+            previous = current if current_window == window - 1 else 0
+            current = 0
+
+        weighted = previous * (1 - elapsed / period) + current
+
+        if weighted + 1 > limit:
+            self.windows.set(key, (window, current, previous), ttl=2 * period)
+
+            if current + 1 > limit:
+                return period - elapsed
+
+            # Ждем, пока вклад прошлого окна не уменьшится до свободного места
+            return (1 - (limit - 1 - current) / previous) * period - elapsed
+
+        self.windows.set(key, (window, current + 1, previous), ttl=2 * period)
+        return 0
+
+
+BACKENDS = {
+    "token_bucket": TokenBucketBackend,
+    "sliding_window": SlidingWindowBackend,
+}
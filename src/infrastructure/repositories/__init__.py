@@ -1,6 +1,13 @@
 from .auth import AuthRepository, BannedRefreshTokenRepository
+from .revocation import CachedBannedRefreshTokenRepository, RevocationCache, revocation_cache
+from .user_cache import UserCache, user_cache
 
 __all__ = [
     "AuthRepository",
     "BannedRefreshTokenRepository",
+    "CachedBannedRefreshTokenRepository",
+    "RevocationCache",
+    "revocation_cache",
+    "UserCache",
+    "user_cache",
 ]
\ No newline at end of file
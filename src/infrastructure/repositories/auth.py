@@ -1,22 +1,98 @@
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.exceptions import NotFoundError
+from core.exceptions import DuplicateEntryError, NotFoundError, ServiceUnavailableError
+from core.Ibroker import IBrokerProducer
+from logger import get_logger
 from core.entities import User, EmailVerification
 from core.interfaceRepositories import IAuthRepository, IBannedRefreshTokenRepository
+from settings import get_settings
 
 from infrastructure.models import (
     User as UserModel, 
     BannedRefreshToken as BannedRefreshTokenModel,
     EmailVerification as EmailVerificationModel
 )
+from infrastructure.models.base import utc_now
+from infrastructure.repositories.user_cache import USERS_TOPIC, UserCache
 
 
-class AuthRepository(IAuthRepository):
+logger = get_logger()
+settings = get_settings()
 
-    def __init__(self, session: AsyncSession):
+
+# Уникальность email: имена ограничений в PostgreSQL и их вид в сообщениях SQLite
+USER_EMAIL_CONSTRAINTS = ("users_email_key", "ix_users_email_lower", "users.email")
+VERIFICATION_EMAIL_CONSTRAINTS = ("email_verifications_email_key", "email_verifications.email")
+BANNED_JTI_CONSTRAINTS = (
+    "BannedRefreshTokens_jti_key",
+    "BannedRefreshTokens_jti_expires_at_key",
+    "BannedRefreshTokens.jti",
+)
+
+
+def violates(error: IntegrityError, constraints: tuple[str, ...]) -> bool:
+    """
+    Whether the IntegrityError comes from one of the constraints.
+    asyncpg reports the constraint name, SQLite only an error message.
+    """
+    constraint_name = getattr(error.orig.__cause__, "constraint_name", None)
+    if constraint_name:
+        return constraint_name in constraints
+
+    return any(constraint in str(error.orig) for constraint in constraints)
+
+
+class AuthRepository(IAuthRepository):
+    """
+    Entities loaded during a request are kept in session.info, so repeated
+    reads through the same session do not hit the database. Writes replace
+    the cached entities with the stored values.
+
+    With `user_cache` users are also shared between requests; an update
+    drops the user from it and publishes the invalidation to other workers.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_cache: UserCache | None = None,
+        broker_producer: IBrokerProducer | None = None,
+    ):
         self.session = session
+        self.user_cache = user_cache
+        self.broker_producer = broker_producer
+
+    @property
+    def _identity_cache(self) -> dict:
+        return self.session.info.setdefault("identity_cache", {})
+
+    def _cache_user(self, user: User | None) -> User | None:
+
+        if user is None:
+            return None
+
+        self._identity_cache[("user", user.id)] = user
+        self._identity_cache[("user_email", user.email.lower())] = user
+
+        # Наружу отдаем копию, чтобы изменения вызывающего кода не попадали в кеш
+        return replace(user)
+
+    def _cached_user(self, key: tuple) -> User | None:
+
+        user = self._identity_cache.get(key)
+        return replace(user) if user is not None else None
+
+    def _invalidate_user(self, user_id: UUID) -> None:
+
+        cached = self._identity_cache.pop(("user", user_id), None)
+        if cached is not None:
+            self._identity_cache.pop(("user_email", cached.email.lower()), None)
 
     def _to_user(self, user_model: UserModel) -> User:
         
@@ -33,6 +109,18 @@ class AuthRepository(IAuthRepository):
             image=user_model.image,
         )
 
+    def _user_values(self, user: User) -> dict:
+
+        return dict(
+            email=user.email,
+            password=user.password,
+            name=user.name,
+            surname=user.surname,
+            is_active=user.is_active,
+            timezone=user.timezone,
+            image=user.image,
+        )
+
 
     async def get_user(self, **fields) -> User | None:
         """
@@ -52,19 +140,166 @@ class AuthRepository(IAuthRepository):
         """
         try:
 
-            stmt = select(UserModel).filter_by(**fields)
-            result = await self.session.execute(stmt)
-            user = result.scalars().first()
+            stmt = select(*UserModel.__table__.c).filter_by(**fields).limit(1)
+            return await self._fetch_user(stmt)
+        
+        except Exception as e:
+            logger.error(f"Error getting user: {e}")
+            return None
+
+
+    async def get_user_by_id(self, user_id: UUID) -> User | None:
+        """
+        Get a user by primary key.
+        """
+        cached = self._cached_user(("user", user_id))
+        if cached is not None:
+            return cached
+
+        if self.user_cache:
+            user = await self.user_cache.get_by_id(user_id)
+            if user is not None:
+                return self._cache_user(user)
+
+        stmt = select(*UserModel.__table__.c).where(UserModel.__table__.c.id == user_id)
+        return await self._share_user(await self._fetch_user(stmt))
+
+
+    async def get_user_by_email(self, email: str) -> User | None:
+        """
+        Get a user by email, case-insensitive.
+        """
+        cached = self._cached_user(("user_email", email.lower()))
+        if cached is not None:
+            return cached
 
-            if not user:
+        if self.user_cache:
+            if self.user_cache.is_missing(email):
                 return None
-            
-            return self._to_user(user)
-        
+
+            user = await self.user_cache.get_by_email(email)
+            if user is not None:
+                return self._cache_user(user)
+
+        stmt = (
+            select(*UserModel.__table__.c)
+            .where(func.lower(UserModel.__table__.c.email) == email.lower())
+            .limit(1)
+        )
+        user = await self._fetch_user(stmt)
+
+        if user is None and self.user_cache:
+            # Реплика может отставать: промах кешируем, только если его подтвердил primary
+            if getattr(self.session.sync_session, "reads_from_replica", False):
+                user = await self._fetch_user(stmt, primary=True)
+
+            if user is None:
+                self.user_cache.mark_missing(email)
+
+        return await self._share_user(user)
+
+
+    async def get_user_emails(self) -> AsyncIterator[str]:
+        """
+        Stream the email of every user.
+        """
+        stmt = select(UserModel.__table__.c.email).execution_options(yield_per=1000)
+        result = await self.session.stream_scalars(stmt)
+
+        async for email in result:
+            yield email
+
+
+    async def user_exists(self, user_id: UUID, active_only: bool = False) -> bool:
+        """
+        Check the user exists without loading it.
+        """
+        cached = self._identity_cache.get(("user", user_id))
+        if cached is not None:
+            return cached.is_active or not active_only
+
+        stmt = select(literal(1)).where(UserModel.__table__.c.id == user_id)
+        if active_only:
+            stmt = stmt.where(UserModel.__table__.c.is_active.is_(True))
+
+        result = await self.session.execute(stmt.limit(1))
+        return result.scalar() is not None
+
+
+    async def _share_user(self, user: User | None) -> User | None:
+
+        if user is not None and self.user_cache:
+            await self.user_cache.set(user)
+
+        return self._cache_user(user)
+
+
+    async def _invalidate_shared_user(self, user: User) -> None:
+
+        if not self.user_cache:
+            return
+
+        await self.user_cache.invalidate(user.id)
+        await self._publish_user_event({"id": str(user.id), "email": user.email})
+
+
+    async def _register_shared_user(self, user: User) -> User:
+
+        if not self.user_cache:
+            return self._cache_user(user)
+
+        self.user_cache.add_email(user.email)
+        payload = {"id": str(user.id), "email": user.email, "created": True}
+
+        if self.user_cache.bloom_capacity and self.broker_producer:
+            # Воркер с Bloom фильтром без события считает email незарегистрированным
+            try:
+                delivery = await self.broker_producer.send_event(topic=USERS_TOPIC, payload=payload)
+                await delivery
+            except Exception as e:
+                logger.error(f"Error publishing user event: {e}")
+                await self._delete_registered_user(user)
+                raise ServiceUnavailableError("Could not register the user, try again later") from e
+        else:
+            await self._publish_user_event(payload)
+
+        return await self._share_user(user)
+
+
+    async def _delete_registered_user(self, user: User) -> None:
+
+        await self.session.execute(
+            delete(EmailVerificationModel.__table__).where(EmailVerificationModel.__table__.c.email == user.email)
+        )
+        await self.session.execute(delete(UserModel.__table__).where(UserModel.__table__.c.id == user.id))
+        await self.session.commit()
+
+        self._invalidate_user(user.id)
+        self._identity_cache.pop(("email_verification", user.email), None)
+
+
+    async def _publish_user_event(self, payload: dict) -> None:
+
+        if not self.broker_producer:
+            return
+
+        try:
+            await self.broker_producer.send_event(topic=USERS_TOPIC, payload=payload)
         except Exception as e:
-            print(f"Error getting user: {e}")
+            logger.error(f"Error publishing user event: {e}")
+
+
+    async def _fetch_user(self, stmt, primary: bool = False) -> User | None:
+
+        # Core select возвращает строки, без загрузки ORM объектов в identity map
+        bind_arguments = {"primary": True} if primary else None
+        row = (await self.session.execute(stmt, bind_arguments=bind_arguments)).first()
+
+        if not row:
             return None
 
+        return self._to_user(row)
+
 
     async def create_user(self, user: User) -> User:
         """
@@ -84,28 +319,60 @@ class AuthRepository(IAuthRepository):
         """
         try:
 
-            user_model = UserModel(
-                email=user.email,
-                password=user.password,
-                name=user.name,
-                surname=user.surname,
-                is_active=user.is_active,
-                timezone=user.timezone,
-                image=user.image,
-            )
-
-            self.session.add(user_model)
+            stmt = insert(UserModel.__table__).values(**self._user_values(user)).returning(*UserModel.__table__.c)
+            created_user = self._to_user((await self.session.execute(stmt)).one())
 
             await self.session.commit()
-            await self.session.refresh(user_model)
 
-            return self._to_user(user_model)
+            return await self._register_shared_user(created_user)
+
+        except IntegrityError as e:
+            await self.session.rollback()
+            if violates(e, USER_EMAIL_CONSTRAINTS):
+                raise DuplicateEntryError("User with this email already exists")
+            raise
+
+        except ServiceUnavailableError:
+            raise
         
         except Exception as e:
-            print(f"Error creating user: {e}")
+            logger.error(f"Error creating user: {e}")
             return None
 
 
+    async def create_user_with_verification(
+        self, user: User, email_verification: EmailVerification
+    ) -> tuple[User, EmailVerification]:
+        """
+        Create a user and its email verification in one transaction.
+        """
+        try:
+
+            stmt = insert(UserModel.__table__).values(**self._user_values(user)).returning(*UserModel.__table__.c)
+            created_user = self._to_user((await self.session.execute(stmt)).one())
+
+            await self.session.execute(
+                insert(EmailVerificationModel.__table__).values(
+                    email=email_verification.email,
+                    code=email_verification.code,
+                )
+            )
+
+            await self.session.commit()
+
+            self._identity_cache[("email_verification", email_verification.email)] = email_verification
+
+            return await self._register_shared_user(created_user), email_verification
+
+        except IntegrityError as e:
+            await self.session.rollback()
+            if violates(e, USER_EMAIL_CONSTRAINTS):
+                raise DuplicateEntryError("User with this email already exists")
+            if violates(e, VERIFICATION_EMAIL_CONSTRAINTS):
+                raise DuplicateEntryError("Verification with this email already exists")
+            raise
+
+
     async def update_user(self, user: User) -> User:
         """
         Update an existing user.
@@ -124,37 +391,42 @@ class AuthRepository(IAuthRepository):
         """
         try:
 
-            stmt = select(UserModel).filter_by(id=user.id)
-            result = await self.session.execute(stmt)
-            user_model = result.scalars().first()
+            stmt = (
+                update(UserModel.__table__)
+                .where(UserModel.id == user.id)
+                .values(**self._user_values(user))
+                .returning(*UserModel.__table__.c)
+            )
+            row = (await self.session.execute(stmt)).one_or_none()
+
+            self._invalidate_user(user.id)
 
-            if not user_model:
+            if not row:
                 raise NotFoundError(f"User with ID {user.id} not found")
 
-            user_model.email = user.email
-            user_model.password = user.password
-            user_model.name = user.name
-            user_model.surname = user.surname
-            user_model.is_active = user.is_active
-            user_model.timezone=user.timezone
-            user_model.image=user.image
+            updated_user = self._to_user(row)
 
             await self.session.commit()
-            await self.session.refresh(user_model)
 
-            return self._to_user(user_model)
+            await self._invalidate_shared_user(updated_user)
+
+            return self._cache_user(updated_user)
         
         except NotFoundError:
             raise
 
         except Exception as e:
-            print(f"Error updating user: {e}")
+            logger.error(f"Error updating user: {e}")
             return None
 
 
 
     async def get_email_verification(self, email: str) -> EmailVerification | None:
 
+        cached = self._identity_cache.get(("email_verification", email))
+        if cached is not None:
+            return cached
+
         try:
 
             stmt = select(EmailVerificationModel).filter_by(email=email)
@@ -164,13 +436,16 @@ class AuthRepository(IAuthRepository):
             if not emailverification_model:
                 return None
             
-            return EmailVerification(
+            email_verification = EmailVerification(
                 code=emailverification_model.code,
                 email=emailverification_model.email,
             )
+            self._identity_cache[("email_verification", email)] = email_verification
+
+            return email_verification
         
         except Exception as e:
-            print(f"Error getting email verification: {e}")
+            logger.error(f"Error getting email verification: {e}")
             return None
 
 
@@ -179,26 +454,33 @@ class AuthRepository(IAuthRepository):
 
         try:
 
-            emailverification_model = EmailVerificationModel(
-                email=emailverification.email,
-                code=emailverification.code,
+            await self.session.execute(
+                insert(EmailVerificationModel.__table__).values(
+                    email=emailverification.email,
+                    code=emailverification.code,
+                )
             )
 
-            self.session.add(emailverification_model)
-
             await self.session.commit()
-            await self.session.refresh(emailverification_model)
 
-            return EmailVerification(
-                code=emailverification_model.code,
-                email=emailverification_model.email,
+            email_verification = EmailVerification(
+                code=emailverification.code,
+                email=emailverification.email,
             )
+            self._identity_cache[("email_verification", email_verification.email)] = email_verification
+
+            return email_verification
+
+        except IntegrityError as e:
+            await self.session.rollback()
+            if violates(e, VERIFICATION_EMAIL_CONSTRAINTS):
+                raise DuplicateEntryError("Verification with this email already exists")
+            raise
         
         except Exception as e:
-            print(f"Error creating email verification: {e}")
+            logger.error(f"Error creating email verification: {e}")
             return None
 
-
     
 
 
@@ -207,14 +489,20 @@ class BannedRefreshTokenRepository(IBannedRefreshTokenRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create_banned_refresh_token(self, jti: UUID) -> None:
+    async def create_banned_refresh_token(self, jti: UUID, expires_at: datetime | None = None) -> None:
         """
         Create a banned refresh token.
         """
         try:
 
+            if expires_at is None:
+                expires_at = utc_now() + timedelta(days=settings.refresh_token_expire_days)
+            elif expires_at.tzinfo is not None:
+                expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+
             banned_token = BannedRefreshTokenModel(
                 jti=str(jti),
+                expires_at=expires_at,
             )
 
             self.session.add(banned_token)
@@ -222,10 +510,26 @@ class BannedRefreshTokenRepository(IBannedRefreshTokenRepository):
             await self.session.commit()
             await self.session.refresh(banned_token)
 
+        except IntegrityError as e:
+            await self.session.rollback()
+            if violates(e, BANNED_JTI_CONSTRAINTS):
+                raise DuplicateEntryError("Refresh token is already banned")
+            # Например, нет партиции для expires_at: бан не записан, вызов должен упасть
+            logger.error(f"Error creating banned refresh token: {e}")
+            raise
 
         except Exception as e:
-            print(f"Error creating user: {e}")
-            return None
+            await self.session.rollback()
+            logger.error(f"Error creating banned refresh token: {e}")
+            raise
+
+
+    async def delete_banned_refresh_token(self, jti: UUID) -> None:
+        """
+        Delete a banned refresh token.
+        """
+        await self.session.execute(delete(BannedRefreshTokenModel).filter_by(jti=str(jti)))
+        await self.session.commit()
 
 
     async def is_banned_refresh_token(self, jti: UUID) -> bool:
@@ -239,4 +543,37 @@ class BannedRefreshTokenRepository(IBannedRefreshTokenRepository):
         if banned_token:
             return True
         
-        return False
\ No newline at end of file
+        return False
+
+
+    async def get_banned_jtis(self) -> AsyncIterator[str]:
+        """
+        Stream the jti of every banned refresh token that is not expired.
+        """
+        stmt = (
+            select(BannedRefreshTokenModel.jti)
+            .filter(BannedRefreshTokenModel.expires_at > utc_now())
+            .execution_options(yield_per=1000)
+        )
+        result = await self.session.stream_scalars(stmt)
+
+        async for jti in result:
+            yield jti
+
+
+    async def delete_expired_banned_refresh_tokens(self, batch_size: int) -> int:
+        """
+        Delete one batch of expired banned refresh tokens.
+        """
+        expired = (
+            select(BannedRefreshTokenModel.id)
+            .filter(BannedRefreshTokenModel.expires_at <= utc_now())
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        stmt = delete(BannedRefreshTokenModel).filter(BannedRefreshTokenModel.id.in_(expired))
+
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+
+        return result.rowcount
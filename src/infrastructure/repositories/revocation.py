@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import AsyncIterator
+from uuid import UUID
+
+from core.cache import BloomFilter, LRUCache
+from core.exceptions import ServiceUnavailableError
+from core.Ibroker import IBrokerProducer
+from core.interfaceRepositories import IBannedRefreshTokenRepository
+from logger import get_logger
+from settings import get_settings
+
+logger = get_logger()
+settings = get_settings()
+
+
+BANNED_REFRESH_TOKENS_TOPIC = "banned_refresh_tokens"
+
+
+class RevocationCache:
+    """
+    Process-local view of banned refresh tokens.
+
+    The Bloom filter answers "definitely not banned" without a query,
+    the LRU keeps recent exact positives. Until `load` has finished
+    the cache is not ready and every lookup goes to the database.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, lru_size: int):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self.banned = LRUCache(maxsize=lru_size)
+        self.ready = False
+
+
+    async def load(self, repository: IBannedRefreshTokenRepository) -> None:
+        """
+        Rebuild the Bloom filter from every banned token in the table.
+        """
+        bloom = BloomFilter(capacity=self.capacity, error_rate=self.error_rate)
+
+        async for jti in repository.get_banned_jtis():
+            bloom.add(jti)
+
+        self.bloom = bloom
+        self.ready = True
+        logger.info(f"Revocation cache loaded {bloom.count} banned tokens.")
+
+
+    def add(self, jti: str) -> None:
+
+        self.bloom.add(jti)
+        self.banned.set(jti, True)
+
+
+    def disable(self) -> None:
+        """
+        Send every lookup to the database again, bans of other workers no longer arrive.
+        """
+        self.ready = False
+
+
+    def might_be_banned(self, jti: str) -> bool:
+
+        return not self.ready or jti in self.bloom
+
+
+    async def handle_event(self, payload: dict) -> None:
+
+        self.add(payload["jti"])
+
+
+class CachedBannedRefreshTokenRepository(IBannedRefreshTokenRepository):
+    """
+    Banned refresh token repository with the revocation cache in front.
+
+    New bans are published to other workers through the broker; a ban made
+    by another worker is visible here once its event has been consumed.
+    If the event is not acknowledged the ban is deleted again and the
+    call fails, so no stored ban is missing from other workers' filters.
+    """
+
+    def __init__(
+        self,
+        repository: IBannedRefreshTokenRepository,
+        cache: RevocationCache,
+        broker_producer: IBrokerProducer | None = None,
+    ):
+        self.repository = repository
+        self.cache = cache
+        self.broker_producer = broker_producer
+
+
+    async def create_banned_refresh_token(self, jti: UUID, expires_at: datetime | None = None) -> None:
+
+        # Событие после записи: воркер, загрузивший таблицу раньше записи, получит его
+        await self.repository.create_banned_refresh_token(jti=jti, expires_at=expires_at)
+
+        if self.broker_producer:
+            try:
+                delivery = await self.broker_producer.send_event(
+                    topic=BANNED_REFRESH_TOKENS_TOPIC, payload={"jti": str(jti)}
+                )
+                await delivery
+            except Exception as e:
+                # Без события другие воркеры не проверят базу для этого токена
+                logger.error(f"Error publishing banned token event: {e}")
+                await self.repository.delete_banned_refresh_token(jti=jti)
+                raise ServiceUnavailableError("Could not revoke the token, try again later") from e
+
+        self.cache.add(str(jti))
+
+
+    async def delete_banned_refresh_token(self, jti: UUID) -> None:
+
+        await self.repository.delete_banned_refresh_token(jti=jti)
+        self.cache.banned.delete(str(jti))
+
+
+    async def is_banned_refresh_token(self, jti: UUID) -> bool:
+
+        jti = str(jti)
+
+        if not self.cache.might_be_banned(jti):
+            return False
+
+        if self.cache.banned.get(jti):
+            return True
+
+        banned = await self.repository.is_banned_refresh_token(jti=jti)
+        if banned:
+            self.cache.banned.set(jti, True)
+
+        return banned
+
+
+    def get_banned_jtis(self) -> AsyncIterator[str]:
+
+        return self.repository.get_banned_jtis()
+
+
+    async def delete_expired_banned_refresh_tokens(self, batch_size: int) -> int:
+
+        return await self.repository.delete_expired_banned_refresh_tokens(batch_size=batch_size)
+
+
+revocation_cache = RevocationCache(
+    capacity=settings.revocation_bloom_capacity,
+    error_rate=settings.revocation_bloom_error_rate,
+    lru_size=settings.revocation_lru_size,
+)
@@ -0,0 +1,152 @@
+from dataclasses import replace
+from typing import AsyncIterator
+from uuid import UUID
+
+from core.cache import BloomFilter, LRUCache
+from core.entities import User
+from core.Icache import ICacheBackend
+from logger import get_logger
+from settings import get_settings
+
+from infrastructure.cache import LocalCacheBackend
+
+logger = get_logger()
+settings = get_settings()
+
+
+USERS_TOPIC = "users"
+
+
+class UserCache:
+    """
+    Users shared between requests.
+
+    A user is stored under its id, the email key only points to the id,
+    so dropping the id entry invalidates both lookups. Workers drop
+    updated users when they consume the event from USERS_TOPIC.
+
+    Emails that were looked up and not found are remembered for
+    `missing_ttl` seconds. With `bloom_capacity` a Bloom filter of every
+    registered email answers "not registered" without a query once `load`
+    has finished; new emails reach other workers through USERS_TOPIC.
+    Registration then fails unless its event is acknowledged, so a miss
+    in the filter can be trusted the same way as in the revocation cache.
+    """
+
+    def __init__(
+        self,
+        backend: ICacheBackend,
+        missing_ttl: float = 30,
+        missing_size: int = 100_000,
+        bloom_capacity: int | None = None,
+        bloom_error_rate: float = 0.001,
+    ):
+        self.backend = backend
+        self.missing = LRUCache(maxsize=missing_size, ttl=missing_ttl)
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.emails: BloomFilter | None = None
+        self.trust_misses = True
+
+
+    async def load(self, emails: AsyncIterator[str]) -> None:
+        """
+        Build the Bloom filter of registered emails.
+        """
+        if not self.bloom_capacity:
+            return
+
+        bloom = BloomFilter(capacity=self.bloom_capacity, error_rate=self.bloom_error_rate)
+
+        async for email in emails:
+            bloom.add(email.lower())
+
+        self.emails = bloom
+        logger.info(f"User email filter loaded {bloom.count} emails.")
+
+
+    def disable_misses(self) -> None:
+        """
+        Drop the email filter and the negative cache and stop filling them:
+        registrations on other workers no longer arrive.
+        """
+        self.trust_misses = False
+        self.emails = None
+        self.missing.clear()
+
+
+    def is_missing(self, email: str) -> bool:
+
+        if not self.trust_misses:
+            return False
+
+        email = email.lower()
+
+        if self.emails is not None and email not in self.emails:
+            return True
+
+        return self.missing.get(email) is not None
+
+
+    def mark_missing(self, email: str) -> None:
+
+        if self.trust_misses:
+            self.missing.set(email.lower(), True)
+
+
+    def add_email(self, email: str) -> None:
+
+        email = email.lower()
+        self.missing.delete(email)
+
+        if self.emails is not None:
+            self.emails.add(email)
+
+
+    async def get_by_id(self, user_id: UUID) -> User | None:
+
+        user = await self.backend.get(f"user:{user_id}")
+        return replace(user) if user is not None else None
+
+
+    async def get_by_email(self, email: str) -> User | None:
+
+        user_id = await self.backend.get(f"user_email:{email.lower()}")
+        if user_id is None:
+            return None
+
+        user = await self.get_by_id(user_id)
+
+        # Email мог смениться после того как ключ был записан
+        if user is None or user.email.lower() != email.lower():
+            return None
+
+        return user
+
+
+    async def set(self, user: User) -> None:
+
+        await self.backend.set(f"user:{user.id}", replace(user))
+        await self.backend.set(f"user_email:{user.email.lower()}", user.id)
+
+
+    async def invalidate(self, user_id: UUID | str) -> None:
+
+        await self.backend.delete(f"user:{user_id}")
+
+
+    async def handle_event(self, payload: dict) -> None:
+
+        if payload.get("created"):
+            self.add_email(payload["email"])
+        else:
+            await self.invalidate(payload["id"])
+
+
+user_cache = UserCache(
+    backend=LocalCacheBackend(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl),
+    missing_ttl=settings.user_missing_cache_ttl,
+    missing_size=settings.user_missing_cache_size,
+    bloom_capacity=settings.user_email_bloom_capacity if settings.user_email_bloom_enabled else None,
+    bloom_error_rate=settings.user_email_bloom_error_rate,
+)
@@ -1,28 +1,50 @@
-import jwt
+import math
+from contextlib import asynccontextmanager
 from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.services import AuthService, MailService
-from infrastructure.postgres_db import database
-from infrastructure.broker.producer import broker_producer
+from core.Iratelimit import IRateLimitBackend
+from core.services.tokens import decode_access_token
+from infrastructure.container import get_container
+from infrastructure.ratelimit import BACKENDS as RATE_LIMIT_BACKENDS
 from infrastructure.repositories import (
     AuthRepository,
     BannedRefreshTokenRepository,
+    CachedBannedRefreshTokenRepository,
+    revocation_cache,
+    user_cache,
 )
 from settings import get_settings
 
 settings = get_settings()
 
 
-async def get_auth_service(session: AsyncSession = Depends(database.get_db_session)):
-    auth_repository = AuthRepository(session)
-    token_repository = BannedRefreshTokenRepository(session)
+rate_limit_backend: IRateLimitBackend = RATE_LIMIT_BACKENDS[settings.rate_limit_algorithm](
+    maxsize=settings.rate_limit_max_keys
+)
+
+
+async def get_db_session():
+    # База создается контейнером при первом запросе, а не при импорте
+    async with asynccontextmanager(get_container().database.get_db_session)() as session:
+        yield session
+
+
+async def get_auth_service(session: AsyncSession = Depends(get_db_session)):
+    broker_producer = get_container().broker_producer
+    auth_repository = AuthRepository(session, user_cache=user_cache, broker_producer=broker_producer)
+    token_repository = CachedBannedRefreshTokenRepository(
+        BannedRefreshTokenRepository(session),
+        cache=revocation_cache,
+        broker_producer=broker_producer,
+    )
     service = AuthService(auth_repository, token_repository)
     yield service
 
 
 async def get_mail_service():
-    service = MailService(broker_producer=broker_producer)
+    service = MailService(broker_producer=get_container().broker_producer)
     yield service
 
 
@@ -31,18 +53,80 @@ class JWTBearer:
     async def __call__(self, request: Request):
         credentials = request.cookies.get("access_token")
         if credentials:
-            try:
-                payload = jwt.decode(
-                    credentials, settings.secret_key, algorithms=[settings.algorithm]
-                )
-                request.state.payload = payload
-                return payload
-            except jwt.PyJWTError:
+            payload = decode_access_token(credentials)
+            if payload is None:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Could not validate credentials",
                 )
+            request.state.payload = payload
+            return payload
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="No credentials provided"
-            )
\ No newline at end of file
+            )
+
+
+class RateLimiter:
+    """
+    Rejects a request with 429 once its client address, or the email
+    in its JSON body when `per_email` is set, has used up its limit.
+    Used as a route dependency, so it runs before the service is called.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        per_ip: int,
+        per_email: int | None = None,
+        period: float = settings.rate_limit_period,
+        backend: IRateLimitBackend | None = None,
+    ):
+        self.scope = scope
+        self.per_ip = per_ip
+        self.per_email = per_email
+        self.period = period
+        self.backend = backend
+
+    async def __call__(self, request: Request):
+        if not settings.rate_limit_enabled:
+            return
+
+        backend = self.backend or rate_limit_backend
+        limits = [(f"{self.scope}:ip:{self.client_address(request)}", self.per_ip)]
+
+        if self.per_email:
+            email = await self.request_email(request)
+            if email:
+                limits.append((f"{self.scope}:email:{email}", self.per_email))
+
+        for key, limit in limits:
+            retry_after = await backend.acquire(key, limit, self.period)
+            if retry_after:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests, try again later",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+    @staticmethod
+    def client_address(request: Request) -> str:
+        if settings.rate_limit_trust_forwarded:
+            forwarded = request.headers.get("X-Forwarded-For")
+            if forwarded:
+                # Каждый прокси дописывает адрес своего клиента справа, левые записи задает сам клиент
+                addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+                if addresses:
+                    return addresses[-min(settings.rate_limit_trusted_proxies, len(addresses))]
+
+        return request.client.host if request.client else "unknown"
+
+    @staticmethod
+    async def request_email(request: Request) -> str | None:
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+
+        email = body.get("email") if isinstance(body, dict) else None
+        return email.strip().lower() if isinstance(email, str) else None
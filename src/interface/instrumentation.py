@@ -0,0 +1,180 @@
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import Request
+
+from logger import correlation_id, get_logger
+from metrics import RequestStats, get_metrics, request_stats
+from settings import get_settings
+
+logger = get_logger()
+settings = get_settings()
+
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class SamplingProfiler:
+    """
+    Stack sampler for slow requests.
+
+    A `sample_rate` share of requests is profiled, one at a time: a thread
+    records the stack of the event loop thread every `interval` seconds.
+    If the request took longer than `threshold` seconds its collapsed
+    stacks are written to `output_dir` for flamegraph.pl or speedscope.
+    Samples show everything the loop ran meanwhile, other requests included.
+    """
+
+    def __init__(self, sample_rate: float, interval: float, threshold: float, output_dir: str):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.threshold = threshold
+        self.output_dir = Path(output_dir)
+        self.active = False
+
+
+    def should_profile(self) -> bool:
+
+        return not self.active and random.random() < self.sample_rate
+
+
+    @contextmanager
+    def profile(self, name: str):
+
+        self.active = True
+        stacks: Counter[str] = Counter()
+        stop = threading.Event()
+        thread_id = threading.get_ident()
+
+        def sample():
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    stacks[self._collapse(frame)] += 1
+
+        sampler = threading.Thread(target=sample, name="request-profiler", daemon=True)
+        sampler.start()
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+            self.active = False
+
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold and stacks:
+                self._dump(name, elapsed, stacks)
+
+
+    @staticmethod
+    def _collapse(frame) -> str:
+
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+            frame = frame.f_back
+
+        return ";".join(reversed(names))
+
+
+    def _dump(self, name: str, elapsed: float, stacks: Counter) -> None:
+
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^a-zA-Z0-9]+", "-", name).strip("-")
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            path = self.output_dir / f"{stamp}-{slug}-{elapsed * 1000:.0f}ms.folded"
+
+            path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+            logger.warning(f"Slow request {name} took {elapsed * 1000:.0f} ms, profile saved to {path}")
+
+        except OSError as e:
+            logger.error(f"Error saving request profile: {e}")
+
+
+profiler: SamplingProfiler | None = (
+    SamplingProfiler(
+        sample_rate=settings.profiler_sample_rate,
+        interval=settings.profiler_interval_ms / 1000,
+        threshold=settings.profiler_slow_request_ms / 1000,
+        output_dir=settings.profiler_output_dir,
+    )
+    if settings.profiler_enabled
+    else None
+)
+
+
+request_latency = get_metrics().histogram(
+    "http_request_duration_seconds", "HTTP request latency by route"
+)
+request_queries = get_metrics().histogram(
+    "http_request_db_queries", "SQL statements executed per request", buckets=QUERY_COUNT_BUCKETS
+)
+request_db_time = get_metrics().histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request"
+)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """
+    Per-route latency, query count and query time of every request.
+    """
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    started = time.perf_counter()
+    status_code = 500
+
+    try:
+        if profiler and profiler.should_profile():
+            with profiler.profile(f"{request.method} {request.url.path}"):
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
+
+        status_code = response.status_code
+        return response
+
+    finally:
+        # Шаблон пути, чтобы не плодить метки на каждый id
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+
+        request_latency.observe(
+            time.perf_counter() - started, method=request.method, route=path, status=status_code
+        )
+        request_queries.observe(stats.queries, route=path)
+        request_db_time.observe(stats.query_time, route=path)
+
+        request_stats.reset(token)
+
+
+async def correlation_id_middleware(request: Request, call_next):
+    """
+    Takes the request id from X-Request-ID or generates one,
+    every log record of the request carries it and it is returned to the client.
+    """
+    request_id = request.headers.get(REQUEST_ID_HEADER, "")
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid4().hex
+
+    token = correlation_id.set(request_id)
+    try:
+        response = await call_next(request)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    finally:
+        correlation_id.reset(token)
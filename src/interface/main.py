@@ -1,4 +1,6 @@
 import asyncio
+import os
+import signal
 
 from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse, JSONResponse
@@ -15,30 +17,99 @@ from core.exceptions import (
     TokenExpiredError,
     InvalidTokenError,
     InvalidRequestError,
+    ServiceUnavailableError,
 )
-from interface.routers import router
+from interface.routers import router, metrics_router
+from interface.instrumentation import correlation_id_middleware, metrics_middleware
+from core.services.password import get_password_hasher
+from core.services.tokens import token_cutoffs
 
-from infrastructure.broker.producer import broker_producer
-from infrastructure.broker.consumer import broker_consumer
+from infrastructure.container import get_container
+from infrastructure.compaction import BannedRefreshTokenCompactor
+from infrastructure.repositories import AuthRepository, BannedRefreshTokenRepository, revocation_cache, user_cache
+from infrastructure.repositories.revocation import BANNED_REFRESH_TOKENS_TOPIC
+from infrastructure.repositories.user_cache import USERS_TOPIC
+
+
+ACCESS_TOKEN_CUTOFFS_TOPIC = "access_token_cutoffs"
 
 
 settings = get_settings()
 logger = get_logger()
 
 
+async def publish_token_cutoff(user_id: str, cutoff: float) -> None:
+    try:
+        delivery = await get_container().broker_producer.send_event(
+            topic=ACCESS_TOKEN_CUTOFFS_TOPIC, payload={"sub": user_id, "cutoff": cutoff}
+        )
+        await delivery
+    except Exception as e:
+        # Без события другие воркеры продолжат принимать старые access токены
+        logger.error(f"Error publishing access token cutoff: {e}")
+        raise ServiceUnavailableError("Could not revoke access tokens, try again later") from e
+
+
+def events_stopped(task: asyncio.Task) -> None:
+    """
+    Without events this worker no longer sees bans, revoked access tokens
+    and registrations of other workers: stop trusting the caches and stop
+    the worker, the supervisor starts a new one that loads them again.
+    """
+    if task.cancelled():
+        return
+
+    logger.error(f"Event consumer stopped: {task.exception()!r}, caches disabled, stopping the worker")
+
+    revocation_cache.disable()
+    user_cache.disable_misses()
+
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    consumer_task = None
+    # Клиенты создаются здесь, внутри запущенного event loop, а не при импорте
+    container = get_container()
+    events_task = None
+    compaction_task = None
     try:
+        database = container.database
+        broker_producer = container.broker_producer
+        broker_event_consumer = container.broker_event_consumer
+
         # Инициализация Kafka Producer
         await broker_producer.open_connection()
         logger.info("Kafka Producer started.")
 
-        # Инициализация Kafka Consumer
-        await broker_consumer.open_connection()
-        logger.info("Kafka Consumer started.")
+        # Синхронизация кешей между воркерами. Позиции фиксируются до загрузки кешей,
+        # события, опубликованные во время загрузки, применятся сразу после нее
+        broker_event_consumer.subscribe(BANNED_REFRESH_TOKENS_TOPIC, revocation_cache.handle_event)
+        broker_event_consumer.subscribe(ACCESS_TOKEN_CUTOFFS_TOPIC, token_cutoffs.handle_event)
+        broker_event_consumer.subscribe(USERS_TOPIC, user_cache.handle_event)
+        token_cutoffs.listeners.append(publish_token_cutoff)
+        await broker_event_consumer.open_connection()
+        logger.info("Kafka Event Consumer started.")
+
+        # Загрузка кеша отозванных refresh токенов
+        async with database.session_factory() as session:
+            await revocation_cache.load(BannedRefreshTokenRepository(session))
+
+        # Bloom фильтр зарегистрированных email, если включен
+        async with database.session_factory() as session:
+            await user_cache.load(AuthRepository(session).get_user_emails())
+
+        # Очистка просроченных отозванных refresh токенов
+        compactor = BannedRefreshTokenCompactor(
+            database=database,
+            interval=settings.banned_tokens_compaction_interval,
+            batch_size=settings.banned_tokens_compaction_batch_size,
+            partitioned=settings.banned_tokens_partitioned,
+        )
+        compaction_task = asyncio.create_task(compactor.run())
 
-        consumer_task = asyncio.create_task(broker_consumer.consume_callback_message())
+        events_task = asyncio.create_task(broker_event_consumer.consume_events())
+        events_task.add_done_callback(events_stopped)
 
         yield  # Продолжаем выполнение FastAPI после успешного старта
 
@@ -48,18 +119,25 @@ async def lifespan(app: FastAPI):
 
     finally:
         # Гарантированное закрытие даже при ошибке
-        if consumer_task:
-            consumer_task.cancel()
+        if compaction_task:
+            compaction_task.cancel()
             try:
-                await consumer_task
+                await compaction_task
             except asyncio.CancelledError:
-                logger.info("Consumer task cancelled.")
+                logger.info("Compaction task cancelled.")
 
-        await broker_consumer.close_connection()
-        logger.info("Kafka Consumer stopped.")
+        if events_task:
+            events_task.cancel()
+            try:
+                await events_task
+            except asyncio.CancelledError:
+                logger.info("Event consumer task cancelled.")
+
+        await container.close()
+        logger.info("Kafka clients and database connections closed.")
 
-        await broker_producer.close_connection()
-        logger.info("Kafka Producer stopped.")
+        get_password_hasher().shutdown()
+        logger.info("Password hasher stopped.")
 
         raise
 
@@ -96,6 +174,8 @@ async def custom_exception_middleware(request: Request, call_next):
         return JSONResponse(status_code=401, content={"detail": str(e)})
     except InvalidRequestError as e:
         return JSONResponse(status_code=400, content={"detail": str(e)})
+    except ServiceUnavailableError as e:
+        return JSONResponse(status_code=503, content={"detail": str(e)})
     except Exception as e:
         logger.error(f"Unhandled error: {e}")
         return JSONResponse(
@@ -103,6 +183,11 @@ async def custom_exception_middleware(request: Request, call_next):
         )
 
 
+# Внешний слой: учитывает и ответы, сформированные обработчиком ошибок
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(correlation_id_middleware)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -112,4 +197,5 @@ app.add_middleware(
 )
 
 
-app.include_router(router, prefix="/api")
\ No newline at end of file
+app.include_router(router, prefix="/api")
+app.include_router(metrics_router)
\ No newline at end of file
@@ -1,7 +1,8 @@
 from .auth import router as auth_router
+from .metrics import router as metrics_router
 from fastapi import APIRouter
 
 router = APIRouter()
 router.include_router(auth_router)
 
-__all__ = [ "router"]
\ No newline at end of file
+__all__ = [ "router", "metrics_router"]
\ No newline at end of file
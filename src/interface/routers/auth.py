@@ -5,7 +5,8 @@ from fastapi import (
 )
 from core.entities.auth import Token, User
 from core.services import AuthService, MailService
-from interface.dependencies import get_auth_service, get_mail_service
+from core.services.tokens import key_ring
+from interface.dependencies import RateLimiter, get_auth_service, get_mail_service
 from interface.schemas.auth import UserLogin, UserCreate, UserResponse
 from settings import get_settings
 
@@ -13,7 +14,11 @@ settings = get_settings()
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimiter("register", per_ip=settings.rate_limit_register_per_ip))],
+)
 async def create_user(
     user: UserCreate,
     auth_service: AuthService = Depends(get_auth_service),
@@ -24,14 +29,25 @@ async def create_user(
     """
     user = User(**user.model_dump())
     
-    user = await auth_service.create_user(user)
-    email_verification = await auth_service.create_verify_code(user)
+    user, email_verification = await auth_service.register(user)
     await mail_service.send_verify_code(to=email_verification.email, code=email_verification.code)
 
     return UserResponse.model_validate(user)
 
 
-@router.post("/login", status_code=status.HTTP_200_OK)
+@router.post(
+    "/login",
+    status_code=status.HTTP_200_OK,
+    dependencies=[
+        Depends(
+            RateLimiter(
+                "login",
+                per_ip=settings.rate_limit_login_per_ip,
+                per_email=settings.rate_limit_login_per_email,
+            )
+        )
+    ],
+)
 async def login(
     response: Response,
     user_login: UserLogin,
@@ -70,7 +86,7 @@ async def verify(
     """
     Login a user and return a JWT token.
     """
-    user = await auth_service.get_user(email=email)
+    user = await auth_service.get_user_by_email(email)
     await auth_service.activate_user(user=user, code=code)
 
     return 
@@ -133,4 +149,12 @@ async def refresh(
         max_age=math.ceil(token.refresh_token.expires.total_seconds()),
     )
 
-    return
\ No newline at end of file
+    return
+
+
+@router.get("/.well-known/jwks.json", status_code=status.HTTP_200_OK)
+async def jwks():
+    """
+    Public keys for verifying tokens issued by this service.
+    """
+    return {"keys": key_ring.jwks()}
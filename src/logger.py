@@ -1,9 +1,157 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from settings import get_settings
 
 
 logger: logging.Logger | None = None
+listener: QueueListener | None = None
 LOGGER_LEVEL = logging.INFO
 
+settings = get_settings()
+
+# Идентификатор запроса, выставляется middleware и попадает в каждую запись
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """
+    Stamps the correlation id of the current request on the record.
+    Runs in the caller, before the record is queued, where the request
+    context is still set.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` ERROR records per call site every
+    `interval` seconds. The number of dropped records is appended
+    to the next record that passes.
+    """
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: dict[tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+
+        if record.levelno < logging.ERROR or self.burst <= 0:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+
+            window[1] += 1
+
+        if suppressed:
+            record.msg = f"{record.msg} (suppressed {suppressed} similar messages)"
+
+        return True
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare folds the traceback into msg. This one renders
+    only the message and keeps the traceback in exc_text, so the
+    formatter of the listener still sees it as a separate field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # Объект исключения с трассировкой не переносим между потоками
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _build_formatter() -> logging.Formatter:
+
+    if settings.log_format == "json":
+        return JSONFormatter()
+
+    return logging.Formatter(
+        "| %(asctime)s | [%(levelname)s | %(filename)s:%(lineno)s] %(message)s"
+    )
+
+
+def _start_listener(queue_handler: StructuredQueueHandler) -> None:
+    """
+    Output goes through a queue to a listener thread,
+    so logging never blocks the event loop on stdout.
+    """
+    global listener
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(_build_formatter())
+
+    queue_handler.queue = queue.SimpleQueue()
+    listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    listener.start()
+
+
+def _stop_listener() -> None:
+
+    if listener is not None:
+        listener.stop()
+
 
 def get_logger():
     """
@@ -12,12 +160,21 @@ def get_logger():
     global logger
     if not logger:
         logger = logging.getLogger()
-        logger.setLevel(LOGGER_LEVEL)
-        formatter = logging.Formatter(
-            "| %(asctime)s | [%(levelname)s | %(filename)s:%(lineno)s] %(message)s"
+        logger.setLevel(settings.log_level or LOGGER_LEVEL)
+
+        queue_handler = StructuredQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(CorrelationIdFilter())
+        queue_handler.addFilter(
+            ErrorRateLimitFilter(
+                burst=settings.log_error_burst, interval=settings.log_error_interval
+            )
         )
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
+        logger.addHandler(queue_handler)
+
+        _start_listener(queue_handler)
+        atexit.register(_stop_listener)
+
+        # Поток слушателя не переживает fork, в дочернем процессе запускаем новый
+        os.register_at_fork(after_in_child=lambda: _start_listener(queue_handler))
 
-    return logger
\ No newline at end of file
+    return logger
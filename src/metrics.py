@@ -0,0 +1,174 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable
+
+
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """
+    Latency histogram with cumulative buckets, split by label values.
+    """
+
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+
+    def observe(self, value: float, **labels) -> None:
+
+        key = tuple(sorted(labels.items()))
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+
+    @contextmanager
+    def time(self, **labels):
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+    def snapshot(self) -> dict[tuple, dict]:
+
+        with self._lock:
+            return {
+                key: {"buckets": list(series["buckets"]), "sum": series["sum"], "count": series["count"]}
+                for key, series in self._series.items()
+            }
+
+
+class Gauge:
+    """
+    Current value, either set directly or read from `function` on collection.
+    """
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] | None = None):
+        self.name = name
+        self.description = description
+        self.function = function
+        self.value = 0.0
+
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+    def collect(self) -> float:
+
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self.gauges: dict[str, Gauge] = {}
+        self._lock = threading.Lock()
+
+
+    def gauge(self, name: str, description: str = "", function: Callable[[], float] | None = None) -> Gauge:
+
+        with self._lock:
+            if name not in self.gauges:
+                self.gauges[name] = Gauge(name, description, function)
+            elif function is not None:
+                self.gauges[name].function = function
+            return self.gauges[name]
+
+
+    def histogram(self, name: str, description: str = "", buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, description, buckets)
+            return self.histograms[name]
+
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format.
+        """
+        lines = []
+
+        for gauge in list(self.gauges.values()):
+            lines.append(f"# HELP {gauge.name} {gauge.description}")
+            lines.append(f"# TYPE {gauge.name} gauge")
+            lines.append(f"{gauge.name} {gauge.collect()}")
+
+        for histogram in list(self.histograms.values()):
+            lines.append(f"# HELP {histogram.name} {histogram.description}")
+            lines.append(f"# TYPE {histogram.name} histogram")
+
+            for labels, series in histogram.snapshot().items():
+                for bound, count in zip(histogram.buckets, series["buckets"]):
+                    lines.append(f"{histogram.name}_bucket{_labels(labels, le=bound)} {count}")
+                lines.append(f"{histogram.name}_bucket{_labels(labels, le='+Inf')} {series['count']}")
+                lines.append(f"{histogram.name}_sum{_labels(labels)} {series['sum']}")
+                lines.append(f"{histogram.name}_count{_labels(labels)} {series['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple, **extra) -> str:
+
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@dataclass
+class RequestStats:
+    """
+    Work done while serving the current request.
+    """
+
+    queries: int = 0
+    query_time: float = 0.0
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+metrics: MetricsRegistry | None = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Возвращает глобальный реестр метрик
+    """
+    global metrics
+    if not metrics:
+        metrics = MetricsRegistry()
+
+    return metrics
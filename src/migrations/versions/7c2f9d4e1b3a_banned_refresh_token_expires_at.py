@@ -0,0 +1,39 @@
+"""Banned refresh token expires_at
+
+Revision ID: 7c2f9d4e1b3a
+Revises: 0ae1ad9d1a0c
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from settings import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f9d4e1b3a'
+down_revision: Union[str, None] = '0ae1ad9d1a0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('BannedRefreshTokens', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    # Existing tokens expire at most refresh_token_expire_days after they were banned
+    refresh_token_expire_days = get_settings().refresh_token_expire_days
+    op.execute(
+        'UPDATE "BannedRefreshTokens" '
+        f"SET expires_at = created_at + interval '{refresh_token_expire_days} days'"
+    )
+    op.alter_column('BannedRefreshTokens', 'expires_at', nullable=False)
+    op.create_index(op.f('ix_BannedRefreshTokens_expires_at'), 'BannedRefreshTokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_BannedRefreshTokens_expires_at'), table_name='BannedRefreshTokens')
+    op.drop_column('BannedRefreshTokens', 'expires_at')
@@ -0,0 +1,29 @@
+"""Users unique lower(email) index
+
+Revision ID: b41e8c0d5f27
+Revises: 7c2f9d4e1b3a
+Create Date: 2026-10-18 14:03:52.716904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e8c0d5f27'
+down_revision: Union[str, None] = '7c2f9d4e1b3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Падает, если в таблице уже есть email, отличающиеся только регистром
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,327 @@
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from logger import get_logger
+from settings import get_settings
+
+logger = get_logger()
+settings = get_settings()
+
+
+APP = "interface.main:app"
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Uvicorn server that reports to the supervisor once its lifespan
+    has finished and it accepts connections.
+    """
+
+    def __init__(self, config: uvicorn.Config, ready):
+        super().__init__(config)
+        self.ready = ready
+
+
+    async def startup(self, sockets=None) -> None:
+
+        await super().startup(sockets=sockets)
+        if self.started:
+            self.ready.set()
+
+
+def resolve(option: str, module: str) -> str:
+    """
+    "auto" becomes `module` if it is installed, "asyncio" / "h11" otherwise.
+    """
+    if option != "auto":
+        return option
+
+    if importlib.util.find_spec(module):
+        return module
+    return "asyncio" if module == "uvloop" else "h11"
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    One listening socket for all workers, bound before they start:
+    the kernel spreads connections between them and a restarted
+    worker accepts on the same socket without a gap.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app: str, sock: socket.socket, ready, loop: str, http: str) -> None:
+
+    # Обработчики супервизора унаследованы при fork, перезапуск - его забота
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    config = uvicorn.Config(
+        app,
+        loop=loop,
+        http=http,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keep_alive,
+        limit_concurrency=settings.server_limit_concurrency or None,
+        timeout_graceful_shutdown=settings.server_graceful_timeout,
+        # Логи uvicorn идут через корневой логгер приложения
+        log_config=None,
+        log_level=settings.log_level.lower() if settings.log_level else None,
+    )
+    WorkerServer(config, ready).run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Keeps `workers` server processes running on a shared socket.
+
+    A worker that exits on its own is replaced. After every failure, an
+    exit or a worker that did not start, the next start waits twice as
+    long, from `restart_backoff` up to `max_restart_backoff` seconds; the
+    count resets once all workers have run that long without failures.
+    After `max_failures` failures in a row the supervisor stops.
+
+    SIGHUP restarts the workers one at a time: the new worker has to
+    become ready before the old one is asked to stop, so capacity never
+    drops below `workers`. SIGINT/SIGTERM stop all workers gracefully.
+    """
+
+    def __init__(
+        self,
+        app: str,
+        sock: socket.socket,
+        workers: int,
+        loop: str,
+        http: str,
+        graceful_timeout: float,
+        startup_timeout: float,
+        restart_backoff: float = 1,
+        max_restart_backoff: float = 30,
+        max_failures: int = 5,
+        target=run_worker,
+    ):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.loop = loop
+        self.http = http
+        self.graceful_timeout = graceful_timeout
+        self.startup_timeout = startup_timeout
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.max_failures = max_failures
+        self.target = target
+        self.processes: list[multiprocessing.Process] = []
+        self.stopping = False
+        self.restart_requested = False
+        self.failures = 0
+        self.failed_at = float("-inf")
+
+
+    def spawn(self) -> tuple[multiprocessing.Process, bool]:
+        """
+        Start a worker, returns it and whether it became ready in time.
+        """
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(
+            target=self.target, args=(self.app, self.sock, ready, self.loop, self.http), name="api-worker"
+        )
+        process.start()
+
+        deadline = time.monotonic() + self.startup_timeout
+        while not ready.wait(0.1):
+            if not process.is_alive() or time.monotonic() > deadline:
+                return process, False
+
+        return process, True
+
+
+    def stop(self, *processes: multiprocessing.Process) -> None:
+        """
+        Ask workers to finish their requests, kill those still running after graceful_timeout.
+        """
+        for process in processes:
+            process.terminate()
+
+        deadline = time.monotonic() + self.graceful_timeout
+        for process in processes:
+            process.join(max(0, deadline - time.monotonic()))
+
+            if process.is_alive():
+                logger.error(f"Worker {process.pid} did not stop in {self.graceful_timeout} s, killing it")
+                process.kill()
+                process.join()
+
+
+    def rolling_restart(self) -> None:
+
+        logger.info(f"Restarting {len(self.processes)} workers one by one...")
+
+        for old in list(self.processes):
+            if self.stopping:
+                return
+
+            new, ready = self.spawn()
+            if not ready:
+                # Старые воркеры продолжают работать, пока новый код не запустится
+                logger.error(f"New worker {new.pid} failed to start, restart aborted")
+                self.stop(new)
+                return
+
+            self.processes.append(new)
+            self.processes.remove(old)
+            self.stop(old)
+            logger.info(f"Worker {old.pid} replaced by {new.pid}.")
+
+        logger.info("Rolling restart finished.")
+
+
+    def backoff(self) -> float:
+
+        if not self.failures:
+            return 0
+        return min(self.restart_backoff * 2 ** (self.failures - 1), self.max_restart_backoff)
+
+
+    def failed(self) -> bool:
+        """
+        Count a failure, returns whether the supervisor should give up.
+        """
+        self.failures += 1
+        self.failed_at = time.monotonic()
+        return self.failures >= self.max_failures
+
+
+    def replace_exited(self) -> bool:
+        """
+        Start workers in place of the exited ones, returns False when it gives up.
+        """
+        for process in list(self.processes):
+            if process.is_alive():
+                continue
+
+            logger.error(f"Worker {process.pid} exited with code {process.exitcode}")
+            self.processes.remove(process)
+            if self.failed():
+                logger.error(f"{self.failures} worker failures in a row, giving up")
+                return False
+
+        now = time.monotonic()
+        if len(self.processes) == self.workers:
+            if self.failures and now - self.failed_at > self.max_restart_backoff:
+                self.failures = 0
+            return True
+
+        # Новые воркеры запускаются не раньше, чем закончится пауза после последнего сбоя
+        if now < self.failed_at + self.backoff():
+            return True
+
+        while len(self.processes) < self.workers and not self.stopping:
+            new, ready = self.spawn()
+            if ready:
+                logger.info(f"Worker {new.pid} started.")
+                self.processes.append(new)
+                continue
+
+            self.stop(new)
+            if self.failed():
+                logger.error(f"New worker {new.pid} failed to start, {self.failures} failures in a row, giving up")
+                return False
+
+            logger.error(f"New worker {new.pid} failed to start, next attempt in {self.backoff()} s")
+            break
+
+        return True
+
+
+    def run(self) -> int:
+
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "restart_requested", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "stopping", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stopping", True))
+
+        for _ in range(self.workers):
+            process, ready = self.spawn()
+            self.processes.append(process)
+
+            # Приложение не стартует (ошибка конфигурации, недоступна база) - перезапуски не помогут
+            if not ready:
+                logger.error(f"Worker {process.pid} failed to start, shutting down")
+                self.stop(*self.processes)
+                self.sock.close()
+                return 1
+
+        logger.info(
+            f"Serving {self.app} on {self.sock.getsockname()} with {self.workers} workers "
+            f"(loop={self.loop}, http={self.http}, pid {os.getpid()})"
+        )
+
+        exit_code = 0
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            elif not self.replace_exited():
+                exit_code = 1
+                break
+            time.sleep(0.5)
+
+        logger.info("Stopping workers...")
+        self.stop(*self.processes)
+
+        self.sock.close()
+        logger.info("Server stopped.")
+        return exit_code
+
+
+def main(app: str, host: str, port: int, workers: int) -> int:
+
+    loop = resolve(settings.server_loop, "uvloop")
+    http = resolve(settings.server_http, "httptools")
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and settings.rate_limit_enabled:
+        logger.warning(
+            f"Rate limits are counted in every worker: with {workers} workers a client "
+            f"gets up to {workers} times RATE_LIMIT_* requests"
+        )
+
+    sock = bind_socket(host, port, settings.server_backlog)
+    return Supervisor(
+        app,
+        sock,
+        workers=workers,
+        loop=loop,
+        http=http,
+        graceful_timeout=settings.server_graceful_timeout,
+        startup_timeout=settings.server_startup_timeout,
+        restart_backoff=settings.server_restart_backoff,
+        max_failures=settings.server_max_failures,
+    ).run()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Production API server: N uvicorn workers on a shared socket")
+    parser.add_argument("--app", default=APP, help="ASGI application as module:attribute")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers, help="0 - CPU count")
+    args = parser.parse_args()
+
+    sys.exit(main(args.app, args.host, args.port, args.workers))
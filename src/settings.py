@@ -16,33 +16,175 @@ class Settings(BaseSettings):
     db_host: str = Field(os.environ.get("DB_HOST"))
     db_port: int = Field(os.environ.get("DB_PORT"))
     db_name: str = Field(os.environ.get("DB_NAME"))
+    db_url: str = Field(os.environ.get("DATABASE_URL", ""))
+    db_replica_urls: str = Field(os.environ.get("DB_REPLICA_URLS", ""))
+    db_pool_size: int = Field(os.environ.get("DB_POOL_SIZE", 5))
+    db_max_overflow: int = Field(os.environ.get("DB_MAX_OVERFLOW", 10))
+    db_pool_timeout: int = Field(os.environ.get("DB_POOL_TIMEOUT", 30))
+    db_pool_recycle: int = Field(os.environ.get("DB_POOL_RECYCLE", 1800))
+    db_pool_pre_ping: bool = Field(os.environ.get("DB_POOL_PRE_PING", True))
+    db_statement_cache_size: int = Field(
+        os.environ.get("DB_STATEMENT_CACHE_SIZE", 100)
+    )
 
     project_name: str = Field(os.environ.get("PROJECT_NAME"))
     project_description: str = Field(os.environ.get("PROJECT_DESCRIPTION"))
     project_version: str = Field(os.environ.get("PROJECT_VERSION"))
     is_debug_mode: bool = Field(os.environ.get("DEBUG_MODE"))
 
+    log_level: str = Field(os.environ.get("LOG_LEVEL", "INFO"))
+    log_format: str = Field(os.environ.get("LOG_FORMAT", "json"))
+    log_error_burst: int = Field(os.environ.get("LOG_ERROR_BURST", 10))
+    log_error_interval: int = Field(os.environ.get("LOG_ERROR_INTERVAL", 60))
+
     secret_key: str = Field(os.environ.get("SECRET_KEY"))
     algorithm: str = Field(os.environ.get("ALGORITHM"))
+    jwt_keys_dir: str = Field(os.environ.get("JWT_KEYS_DIR", ""))
+    jwt_active_kid: str = Field(os.environ.get("JWT_ACTIVE_KID", ""))
     access_token_expire_minutes: int = Field(
         os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES")
     )
     refresh_token_expire_days: int = Field(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS"))
+    access_token_stateless: bool = Field(
+        os.environ.get("ACCESS_TOKEN_STATELESS", True)
+    )
+    token_cache_size: int = Field(os.environ.get("TOKEN_CACHE_SIZE", 10_000))
+    token_cache_ttl: int = Field(os.environ.get("TOKEN_CACHE_TTL", 300))
+
+    password_hasher_mode: str = Field(os.environ.get("PASSWORD_HASHER_MODE", "thread"))
+    password_hasher_workers: int = Field(
+        os.environ.get("PASSWORD_HASHER_WORKERS", os.cpu_count())
+    )
+    password_hasher_max_queue: int = Field(
+        os.environ.get("PASSWORD_HASHER_MAX_QUEUE", 64)
+    )
+    password_bcrypt_rounds: int = Field(os.environ.get("PASSWORD_BCRYPT_ROUNDS", 12))
+
+    profiler_enabled: bool = Field(os.environ.get("PROFILER_ENABLED", False))
+    profiler_sample_rate: float = Field(os.environ.get("PROFILER_SAMPLE_RATE", 0.01))
+    profiler_interval_ms: int = Field(os.environ.get("PROFILER_INTERVAL_MS", 5))
+    profiler_slow_request_ms: int = Field(os.environ.get("PROFILER_SLOW_REQUEST_MS", 500))
+    profiler_output_dir: str = Field(os.environ.get("PROFILER_OUTPUT_DIR", "profiles"))
+
+    revocation_bloom_capacity: int = Field(
+        os.environ.get("REVOCATION_BLOOM_CAPACITY", 1_000_000)
+    )
+    revocation_bloom_error_rate: float = Field(
+        os.environ.get("REVOCATION_BLOOM_ERROR_RATE", 0.001)
+    )
+    revocation_lru_size: int = Field(os.environ.get("REVOCATION_LRU_SIZE", 10_000))
+
+    user_cache_size: int = Field(os.environ.get("USER_CACHE_SIZE", 10_000))
+    user_cache_ttl: int = Field(os.environ.get("USER_CACHE_TTL", 60))
+    user_missing_cache_ttl: int = Field(os.environ.get("USER_MISSING_CACHE_TTL", 30))
+    user_missing_cache_size: int = Field(
+        os.environ.get("USER_MISSING_CACHE_SIZE", 100_000)
+    )
+    user_email_bloom_enabled: bool = Field(
+        os.environ.get("USER_EMAIL_BLOOM_ENABLED", False)
+    )
+    user_email_bloom_capacity: int = Field(
+        os.environ.get("USER_EMAIL_BLOOM_CAPACITY", 1_000_000)
+    )
+    user_email_bloom_error_rate: float = Field(
+        os.environ.get("USER_EMAIL_BLOOM_ERROR_RATE", 0.001)
+    )
+
+    rate_limit_enabled: bool = Field(os.environ.get("RATE_LIMIT_ENABLED", True))
+    rate_limit_algorithm: str = Field(os.environ.get("RATE_LIMIT_ALGORITHM", "token_bucket"))
+    rate_limit_period: int = Field(os.environ.get("RATE_LIMIT_PERIOD", 60))
+    rate_limit_login_per_ip: int = Field(os.environ.get("RATE_LIMIT_LOGIN_PER_IP", 20))
+    rate_limit_login_per_email: int = Field(os.environ.get("RATE_LIMIT_LOGIN_PER_EMAIL", 5))
+    rate_limit_register_per_ip: int = Field(os.environ.get("RATE_LIMIT_REGISTER_PER_IP", 5))
+    rate_limit_max_keys: int = Field(os.environ.get("RATE_LIMIT_MAX_KEYS", 100_000))
+    rate_limit_trust_forwarded: bool = Field(
+        os.environ.get("RATE_LIMIT_TRUST_FORWARDED", False)
+    )
+    # Число доверенных прокси перед приложением, адрес клиента - столько записей X-Forwarded-For справа
+    rate_limit_trusted_proxies: int = Field(
+        os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", 1)
+    )
+
+    banned_tokens_compaction_interval: int = Field(
+        os.environ.get("BANNED_TOKENS_COMPACTION_INTERVAL", 3600)
+    )
+    banned_tokens_compaction_batch_size: int = Field(
+        os.environ.get("BANNED_TOKENS_COMPACTION_BATCH_SIZE", 1000)
+    )
+    banned_tokens_partitioned: bool = Field(
+        os.environ.get("BANNED_TOKENS_PARTITIONED", False)
+    )
 
     server_url: str = Field(os.environ.get("SERVER_URL"))
+    server_host: str = Field(os.environ.get("SERVER_HOST", "0.0.0.0"))
+    server_port: int = Field(os.environ.get("SERVER_PORT", 8000))
+    # 0 - по числу CPU. Лимиты RATE_LIMIT_* считаются в памяти каждого воркера,
+    # клиент получает до SERVER_WORKERS раз больше запросов
+    server_workers: int = Field(os.environ.get("SERVER_WORKERS", 0))
+    # auto выбирает uvloop и httptools, если они установлены
+    server_loop: str = Field(os.environ.get("SERVER_LOOP", "auto"))
+    server_http: str = Field(os.environ.get("SERVER_HTTP", "auto"))
+    server_backlog: int = Field(os.environ.get("SERVER_BACKLOG", 2048))
+    server_keep_alive: int = Field(os.environ.get("SERVER_KEEP_ALIVE", 5))
+    # 0 - без ограничения
+    server_limit_concurrency: int = Field(os.environ.get("SERVER_LIMIT_CONCURRENCY", 0))
+    server_graceful_timeout: int = Field(os.environ.get("SERVER_GRACEFUL_TIMEOUT", 30))
+    server_startup_timeout: int = Field(os.environ.get("SERVER_STARTUP_TIMEOUT", 30))
+    server_restart_backoff: float = Field(os.environ.get("SERVER_RESTART_BACKOFF", 1))
+    server_max_failures: int = Field(os.environ.get("SERVER_MAX_FAILURES", 5))
     kafka_bootstrap_servers: str = Field(
         os.environ.get("KAFKA_BOOTSTRAP_SERVERS")
     )
+    kafka_linger_ms: int = Field(os.environ.get("KAFKA_LINGER_MS", 5))
+    kafka_max_batch_size: int = Field(os.environ.get("KAFKA_MAX_BATCH_SIZE", 64 * 1024))
+    # lz4 и zstd требуют установленных пакетов lz4 / cramjam
+    kafka_compression_type: str = Field(os.environ.get("KAFKA_COMPRESSION_TYPE", ""))
+    kafka_enable_idempotence: bool = Field(
+        os.environ.get("KAFKA_ENABLE_IDEMPOTENCE", True)
+    )
+    kafka_acks: str = Field(os.environ.get("KAFKA_ACKS", "all"))
+
+    email_consumer_concurrency: int = Field(
+        os.environ.get("EMAIL_CONSUMER_CONCURRENCY", 10)
+    )
+    email_max_retries: int = Field(os.environ.get("EMAIL_MAX_RETRIES", 5))
+    email_retry_backoff: float = Field(os.environ.get("EMAIL_RETRY_BACKOFF", 1.0))
+    email_dead_letter_topic: str = Field(
+        os.environ.get("EMAIL_DEAD_LETTER_TOPIC", "email_notifications_dlq")
+    )
+    email_consumer_batch_mode: bool = Field(
+        os.environ.get("EMAIL_CONSUMER_BATCH_MODE", False)
+    )
+    email_consumer_batch_size: int = Field(
+        os.environ.get("EMAIL_CONSUMER_BATCH_SIZE", 100)
+    )
+    email_dedup_window: int = Field(os.environ.get("EMAIL_DEDUP_WINDOW", 60))
+    email_worker_processes: int = Field(os.environ.get("EMAIL_WORKER_PROCESSES", 1))
+    email_worker_shutdown_timeout: int = Field(
+        os.environ.get("EMAIL_WORKER_SHUTDOWN_TIMEOUT", 30)
+    )
 
     smtp_server: str = Field(os.environ.get("SMTP_SERVER"))
     smtp_port: str = Field(os.environ.get("SMTP_PORT"))
     smtp_username: str = Field(os.environ.get("SMTP_USERNAME"))
     smtp_password: str = Field(os.environ.get("SMTP_PASSWORD"))
     mail_from: str = Field(os.environ.get("MAIL_FROM"))
+    smtp_timeout: int = Field(os.environ.get("SMTP_TIMEOUT", 30))
+    smtp_pool_size: int = Field(os.environ.get("SMTP_POOL_SIZE", 4))
+    smtp_max_messages_per_connection: int = Field(
+        os.environ.get("SMTP_MAX_MESSAGES_PER_CONNECTION", 100)
+    )
+    smtp_keepalive: int = Field(os.environ.get("SMTP_KEEPALIVE", 30))
 
     @property
     def database_url(self) -> str:
+        if self.db_url:
+            return self.db_url
         return f"{self.db_engine}://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+
+    @property
+    def database_replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.db_replica_urls.split(",") if url.strip()]
         
 
 
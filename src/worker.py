@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from infrastructure.container import get_container
+from logger import get_logger
+from settings import get_settings
+
+logger = get_logger()
+settings = get_settings()
+
+
+async def run_worker(concurrency: int | None = None, batch_mode: bool | None = None) -> None:
+    """
+    Email delivery worker: consumes email_notifications and sends them over SMTP.
+    Runs until SIGINT/SIGTERM, then drains the messages in flight.
+    """
+    # Kafka клиенты создаются внутри запущенного event loop
+    container = get_container()
+    broker_consumer = container.broker_consumer
+    broker_producer = container.broker_producer
+
+    if concurrency:
+        broker_consumer.concurrency = concurrency
+    if batch_mode is not None:
+        broker_consumer.batch_mode = batch_mode
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    consumer_task = None
+    try:
+        # Producer нужен для dead letter топика
+        await broker_producer.open_connection()
+        logger.info("Kafka Producer started.")
+
+        await broker_consumer.open_connection()
+        logger.info("Kafka Consumer started.")
+
+        consumer_task = asyncio.create_task(broker_consumer.run())
+        stop_task = asyncio.create_task(stop.wait())
+
+        await asyncio.wait([consumer_task, stop_task], return_when=asyncio.FIRST_COMPLETED)
+        stop_task.cancel()
+
+    finally:
+        if consumer_task:
+            logger.info("Draining email worker...")
+            await broker_consumer.shutdown(consumer_task, timeout=settings.email_worker_shutdown_timeout)
+
+        await container.close()
+        logger.info("Kafka clients and SMTP connections closed.")
+
+
+def main(concurrency: int | None = None, batch_mode: bool | None = None) -> None:
+    asyncio.run(run_worker(concurrency=concurrency, batch_mode=batch_mode))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Email delivery worker")
+    parser.add_argument("--processes", type=int, default=settings.email_worker_processes)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--batch", action=argparse.BooleanOptionalAction, default=None)
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        main(args.concurrency, args.batch)
+    else:
+        # Каждый процесс - отдельный участник группы email_notification_group
+        processes = [
+            multiprocessing.Process(target=main, args=(args.concurrency, args.batch))
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+
+        signal.signal(signal.SIGTERM, lambda *_: [process.terminate() for process in processes])
+
+        for process in processes:
+            process.join()
@@ -6,6 +6,7 @@ pytest_plugins = [
     "tests.fixtures.auth.repositories",
     "tests.fixtures.auth.models",
     "tests.fixtures.infrastructure",
+    "tests.fixtures.broker",
     "src.core"
 ]
 
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 class FakeAuthRepository:
@@ -12,9 +14,72 @@ def fake_auth_repository():
 
 class FakeannedRefreshTokenRepository:
 
-   ...
+    def __init__(self):
+        self.jtis = set()
+        self.lookups = 0
+
+    async def create_banned_refresh_token(self, jti, expires_at=None):
+        self.jtis.add(str(jti))
+
+    async def delete_banned_refresh_token(self, jti):
+        self.jtis.discard(str(jti))
+
+    async def is_banned_refresh_token(self, jti):
+        self.lookups += 1
+        return str(jti) in self.jtis
+
+    async def get_banned_jtis(self):
+        for jti in list(self.jtis):
+            yield jti
+
+    async def delete_expired_banned_refresh_tokens(self, batch_size):
+        return 0
 
 @pytest.fixture  
 def fake_banned_refresh_token_repository():
 
-    return FakeannedRefreshTokenRepository()
\ No newline at end of file
+    return FakeannedRefreshTokenRepository()
+
+class FakeCacheBackend:
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def clear(self):
+        self.data.clear()
+
+@pytest.fixture
+def fake_cache_backend():
+
+    return FakeCacheBackend()
+
+
+class FakeBrokerProducer:
+
+    def __init__(self):
+        self.events = []
+        self.error: Exception | None = None
+
+    async def send_event(self, topic, payload):
+        if self.error:
+            raise self.error
+
+        self.events.append((topic, payload))
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_result(None)
+        return delivery
+
+@pytest.fixture
+def fake_broker_producer():
+
+    return FakeBrokerProducer()
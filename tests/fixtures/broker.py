@@ -0,0 +1,189 @@
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+from aiokafka import TopicPartition
+
+
+@dataclass
+class FakeKafkaMessage:
+
+    topic: str
+    partition: int
+    offset: int
+    value: object
+    key: bytes | None = None
+
+
+class FakeKafkaConsumer:
+    """
+    In-memory AIOKafkaConsumer: a list of messages per partition, positions
+    are resolved by `auto_offset_reset` on first use, as aiokafka does.
+    """
+
+    def __init__(self, auto_offset_reset: str = "latest"):
+        self.auto_offset_reset = auto_offset_reset
+        self.log: dict[TopicPartition, list[FakeKafkaMessage]] = {}
+        self.positions: dict[TopicPartition, int] = {}
+        self.committed: dict[TopicPartition, int] = {}
+        self.subscribed: list[str] = []
+        self.listener = None
+        self.started = False
+        self.stopped = False
+
+    def create_topic(self, topic: str, partitions: int = 1) -> None:
+        for partition in range(partitions):
+            self.log.setdefault(TopicPartition(topic, partition), [])
+
+    def publish(self, topic: str, value, key: bytes | None = None, partition: int = 0) -> FakeKafkaMessage:
+        self.create_topic(topic, partition + 1)
+        messages = self.log[TopicPartition(topic, partition)]
+        message = FakeKafkaMessage(topic=topic, partition=partition, offset=len(messages), value=value, key=key)
+        messages.append(message)
+        return message
+
+    def subscribe(self, topics, listener=None):
+        self.subscribed = list(topics)
+        self.listener = listener
+
+    async def start(self):
+        self.started = True
+
+    async def stop(self):
+        self.stopped = True
+
+    async def topics(self):
+        return {partition.topic for partition in self.log}
+
+    def partitions_for_topic(self, topic):
+        return {partition.partition for partition in self.log if partition.topic == topic} or None
+
+    def assignment(self):
+        return {partition for partition in self.log if partition.topic in self.subscribed}
+
+    async def seek_to_end(self, *partitions):
+        for partition in partitions:
+            self.positions[partition] = len(self.log[partition])
+
+    async def position(self, partition):
+        return self._position(partition)
+
+    def seek(self, partition, offset):
+        self.positions[partition] = offset
+
+    async def commit(self, offsets=None):
+        self.committed.update(offsets or {})
+
+    def _position(self, partition):
+        if partition not in self.positions:
+            self.positions[partition] = len(self.log[partition]) if self.auto_offset_reset == "latest" else 0
+        return self.positions[partition]
+
+    async def getmany(self, timeout_ms=0, max_records=None):
+        batches = {}
+        for partition in sorted(self.assignment()):
+            position = self._position(partition)
+            records = self.log[partition][position:position + (max_records or len(self.log[partition]))]
+            if records:
+                batches[partition] = records
+                self.positions[partition] = position + len(records)
+
+        if not batches:
+            await asyncio.sleep(timeout_ms / 1000)
+        return batches
+
+    async def __aiter__(self):
+        while True:
+            for partition in sorted(self.assignment()):
+                position = self._position(partition)
+                if position < len(self.log[partition]):
+                    self.positions[partition] = position + 1
+                    yield self.log[partition][position]
+                    break
+            else:
+                await asyncio.sleep(0.001)
+
+
+class FakeKafkaProducer:
+    """
+    AIOKafkaProducer that records sent messages, `send` raises `error` when it is set.
+    With `auto_ack=False` delivery futures stay pending in `deliveries`
+    until the test resolves them, like a batch waiting for linger_ms.
+    """
+
+    def __init__(self):
+        self.sent: list[dict] = []
+        self.deliveries: list[asyncio.Future] = []
+        self.error: Exception | None = None
+        self.auto_ack = True
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def send(self, topic, value=None, key=None, headers=None):
+        if self.error:
+            raise self.error
+
+        self.sent.append({"topic": topic, "value": value, "key": key, "headers": headers})
+        delivery = asyncio.get_running_loop().create_future()
+        if self.auto_ack:
+            delivery.set_result(None)
+        self.deliveries.append(delivery)
+        return delivery
+
+
+class FakeMailer:
+    """
+    AsyncSMTPMailer that records delivered emails. `failures` maps an email
+    address to the number of sends that fail before one succeeds.
+    """
+
+    def __init__(self):
+        self.sent: list = []
+        self.failures: dict[str, int] = {}
+        self.sessions = 0
+
+    def _send(self, email_message):
+        if self.failures.get(email_message.email):
+            self.failures[email_message.email] -= 1
+            raise OSError(f"Connection to SMTP server lost while sending to {email_message.email}")
+
+        self.sent.append(email_message)
+
+    async def send_email(self, email_message):
+        self._send(email_message)
+
+    async def send_many(self, email_messages):
+        self.sessions += 1
+        results = []
+        for email_message in email_messages:
+            try:
+                self._send(email_message)
+                results.append(None)
+            except OSError as e:
+                results.append(e)
+        return results
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_kafka_consumer():
+
+    return FakeKafkaConsumer()
+
+
+@pytest.fixture
+def fake_kafka_producer():
+
+    return FakeKafkaProducer()
+
+
+@pytest.fixture
+def fake_mailer():
+
+    return FakeMailer()
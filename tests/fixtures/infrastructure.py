@@ -38,4 +38,13 @@ async def get_db_session() :
         await session.rollback()
         raise
     finally:
-        await session.close()
\ No newline at end of file
+        await session.close()
+
+@pytest_asyncio.fixture(scope="function")
+async def database():
+    """
+    Stands in for infrastructure.postgres_db.Database over the test engine.
+    """
+    from types import SimpleNamespace
+
+    return SimpleNamespace(engine=engine, session_factory=AsyncSessionFactory)
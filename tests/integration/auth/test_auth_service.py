@@ -65,3 +65,162 @@ async def test_login__success(auth_service):
     token = await auth_service.login(email, password)
     
     assert token != None
+
+
+async def test_register__duplicate(auth_service):
+
+    email = fake.email()
+
+    db_user, verification = await auth_service.register(User(email=email, password=fake.name()))
+
+    assert db_user.id != None
+    assert verification.email == email
+
+    with pytest.raises(Exception) as exc_info:
+        await auth_service.register(User(email=email, password=fake.name()))
+
+    assert exc_info.value.args[0] == 'User with this email already exists'
+
+
+async def test_get_user_by_email__case_insensitive(auth_service):
+
+    email = fake.email()
+
+    db_user = await auth_service.create_user(User(email=email, password=fake.name()))
+
+    found_user = await auth_service.get_user_by_email(email.upper())
+
+    assert found_user.id == db_user.id
+    assert await auth_service.auth_repository.user_exists(db_user.id) == True
+    assert await auth_service.auth_repository.user_exists(db_user.id, active_only=True) == False
+
+
+async def test_identity_cache__invalidated_on_write(auth_service):
+
+    repository = auth_service.auth_repository
+    db_user = await auth_service.create_user(User(email=fake.email(), password=fake.name()))
+
+    user = await repository.get_user_by_id(db_user.id)
+    user.is_active = True
+
+    assert ("user", db_user.id) in repository.session.info["identity_cache"]
+    assert (await repository.get_user_by_id(db_user.id)).is_active == False
+
+    await repository.update_user(user)
+
+    assert (await repository.get_user_by_email(db_user.email)).is_active == True
+
+
+async def test_login__unknown_email(auth_service):
+
+    with pytest.raises(Exception) as exc_info:
+        await auth_service.login(fake.email(), fake.name())
+
+    assert exc_info.value.args[0] == 'Invalid email or password'
+
+
+async def test_banned_refresh_token_repository__delete(get_db_session):
+    from uuid import uuid4
+    from src.infrastructure.repositories import BannedRefreshTokenRepository
+
+    repository = BannedRefreshTokenRepository(get_db_session)
+    jti = uuid4()
+
+    await repository.create_banned_refresh_token(jti)
+    assert await repository.is_banned_refresh_token(jti)
+
+    await repository.delete_banned_refresh_token(jti)
+    assert not await repository.is_banned_refresh_token(jti)
+
+
+async def test_register__duplicate_email_other_case(auth_service):
+
+    email = fake.email()
+    await auth_service.register(User(email=email, password=fake.name()))
+
+    with pytest.raises(Exception) as exc_info:
+        await auth_service.register(User(email=email.upper(), password=fake.name()))
+
+    assert exc_info.value.args[0] == 'User with this email already exists'
+
+
+async def test_create_user__other_integrity_errors_are_not_duplicates(get_db_session):
+    from sqlalchemy.exc import IntegrityError
+    from src.infrastructure.repositories import AuthRepository
+
+    repository = AuthRepository(get_db_session)
+
+    # NOT NULL, а не уникальность email
+    with pytest.raises(IntegrityError):
+        await repository.create_user(User(email=fake.email(), password=fake.name(), name=None))
+
+
+async def test_create_email_verification__code_collision_is_not_duplicate_email(get_db_session):
+    from uuid import uuid4
+    from sqlalchemy.exc import IntegrityError
+    from src.core.entities.auth import EmailVerification
+    from src.infrastructure.repositories import AuthRepository
+
+    repository = AuthRepository(get_db_session)
+    email = fake.email()
+    code = uuid4()
+
+    await repository.create_email_verification(EmailVerification(email=email, code=code))
+
+    with pytest.raises(Exception) as exc_info:
+        await repository.create_email_verification(EmailVerification(email=email, code=uuid4()))
+    assert exc_info.value.args[0] == 'Verification with this email already exists'
+
+    with pytest.raises(IntegrityError):
+        await repository.create_email_verification(EmailVerification(email=fake.email(), code=code))
+
+
+async def test_create_banned_refresh_token__duplicate_jti(get_db_session):
+    from uuid import uuid4
+    from src.infrastructure.repositories import BannedRefreshTokenRepository
+
+    repository = BannedRefreshTokenRepository(get_db_session)
+    jti = uuid4()
+
+    await repository.create_banned_refresh_token(jti)
+
+    with pytest.raises(Exception) as exc_info:
+        await repository.create_banned_refresh_token(jti)
+    assert exc_info.value.args[0] == 'Refresh token is already banned'
+
+
+async def test_create_banned_refresh_token__insert_error_propagates(get_db_session, monkeypatch):
+    from uuid import uuid4
+    from sqlalchemy.exc import OperationalError
+    from src.infrastructure.repositories import BannedRefreshTokenRepository
+
+    repository = BannedRefreshTokenRepository(get_db_session)
+    jti = uuid4()
+
+    async def failing_commit():
+        raise OperationalError("INSERT", {}, Exception("no partition of relation found for row"))
+
+    with monkeypatch.context() as patch:
+        patch.setattr(get_db_session, "commit", failing_commit)
+        with pytest.raises(OperationalError):
+            await repository.create_banned_refresh_token(jti)
+
+    assert not await repository.is_banned_refresh_token(jti)
+
+
+async def test_logout__twice(auth_service):
+
+    email = fake.email()
+    password = fake.name()
+
+    db_user = await auth_service.create_user(User(email=email, password=password))
+    verification = await auth_service.create_verify_code(db_user)
+    await auth_service.activate_user(code=verification.code, user=db_user)
+    token = await auth_service.login(email, password)
+
+    await auth_service.logout(token.refresh_token.token)
+    await auth_service.logout(token.refresh_token.token)
+
+    with pytest.raises(Exception) as exc_info:
+        await auth_service.refresh(token.refresh_token.token)
+    assert exc_info.value.args[0] == 'Token is banned'
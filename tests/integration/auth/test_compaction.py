@@ -0,0 +1,74 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from src.infrastructure.compaction import BannedRefreshTokenCompactor
+from src.infrastructure.repositories import BannedRefreshTokenRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+async def ban(repository, expires_in: timedelta):
+
+    jti = uuid4()
+    await repository.create_banned_refresh_token(jti, expires_at=datetime.now(timezone.utc) + expires_in)
+    return jti
+
+
+async def test_delete_expired_banned_refresh_tokens__keeps_live_rows(get_db_session):
+
+    repository = BannedRefreshTokenRepository(get_db_session)
+    await repository.delete_expired_banned_refresh_tokens(batch_size=1000)
+
+    expired = [await ban(repository, -timedelta(minutes=1)) for _ in range(3)]
+    live = await ban(repository, timedelta(days=1))
+
+    assert await repository.delete_expired_banned_refresh_tokens(batch_size=2) == 2
+    assert await repository.delete_expired_banned_refresh_tokens(batch_size=2) == 1
+    assert await repository.delete_expired_banned_refresh_tokens(batch_size=2) == 0
+
+    assert not any([await repository.is_banned_refresh_token(jti) for jti in expired])
+    assert await repository.is_banned_refresh_token(live)
+
+
+async def test_compactor__deletes_expired_in_batches(get_db_session, database):
+
+    repository = BannedRefreshTokenRepository(get_db_session)
+    await repository.delete_expired_banned_refresh_tokens(batch_size=1000)
+
+    expired = [await ban(repository, -timedelta(minutes=1)) for _ in range(5)]
+    live = await ban(repository, timedelta(days=1))
+
+    compactor = BannedRefreshTokenCompactor(
+        database=database, batch_size=2, batch_pause=0
+    )
+
+    assert await compactor.compact() == True
+    assert not any([await repository.is_banned_refresh_token(jti) for jti in expired])
+    assert await repository.is_banned_refresh_token(live)
+
+
+async def test_compactor__skips_round_without_lock(get_db_session, database):
+
+    repository = BannedRefreshTokenRepository(get_db_session)
+    expired = await ban(repository, -timedelta(minutes=1))
+
+    compactor = BannedRefreshTokenCompactor(database=database)
+
+    @asynccontextmanager
+    async def held_by_other_worker():
+        yield False
+
+    compactor.lock = held_by_other_worker
+
+    assert await compactor.compact() == False
+    assert await repository.is_banned_refresh_token(expired)
+
+
+async def test_compactor__partitions_cover_refresh_token_lifetime(database):
+    from src.settings import get_settings
+
+    compactor = BannedRefreshTokenCompactor(database=database)
+
+    assert compactor.partitions_ahead == get_settings().refresh_token_expire_days + 1
@@ -0,0 +1,177 @@
+import json
+import pytest
+from faker import Faker
+
+from src.core.entities.auth import User
+
+pytestmark = pytest.mark.asyncio
+
+fake = Faker()
+
+
+@pytest.fixture
+def cached_auth_repository(get_db_session, fake_cache_backend, fake_broker_producer):
+    from src.infrastructure.repositories import AuthRepository, UserCache
+
+    return AuthRepository(
+        session=get_db_session,
+        user_cache=UserCache(fake_cache_backend),
+        broker_producer=fake_broker_producer,
+    )
+
+
+async def test_user_cache__shared_between_requests(cached_auth_repository, fake_cache_backend):
+
+    db_user = await cached_auth_repository.create_user(User(email=fake.email(), password=fake.name()))
+    fake_cache_backend.data[f"user:{db_user.id}"].name = "cached"
+
+    # Новый запрос: кеш сессии пуст
+    cached_auth_repository.session.info.clear()
+
+    user = await cached_auth_repository.get_user_by_email(db_user.email.upper())
+
+    assert user.id == db_user.id
+    assert user.name == "cached"
+
+
+async def test_user_cache__invalidated_on_update(cached_auth_repository, fake_cache_backend, fake_broker_producer):
+
+    db_user = await cached_auth_repository.create_user(User(email=fake.email(), password=fake.name()))
+    user = await cached_auth_repository.get_user_by_id(db_user.id)
+
+    assert f"user:{db_user.id}" in fake_cache_backend.data
+
+    user.is_active = True
+    await cached_auth_repository.update_user(user)
+
+    assert f"user:{db_user.id}" not in fake_cache_backend.data
+    assert fake_broker_producer.events[-1] == ("users", {"id": str(db_user.id), "email": db_user.email})
+
+
+async def test_user_cache__missing_email(cached_auth_repository, get_db_session, fake_broker_producer):
+    from src.infrastructure.repositories import AuthRepository
+
+    email = fake.email()
+
+    assert await cached_auth_repository.get_user_by_email(email) is None
+    assert cached_auth_repository.user_cache.is_missing(email)
+
+    # Создан в обход кеша: до истечения TTL email считается несуществующим
+    await AuthRepository(session=get_db_session).create_user(User(email=email, password=fake.name()))
+    cached_auth_repository.session.info.clear()
+
+    assert await cached_auth_repository.get_user_by_email(email) is None
+
+    # Событие о регистрации из другого воркера
+    await cached_auth_repository.user_cache.handle_event({"id": "", "email": email, "created": True})
+
+    assert (await cached_auth_repository.get_user_by_email(email)).email == email
+
+
+async def test_user_cache__email_bloom_filter(cached_auth_repository, fake_broker_producer):
+
+    user_cache = cached_auth_repository.user_cache
+    user_cache.bloom_capacity = 1000
+
+    db_user = await cached_auth_repository.create_user(User(email=fake.email(), password=fake.name()))
+    await user_cache.load(cached_auth_repository.get_user_emails())
+
+    assert not user_cache.is_missing(db_user.email.upper())
+    assert user_cache.is_missing(fake.email())
+
+    new_user = await cached_auth_repository.create_user(User(email=fake.email(), password=fake.name()))
+
+    assert not user_cache.is_missing(new_user.email)
+    assert fake_broker_producer.events[-1] == ("users", {"id": str(new_user.id), "email": new_user.email, "created": True})
+
+
+async def test_user_cache__registration_fails_without_event(cached_auth_repository, get_db_session, fake_broker_producer):
+    from uuid import uuid4
+    from core.exceptions import ServiceUnavailableError
+    from src.core.entities.auth import EmailVerification
+    from src.infrastructure.repositories import AuthRepository
+
+    cached_auth_repository.user_cache.bloom_capacity = 1000
+    await cached_auth_repository.user_cache.load(cached_auth_repository.get_user_emails())
+    fake_broker_producer.error = ConnectionError("broker is down")
+    email = fake.email()
+
+    with pytest.raises(ServiceUnavailableError):
+        await cached_auth_repository.create_user_with_verification(
+            User(email=email, password=fake.name()), EmailVerification(email=email, code=uuid4())
+        )
+
+    # Другие воркеры не узнали бы об этом email, регистрация отменена
+    repository = AuthRepository(session=get_db_session)
+
+    assert await repository.get_user_by_email(email) is None
+    assert await repository.get_email_verification(email) is None
+
+
+async def test_user_cache__registration_during_startup(fake_cache_backend, fake_kafka_consumer):
+    import asyncio
+    from src.infrastructure.broker.events import BrokerEventConsumer
+    from src.infrastructure.repositories import UserCache
+    from src.infrastructure.repositories.user_cache import USERS_TOPIC
+
+    async def no_emails():
+        return
+        yield
+
+    fake_kafka_consumer.create_topic(USERS_TOPIC)
+    user_cache = UserCache(fake_cache_backend, bloom_capacity=1000)
+    events = BrokerEventConsumer(consumer=fake_kafka_consumer)
+    events.subscribe(USERS_TOPIC, user_cache.handle_event)
+
+    await events.open_connection()
+    await user_cache.load(no_emails())
+
+    # Регистрация на другом воркере, когда таблица уже прочитана
+    email = fake.email()
+    fake_kafka_consumer.publish(USERS_TOPIC, json.dumps({"id": "", "email": email, "created": True}).encode())
+
+    assert user_cache.is_missing(email)
+
+    task = asyncio.create_task(events.consume_events())
+    try:
+        for _ in range(100):
+            if not user_cache.is_missing(email):
+                break
+            await asyncio.sleep(0.001)
+    finally:
+        task.cancel()
+
+    assert not user_cache.is_missing(email)
+
+
+async def test_user_cache__replica_miss_checked_on_primary(tmp_path, fake_cache_backend):
+    from src.infrastructure.postgres_db import Database
+    from src.infrastructure.repositories import AuthRepository, UserCache
+    from src.migrations.base import Base
+
+    database = Database(
+        f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+    )
+    for engine in [database.engine, *database.replica_engines]:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        # Запись есть только на primary: реплика еще не догнала
+        email = fake.email()
+        async with database.session_factory() as session:
+            await AuthRepository(session=session).create_user(User(email=email, password=fake.name()))
+
+        async with database.session_factory() as session:
+            repository = AuthRepository(session=session, user_cache=UserCache(fake_cache_backend))
+
+            assert (await repository.get_user_by_email(email)).email == email
+            assert not repository.user_cache.is_missing(email)
+
+            unknown = fake.email()
+            assert await repository.get_user_by_email(unknown) is None
+            assert repository.user_cache.is_missing(unknown)
+            assert session.sync_session.pinned == False
+    finally:
+        await database.dispose()
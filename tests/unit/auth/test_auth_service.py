@@ -45,4 +45,39 @@ async def test_generate_refresh_token__success(mock_auth_service):
     current_time = datetime.datetime.now(tz=datetime.UTC)
 
     assert (decoded_token_expire - current_time) > datetime.timedelta(minutes=refresh_token_expire_minutes - 1)
-    assert decoded_refresh_token['sub'] == data['sub']
\ No newline at end of file
+    assert decoded_refresh_token['sub'] == data['sub']
+
+async def test_verify_access_token__stateless(mock_auth_service):
+
+    access_token = mock_auth_service.create_access_token({"sub": str(uuid4()), "active": True}).token
+
+    assert await mock_auth_service.verify_access_token(access_token) == True
+
+
+async def test_verify_access_token__revoked(mock_auth_service):
+    from src.core.services.auth import token_cutoffs
+
+    user_id = str(uuid4())
+    access_token = mock_auth_service.create_access_token({"sub": user_id, "active": True}).token
+
+    await token_cutoffs.revoke(user_id)
+
+    assert await mock_auth_service.verify_access_token(access_token) == None
+
+
+async def test_verify_access_token__issued_right_after_revoke(mock_auth_service):
+    from src.core.services.auth import token_cutoffs
+
+    user_id = str(uuid4())
+    await token_cutoffs.revoke(user_id)
+
+    access_token = mock_auth_service.create_access_token({"sub": user_id, "active": True}).token
+
+    assert await mock_auth_service.verify_access_token(access_token) == True
+
+
+async def test_verify_access_token__inactive(mock_auth_service):
+
+    access_token = mock_auth_service.create_access_token({"sub": str(uuid4()), "active": False}).token
+
+    assert await mock_auth_service.verify_access_token(access_token) == None
@@ -0,0 +1,137 @@
+import os
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from src.core.services.tokens import KeyRing
+
+SECRET = "test-secret-key-of-at-least-32-bytes"
+
+
+def write_key(keys_dir, kid: str, algorithm: str = "EdDSA", mtime: int | None = None, public: bool = False):
+
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+
+    if public:
+        data = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    else:
+        data = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+
+    path = keys_dir / f"{kid}.pem"
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def key_ring(keys_dir, **kwargs) -> KeyRing:
+    return KeyRing(secret_key=SECRET, algorithm="HS256", keys_dir=str(keys_dir), **kwargs)
+
+
+def test_key_ring__hmac():
+
+    ring = KeyRing(secret_key=SECRET, algorithm="HS256")
+    token = ring.encode({"sub": "1"})
+
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert ring.decode(token) == {"sub": "1"}
+    assert ring.jwks() == []
+
+
+def test_key_ring__newest_private_key_signs(tmp_path):
+
+    now = int(time.time())
+    write_key(tmp_path, "old", "RS256", mtime=now - 100)
+    write_key(tmp_path, "new", "EdDSA", mtime=now)
+    write_key(tmp_path, "retired", "EdDSA", mtime=now + 100, public=True)
+
+    ring = key_ring(tmp_path)
+    token = ring.encode({"sub": "1"})
+
+    assert jwt.get_unverified_header(token) == {"alg": "EdDSA", "kid": "new", "typ": "JWT"}
+    assert ring.decode(token) == {"sub": "1"}
+
+    pinned = key_ring(tmp_path, active_kid="old")
+    token = pinned.encode({"sub": "1"})
+
+    assert jwt.get_unverified_header(token)["kid"] == "old"
+    assert ring.decode(token) == {"sub": "1"}
+
+
+def test_key_ring__rotation(tmp_path):
+
+    now = int(time.time())
+    write_key(tmp_path, "first", mtime=now - 100)
+
+    ring = key_ring(tmp_path, reload_interval=0)
+    cleared = []
+    ring.listeners.append(lambda: cleared.append(True))
+    old_token = ring.encode({"sub": "1"})
+
+    write_key(tmp_path, "second", mtime=now)
+    new_token = ring.encode({"sub": "1"})
+
+    assert jwt.get_unverified_header(new_token)["kid"] == "second"
+    assert ring.decode(old_token) == {"sub": "1"}
+
+    (tmp_path / "first.pem").unlink()
+
+    with pytest.raises(jwt.InvalidKeyError):
+        ring.decode(old_token)
+
+    assert ring.decode(new_token) == {"sub": "1"}
+    assert cleared == [True]
+
+
+def test_key_ring__unknown_kid_reload_is_rate_limited(tmp_path, monkeypatch):
+
+    write_key(tmp_path, "current")
+    ring = key_ring(tmp_path, reload_interval=60)
+    ring.encode({"sub": "1"})
+
+    loads = []
+    load_key = KeyRing._load_key
+    monkeypatch.setattr(KeyRing, "_load_key", classmethod(lambda cls, path: loads.append(path) or load_key(path)))
+
+    forged = jwt.encode({"sub": "1"}, SECRET, algorithm="HS256", headers={"kid": "unknown"})
+    for _ in range(10):
+        with pytest.raises(jwt.InvalidKeyError):
+            ring.decode(forged)
+
+    assert len(loads) == 1
+
+
+def test_key_ring__load_errors_are_invalid_key(tmp_path):
+
+    write_key(tmp_path, "retired", public=True)
+    ring = key_ring(tmp_path)
+
+    token = jwt.encode({"sub": "1"}, SECRET, algorithm="HS256", headers={"kid": "retired"})
+
+    with pytest.raises(jwt.InvalidKeyError):
+        ring.decode(token)
+
+
+def test_key_ring__jwks(tmp_path):
+
+    write_key(tmp_path, "rsa", "RS256")
+    write_key(tmp_path, "ed", "EdDSA", public=True)
+
+    jwks = {jwk["kid"]: jwk for jwk in key_ring(tmp_path).jwks()}
+
+    assert jwks["rsa"]["alg"] == "RS256" and jwks["rsa"]["kty"] == "RSA" and jwks["rsa"]["use"] == "sig"
+    assert jwks["ed"]["alg"] == "EdDSA" and jwks["ed"]["kty"] == "OKP" and jwks["ed"]["crv"] == "Ed25519"
+    assert all("d" not in jwk for jwk in jwks.values())
+
+    public_key = jwt.PyJWK(jwks["rsa"]).key
+    assert isinstance(public_key, rsa.RSAPublicKey)
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+
+from src.core.services.password import PasswordHasher, ServiceUnavailableError
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_hash_and_verify__success():
+
+    hasher = PasswordHasher(mode="thread", max_workers=1)
+    verify_count = hasher.latency.snapshot().get((("operation", "verify"),), {"count": 0})["count"]
+
+    hashed_password = await hasher.hash("Password1")
+
+    assert hashed_password != "Password1"
+    assert await hasher.verify("Password1", hashed_password) == True
+    assert await hasher.verify("Password2", hashed_password) == False
+    assert hasher.latency.snapshot()[(("operation", "verify"),)]["count"] == verify_count + 2
+
+    hasher.shutdown()
+
+
+async def test_hash__queue_full():
+
+    hasher = PasswordHasher(mode="thread", max_workers=1, max_queue=0)
+
+    results = await asyncio.gather(
+        hasher.hash("Password1"), hasher.hash("Password2"), return_exceptions=True
+    )
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], ServiceUnavailableError)
+
+    hasher.shutdown()
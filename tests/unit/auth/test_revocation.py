@@ -0,0 +1,196 @@
+import json
+import pytest
+from uuid import uuid4
+
+from src.core.cache import BloomFilter
+from src.infrastructure.repositories.revocation import (
+    CachedBannedRefreshTokenRepository,
+    RevocationCache,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_bloom_filter__no_false_negatives():
+
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [str(uuid4()) for _ in range(1000)]
+
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert sum(str(uuid4()) in bloom for _ in range(1000)) < 50
+
+
+async def test_cached_repository__skips_database(fake_banned_refresh_token_repository):
+
+    banned_jti = str(uuid4())
+    await fake_banned_refresh_token_repository.create_banned_refresh_token(banned_jti)
+
+    cache = RevocationCache(capacity=1000, error_rate=0.01, lru_size=10)
+    await cache.load(fake_banned_refresh_token_repository)
+    repository = CachedBannedRefreshTokenRepository(fake_banned_refresh_token_repository, cache=cache)
+
+    assert await repository.is_banned_refresh_token(str(uuid4())) == False
+    assert fake_banned_refresh_token_repository.lookups == 0
+
+    assert await repository.is_banned_refresh_token(banned_jti) == True
+    assert await repository.is_banned_refresh_token(banned_jti) == True
+    assert fake_banned_refresh_token_repository.lookups == 1
+
+
+async def test_cached_repository__new_ban(fake_banned_refresh_token_repository):
+
+    cache = RevocationCache(capacity=1000, error_rate=0.01, lru_size=10)
+    await cache.load(fake_banned_refresh_token_repository)
+    repository = CachedBannedRefreshTokenRepository(fake_banned_refresh_token_repository, cache=cache)
+
+    jti = str(uuid4())
+    await repository.create_banned_refresh_token(jti)
+
+    assert await repository.is_banned_refresh_token(jti) == True
+    assert fake_banned_refresh_token_repository.lookups == 0
+
+
+async def test_cached_repository__ban_fails_without_event(fake_banned_refresh_token_repository, fake_broker_producer):
+    from core.exceptions import ServiceUnavailableError
+
+    cache = RevocationCache(capacity=1000, error_rate=0.01, lru_size=10)
+    repository = CachedBannedRefreshTokenRepository(
+        fake_banned_refresh_token_repository, cache=cache, broker_producer=fake_broker_producer
+    )
+    fake_broker_producer.error = ConnectionError("broker is down")
+    jti = str(uuid4())
+
+    with pytest.raises(ServiceUnavailableError):
+        await repository.create_banned_refresh_token(jti)
+
+    # Бан, о котором другие воркеры не узнают, удален
+    assert fake_banned_refresh_token_repository.jtis == set()
+    assert cache.banned.get(jti) is None
+
+
+async def test_revocation_cache__ban_during_startup(fake_kafka_consumer, fake_banned_refresh_token_repository):
+    import asyncio
+    from src.infrastructure.broker.events import BrokerEventConsumer
+    from src.infrastructure.repositories.revocation import BANNED_REFRESH_TOKENS_TOPIC
+
+    fake_kafka_consumer.create_topic(BANNED_REFRESH_TOKENS_TOPIC)
+    cache = RevocationCache(capacity=1000, error_rate=0.01, lru_size=10)
+    events = BrokerEventConsumer(consumer=fake_kafka_consumer)
+    events.subscribe(BANNED_REFRESH_TOKENS_TOPIC, cache.handle_event)
+
+    await events.open_connection()
+    await cache.load(fake_banned_refresh_token_repository)
+
+    # Другой воркер банит токен, когда таблица уже прочитана, а события еще не читаются
+    jti = str(uuid4())
+    await fake_banned_refresh_token_repository.create_banned_refresh_token(jti)
+    fake_kafka_consumer.publish(BANNED_REFRESH_TOKENS_TOPIC, json.dumps({"jti": jti}).encode())
+
+    assert not cache.might_be_banned(jti)
+
+    task = asyncio.create_task(events.consume_events())
+    try:
+        for _ in range(100):
+            if cache.might_be_banned(jti):
+                break
+            await asyncio.sleep(0.001)
+    finally:
+        task.cancel()
+
+    repository = CachedBannedRefreshTokenRepository(fake_banned_refresh_token_repository, cache=cache)
+
+    assert await repository.is_banned_refresh_token(jti) == True
+
+
+async def test_event_consumer__skips_malformed_event(fake_kafka_consumer, fake_banned_refresh_token_repository):
+    import asyncio
+    from src.infrastructure.broker.events import BrokerEventConsumer
+    from src.infrastructure.repositories.revocation import BANNED_REFRESH_TOKENS_TOPIC
+
+    fake_kafka_consumer.create_topic(BANNED_REFRESH_TOKENS_TOPIC)
+    cache = RevocationCache(capacity=1000, error_rate=0.01, lru_size=10)
+    events = BrokerEventConsumer(consumer=fake_kafka_consumer)
+    events.subscribe(BANNED_REFRESH_TOKENS_TOPIC, cache.handle_event)
+
+    await events.open_connection()
+    await cache.load(fake_banned_refresh_token_repository)
+
+    jti = str(uuid4())
+    fake_kafka_consumer.publish(BANNED_REFRESH_TOKENS_TOPIC, b"not json")
+    fake_kafka_consumer.publish(BANNED_REFRESH_TOKENS_TOPIC, json.dumps({"jti": jti}).encode())
+
+    task = asyncio.create_task(events.consume_events())
+    try:
+        for _ in range(100):
+            if cache.might_be_banned(jti):
+                break
+            await asyncio.sleep(0.001)
+
+        assert cache.might_be_banned(jti)
+        assert not task.done()
+    finally:
+        task.cancel()
+
+
+async def test_events_stopped__disables_caches_and_stops_worker(monkeypatch):
+    import asyncio
+    import signal
+    from src.interface import main
+
+    monkeypatch.setattr(main.revocation_cache, "ready", True)
+    monkeypatch.setattr(main.user_cache, "emails", BloomFilter(capacity=10, error_rate=0.01))
+    monkeypatch.setattr(main.user_cache, "trust_misses", True)
+    signals = []
+    monkeypatch.setattr(main.os, "kill", lambda pid, sig: signals.append(sig))
+
+    async def broken_consumer():
+        raise ValueError("consumer failed")
+
+    task = asyncio.create_task(broken_consumer())
+    await asyncio.wait([task])
+    main.events_stopped(task)
+
+    assert main.revocation_cache.might_be_banned(str(uuid4()))
+    assert main.user_cache.emails is None
+    assert not main.user_cache.is_missing("someone@example.com")
+    assert signals == [signal.SIGTERM]
+
+    # Остановка при завершении приложения ничего не выключает
+    signals.clear()
+    task = asyncio.create_task(asyncio.sleep(10))
+    task.cancel()
+    await asyncio.wait([task])
+    main.events_stopped(task)
+
+    assert signals == []
+
+
+async def test_publish_token_cutoff__fails_when_not_delivered(monkeypatch, fake_kafka_producer):
+    import asyncio
+    from types import SimpleNamespace
+    from src.infrastructure.broker.producer import BrokerProducer
+    from src.interface import main
+
+    broker_producer = BrokerProducer(producer=fake_kafka_producer, topic="emails")
+    monkeypatch.setattr(main, "get_container", lambda: SimpleNamespace(broker_producer=broker_producer))
+
+    await main.publish_token_cutoff("user", 1.0)
+    assert fake_kafka_producer.sent[-1]["topic"] == main.ACCESS_TOKEN_CUTOFFS_TOPIC
+
+    fake_kafka_producer.auto_ack = False
+    publish = asyncio.ensure_future(main.publish_token_cutoff("user", 2.0))
+    while not fake_kafka_producer.deliveries or fake_kafka_producer.deliveries[-1].done():
+        await asyncio.sleep(0)
+    fake_kafka_producer.deliveries[-1].set_exception(RuntimeError("broker is down"))
+
+    with pytest.raises(Exception) as exc_info:
+        await publish
+    assert exc_info.value.args[0] == 'Could not revoke access tokens, try again later'
+
+    fake_kafka_producer.error = RuntimeError("broker is down")
+    with pytest.raises(Exception) as exc_info:
+        await main.publish_token_cutoff("user", 3.0)
+    assert exc_info.value.args[0] == 'Could not revoke access tokens, try again later'
@@ -0,0 +1,31 @@
+import datetime
+import jwt
+import pytest
+
+from src.core.services.tokens import TokenPayloadCache
+from src.settings import get_settings
+
+settings = get_settings()
+
+
+def test_decode__cached():
+
+    cache = TokenPayloadCache(maxsize=10, max_ttl=60)
+    expire = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(minutes=5)
+    token = jwt.encode({"sub": "1", "exp": expire}, settings.secret_key, algorithm=settings.algorithm)
+
+    assert cache.decode(token)["sub"] == "1"
+    assert cache.decode(token)["sub"] == "1"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_decode__expired_not_cached():
+
+    cache = TokenPayloadCache(maxsize=10, max_ttl=60)
+    expire = datetime.datetime.now(tz=datetime.UTC) - datetime.timedelta(minutes=5)
+    token = jwt.encode({"sub": "1", "exp": expire}, settings.secret_key, algorithm=settings.algorithm)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        cache.decode(token)
+
+    assert len(cache.payloads) == 0
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import pytest
+from aiokafka import TopicPartition
+
+from src.infrastructure.broker.consumer import BrokerConsumer, OffsetTracker, TrackerRebalanceListener
+from src.infrastructure.broker.producer import BrokerProducer
+
+pytestmark = pytest.mark.asyncio
+
+TOPIC = "email_notifications"
+
+
+def email(address: str, subject: str = "Verify your email", body: str = "code") -> bytes:
+    return json.dumps({"email": address, "subject": subject, "body": body}).encode()
+
+
+def broker_consumer(fake_kafka_consumer, fake_mailer, fake_kafka_producer, **kwargs) -> BrokerConsumer:
+
+    fake_kafka_consumer.auto_offset_reset = "earliest"
+    fake_kafka_consumer.create_topic(TOPIC)
+
+    options = {"max_retries": 0, "retry_backoff": 0, "commit_interval": 0.01}
+    options.update(kwargs)
+
+    return BrokerConsumer(
+        consumer=fake_kafka_consumer,
+        mailer=fake_mailer,
+        producer=BrokerProducer(producer=fake_kafka_producer, topic=TOPIC),
+        **options,
+    )
+
+
+async def wait_until(condition, timeout: float = 2) -> None:
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition was not met in time"
+        await asyncio.sleep(0.01)
+
+
+async def test_offset_tracker__rewind_and_reset():
+
+    partition = TopicPartition(TOPIC, 0)
+    tracker = OffsetTracker()
+
+    generation = tracker.start(partition, 0)
+    tracker.start(partition, 1)
+    tracker.start(partition, 2)
+
+    assert tracker.rewind(partition, 1, generation) == True
+    # Позиция уже на 1, сообщение 2 будет прочитано снова без seek
+    assert tracker.rewind(partition, 2, generation) == False
+
+    tracker.done(partition, 0, generation)
+    assert tracker.committable() == {partition: 1}
+
+    tracker.reset([partition])
+    tracker.done(partition, 1, generation)
+
+    assert tracker.committable() == {}
+    assert tracker.rewind(partition, 1, generation) == False
+    assert tracker.start(partition, 1) == generation + 1
+
+
+async def test_consume__failed_message_is_read_again(fake_kafka_consumer, fake_mailer, fake_kafka_producer):
+
+    consumer = broker_consumer(fake_kafka_consumer, fake_mailer, fake_kafka_producer)
+    for address in ("first@example.com", "second@example.com", "third@example.com"):
+        fake_kafka_consumer.publish(TOPIC, email(address))
+
+    # Отправка и dead letter не удаются - сообщение нельзя коммитить
+    fake_mailer.failures["second@example.com"] = 1
+    fake_kafka_producer.error = OSError("Kafka is unavailable")
+
+    await consumer.open_connection()
+    task = asyncio.create_task(consumer.run())
+
+    await wait_until(lambda: fake_mailer.failures["second@example.com"] == 0)
+    fake_kafka_producer.error = None
+
+    await wait_until(lambda: fake_kafka_consumer.committed.get(TopicPartition(TOPIC, 0)) == 3)
+    await consumer.shutdown(task, timeout=1)
+
+    sent = [email_message.email for email_message in fake_mailer.sent]
+    assert sent.count("second@example.com") == 1
+    assert {"first@example.com", "third@example.com"} <= set(sent)
+    assert fake_kafka_producer.sent == []
+
+
+async def test_rebalance_listener__commits_and_resets_revoked(fake_kafka_consumer, fake_mailer, fake_kafka_producer):
+
+    consumer = broker_consumer(fake_kafka_consumer, fake_mailer, fake_kafka_producer)
+    await consumer.open_connection()
+
+    listener = fake_kafka_consumer.listener
+    assert isinstance(listener, TrackerRebalanceListener)
+    assert fake_kafka_consumer.subscribed == [TOPIC]
+
+    partition = TopicPartition(TOPIC, 0)
+    for offset in range(3):
+        consumer.tracker.start(partition, offset)
+    consumer.tracker.done(partition, 0)
+
+    await listener.on_partitions_revoked({partition})
+
+    assert fake_kafka_consumer.committed == {partition: 1}
+    assert partition not in consumer.tracker.pending
+    assert consumer.tracker.committable() == {}
+
+
+async def test_process_batch__drops_only_identical_emails(fake_kafka_consumer, fake_mailer, fake_kafka_producer):
+
+    consumer = broker_consumer(fake_kafka_consumer, fake_mailer, fake_kafka_producer, concurrency=2, batch_mode=True)
+    messages = [
+        fake_kafka_consumer.publish(TOPIC, email("user@example.com", body="code 1")),
+        fake_kafka_consumer.publish(TOPIC, email("user@example.com", body="code 1")),
+        fake_kafka_consumer.publish(TOPIC, email("user@example.com", body="code 2")),
+        fake_kafka_consumer.publish(TOPIC, email("other@example.com")),
+    ]
+
+    assert await consumer._process_batch(messages) == []
+    assert sorted((message.email, message.body) for message in fake_mailer.sent) == [
+        ("other@example.com", "code"), ("user@example.com", "code 1"), ("user@example.com", "code 2")
+    ]
+    assert fake_mailer.sessions == 2
+
+    # Уже отправленное письмо в пределах dedup_window не отправляется снова
+    assert await consumer._process_batch([fake_kafka_consumer.publish(TOPIC, email("other@example.com"))]) == []
+    assert len(fake_mailer.sent) == 3
+
+
+async def test_process_batch__retries_and_dead_letters(fake_kafka_consumer, fake_mailer, fake_kafka_producer):
+
+    consumer = broker_consumer(fake_kafka_consumer, fake_mailer, fake_kafka_producer, batch_mode=True)
+    messages = [
+        fake_kafka_consumer.publish(TOPIC, email("retried@example.com")),
+        fake_kafka_consumer.publish(TOPIC, email("lost@example.com")),
+        fake_kafka_consumer.publish(TOPIC, b"not json"),
+    ]
+    fake_mailer.failures = {"retried@example.com": 1, "lost@example.com": 2}
+    consumer.max_retries = 1
+
+    dead_letter_series = (("topic", consumer.dead_letter_topic),)
+    produced_before = consumer.producer.produce_latency.snapshot().get(dead_letter_series, {"count": 0})["count"]
+
+    assert await consumer._process_batch(messages) == []
+    assert [message.email for message in fake_mailer.sent] == ["retried@example.com"]
+    assert [sent["headers"][1] for sent in fake_kafka_producer.sent] == [
+        ("source_offset", b"2"), ("source_offset", b"1")
+    ]
+    assert consumer.producer.produce_latency.snapshot()[dead_letter_series]["count"] == produced_before + 2
+
+
+async def test_consume_batches__seeks_back_to_failed_message(fake_kafka_consumer, fake_mailer, fake_kafka_producer):
+
+    consumer = broker_consumer(fake_kafka_consumer, fake_mailer, fake_kafka_producer, batch_mode=True, max_retries=1)
+    for address in ("first@example.com", "second@example.com", "third@example.com"):
+        fake_kafka_consumer.publish(TOPIC, email(address))
+
+    # Отправка и dead letter не удаются - пачка коммитится до этого сообщения,
+    # следующая пачка начинается с него
+    fake_mailer.failures["second@example.com"] = 2
+    fake_kafka_producer.error = OSError("Kafka is unavailable")
+
+    await consumer.open_connection()
+    task = asyncio.create_task(consumer.run())
+
+    await wait_until(lambda: fake_kafka_consumer.committed.get(TopicPartition(TOPIC, 0)) == 3)
+    await consumer.shutdown(task, timeout=2)
+
+    # Перечитанное третье письмо уже было отправлено и отброшено как повтор
+    assert [message.email for message in fake_mailer.sent] == [
+        "first@example.com", "third@example.com", "second@example.com"
+    ]
+    assert fake_kafka_producer.sent == []
+    assert task.done()
@@ -0,0 +1,28 @@
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_committable__waits_for_lowest_pending():
+    from aiokafka import TopicPartition
+    from src.infrastructure.broker.consumer import OffsetTracker
+
+    partition = TopicPartition("email_notifications", 0)
+    tracker = OffsetTracker()
+
+    for offset in range(3):
+        tracker.start(partition, offset)
+
+    tracker.done(partition, 1)
+    tracker.done(partition, 2)
+
+    assert tracker.committable() == {partition: 0}
+
+    tracker.done(partition, 0)
+    offsets = tracker.committable()
+
+    assert offsets == {partition: 3}
+
+    tracker.mark_committed(offsets)
+
+    assert tracker.committable() == {}
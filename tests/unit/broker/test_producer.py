@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.entities import EmailMessage
+from src.core.services.mail import MailService
+from src.infrastructure.broker.producer import BrokerProducer
+
+pytestmark = pytest.mark.asyncio
+
+TOPIC = "email_notifications"
+
+
+def emails(count: int) -> list[EmailMessage]:
+    return [
+        EmailMessage(email=f"user{index}@example.com", subject="News", body=f"body {index}")
+        for index in range(count)
+    ]
+
+
+async def test_send_many__enqueues_all_before_acks(fake_kafka_producer):
+
+    fake_kafka_producer.auto_ack = False
+    mail_service = MailService(broker_producer=BrokerProducer(producer=fake_kafka_producer, topic=TOPIC))
+
+    sending = asyncio.create_task(mail_service.send_many(emails(3), wait=True))
+    await asyncio.sleep(0)
+
+    # Все сообщения уже в батче продюсера, подтверждения еще не пришли
+    assert [sent["key"] for sent in fake_kafka_producer.sent] == [
+        b"user0@example.com", b"user1@example.com", b"user2@example.com"
+    ]
+    assert json.loads(fake_kafka_producer.sent[2]["value"]) == {
+        "email": "user2@example.com", "subject": "News", "body": "body 2"
+    }
+    assert not sending.done()
+
+    for delivery in fake_kafka_producer.deliveries:
+        delivery.set_result(None)
+
+    assert len(await sending) == 3
+
+
+async def test_send_many__without_wait_returns_pending_futures(fake_kafka_producer):
+
+    fake_kafka_producer.auto_ack = False
+    mail_service = MailService(broker_producer=BrokerProducer(producer=fake_kafka_producer, topic=TOPIC))
+
+    deliveries = await mail_service.send_many(emails(2))
+
+    assert deliveries == fake_kafka_producer.deliveries
+    assert not any(delivery.done() for delivery in deliveries)
+
+
+async def test_send_many__delivery_error_propagates(fake_kafka_producer):
+
+    fake_kafka_producer.auto_ack = False
+    mail_service = MailService(broker_producer=BrokerProducer(producer=fake_kafka_producer, topic=TOPIC))
+
+    sending = asyncio.create_task(mail_service.send_many(emails(2), wait=True))
+    await asyncio.sleep(0)
+
+    fake_kafka_producer.deliveries[0].set_result(None)
+    fake_kafka_producer.deliveries[1].set_exception(OSError("Broker is not available"))
+
+    with pytest.raises(OSError, match="Broker is not available"):
+        await sending
+
+
+async def test_send_many__enqueue_error_propagates(fake_kafka_producer):
+
+    fake_kafka_producer.error = BufferError("Producer buffer is full")
+    mail_service = MailService(broker_producer=BrokerProducer(producer=fake_kafka_producer, topic=TOPIC))
+
+    with pytest.raises(BufferError):
+        await mail_service.send_many(emails(2))
+
+    assert fake_kafka_producer.sent == []
+
+
+async def test_send_verify_code__delivery_error_is_logged(fake_kafka_producer, monkeypatch):
+    from uuid import uuid4
+    from types import SimpleNamespace
+    from src.core.services import mail
+
+    errors = []
+    monkeypatch.setattr(mail, "logger", SimpleNamespace(error=errors.append))
+
+    fake_kafka_producer.auto_ack = False
+    mail_service = MailService(broker_producer=BrokerProducer(producer=fake_kafka_producer, topic=TOPIC))
+
+    await mail_service.send_verify_code(to="user@example.com", code=uuid4())
+    assert fake_kafka_producer.sent[0]["key"] == b"user@example.com"
+    assert errors == []
+
+    fake_kafka_producer.deliveries[0].set_exception(OSError("Broker is not available"))
+    await asyncio.sleep(0)
+
+    assert errors == ["Failed to deliver verification email to the broker: Broker is not available"]
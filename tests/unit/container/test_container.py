@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+class FakeClient:
+
+    def __init__(self):
+        self.closed = False
+
+    async def close_connection(self):
+        self.closed = True
+
+    async def dispose(self):
+        self.closed = True
+
+
+class BrokenClient:
+
+    async def close_connection(self):
+        raise ConnectionError("Kafka is unavailable")
+
+
+@pytest.mark.asyncio
+async def test_container__creates_clients_lazily():
+    from src.infrastructure.container import Container
+    from src.settings import get_settings
+
+    container = Container(get_settings())
+
+    assert not container.created("database")
+    assert not container.created("broker_producer")
+
+    database = container.database
+
+    assert container.created("database")
+    assert container.database is database
+
+    await container.close()
+
+
+@pytest.mark.asyncio
+async def test_container__closes_only_created_clients():
+    from src.infrastructure.container import Container
+    from src.settings import get_settings
+
+    container = Container(get_settings())
+    container.broker_producer = FakeClient()
+
+    await container.close()
+
+    assert container.broker_producer.closed
+    assert not container.created("database")
+    assert not container.created("broker_event_consumer")
+
+
+@pytest.mark.asyncio
+async def test_container__close_continues_after_error():
+    from src.infrastructure.container import Container
+    from src.settings import get_settings
+
+    container = Container(get_settings())
+    container.broker_consumer = BrokenClient()
+    container.broker_producer = FakeClient()
+    container.database = FakeClient()
+
+    await container.close()
+
+    assert container.broker_producer.closed
+    assert container.database.closed
+
+
+def test_app_import__no_client_libraries():
+    # Отдельный интерпретатор: в этом процессе модули уже могли быть загружены
+    code = (
+        "import sys; import interface.main; "
+        "print(','.join(m for m in ('aiokafka', 'aiosmtplib') if m in sys.modules))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.check_output([sys.executable, "-c", code], env=env, text=True)
+
+    assert output.strip() == ""
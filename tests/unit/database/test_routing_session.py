@@ -0,0 +1,110 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import Column, Integer, String, insert, select
+from sqlalchemy.orm import declarative_base
+
+from src.infrastructure.postgres_db import Database
+
+pytestmark = pytest.mark.asyncio
+
+Base = declarative_base()
+
+
+class Item(Base):
+
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+async def seed(engine, name: str) -> None:
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Item).values(name=name))
+
+
+@pytest_asyncio.fixture
+async def replicated_database(tmp_path):
+
+    database = Database(
+        f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+    )
+    # Разные данные в базах показывают, куда ушел запрос
+    await seed(database.engine, "primary")
+    await seed(database.replica_engines[0], "replica")
+
+    yield database
+    await database.dispose()
+
+
+async def names(session) -> list[str]:
+    return list(await session.scalars(select(Item.name).order_by(Item.id)))
+
+
+async def test_routing_session__reads_go_to_replica(replicated_database):
+
+    async with replicated_database.session_factory() as session:
+
+        assert await names(session) == ["replica"]
+        assert await names(session) == ["replica"]
+        assert session.sync_session.pinned == False
+
+
+async def test_routing_session__write_pins_to_primary(replicated_database):
+
+    async with replicated_database.session_factory() as session:
+
+        await session.execute(insert(Item).values(name="written"))
+
+        assert session.sync_session.pinned == True
+        assert await names(session) == ["primary", "written"]
+
+
+async def test_routing_session__flush_pins_to_primary(replicated_database):
+
+    async with replicated_database.session_factory() as session:
+
+        session.add(Item(name="flushed"))
+        await session.flush()
+
+        assert session.sync_session.pinned == True
+        assert await names(session) == ["primary", "flushed"]
+
+
+async def test_routing_session__locking_read_goes_to_primary(replicated_database):
+
+    async with replicated_database.session_factory() as session:
+
+        item = await session.scalar(select(Item).with_for_update())
+
+        assert item.name == "primary"
+        assert session.sync_session.pinned == True
+
+
+async def test_routing_session__without_replicas(tmp_path):
+
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    await seed(database.engine, "primary")
+
+    try:
+        async with database.session_factory() as session:
+
+            assert await names(session) == ["primary"]
+            await session.execute(insert(Item).values(name="written"))
+            assert await names(session) == ["primary", "written"]
+    finally:
+        await database.dispose()
+
+
+async def test_routing_session__primary_read_does_not_pin(replicated_database):
+
+    async with replicated_database.session_factory() as session:
+
+        result = await session.scalars(select(Item.name), bind_arguments={"primary": True})
+
+        assert list(result) == ["primary"]
+        assert session.sync_session.pinned == False
+        assert await names(session) == ["replica"]
@@ -0,0 +1,69 @@
+import json
+import logging
+
+
+def make_record(message, level=logging.ERROR, lineno=10):
+    return logging.LogRecord("root", level, "repositories/auth.py", lineno, message, None, None)
+
+
+def test_error_rate_limit__suppresses_repeated_errors():
+    from src.logger import ErrorRateLimitFilter
+
+    rate_limit = ErrorRateLimitFilter(burst=2, interval=60)
+
+    passed = [rate_limit.filter(make_record(f"Error getting user: {index}")) for index in range(5)]
+
+    assert passed == [True, True, False, False, False]
+    assert rate_limit.filter(make_record("Error from another place", lineno=20)) == True
+    assert rate_limit.filter(make_record("Not an error", level=logging.INFO)) == True
+
+    # Новое окно сообщает сколько записей было отброшено
+    rate_limit.interval = 0
+    record = make_record("Error getting user: 5")
+
+    assert rate_limit.filter(record) == True
+    assert record.getMessage() == "Error getting user: 5 (suppressed 3 similar messages)"
+
+
+def test_json_formatter__correlation_id():
+    from src.logger import CorrelationIdFilter, JSONFormatter, correlation_id
+
+    record = make_record("Error getting user: boom")
+    token = correlation_id.set("request-1")
+    try:
+        CorrelationIdFilter().filter(record)
+    finally:
+        correlation_id.reset(token)
+
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["level"] == "ERROR"
+    assert entry["message"] == "Error getting user: boom"
+    assert entry["correlation_id"] == "request-1"
+
+
+def test_json_formatter__exception_through_queue():
+    import queue
+    from src.logger import JSONFormatter, StructuredQueueHandler
+
+    records = queue.SimpleQueue()
+    test_logger = logging.getLogger("tests.logger.exception")
+    test_logger.propagate = False
+    test_logger.addHandler(StructuredQueueHandler(records))
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        test_logger.exception("Error getting user: %s", "user-1")
+
+    record = records.get_nowait()
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["message"] == "Error getting user: user-1"
+    assert entry["exception"].startswith("Traceback")
+    assert "ValueError: boom" in entry["exception"]
+
+    # Текстовый формат по-прежнему выводит трассировку после сообщения
+    text = logging.Formatter("%(message)s").format(record)
+
+    assert text.startswith("Error getting user: user-1\nTraceback")
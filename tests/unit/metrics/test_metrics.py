@@ -0,0 +1,99 @@
+import pytest
+
+
+def test_render__prometheus_format():
+    from src.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    registry.gauge("pool_size", "Pool size", lambda: 5)
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    histogram.observe(0.05, route="/auth/login")
+    histogram.observe(0.5, route="/auth/login")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE pool_size gauge" in lines
+    assert "pool_size 5" in lines
+    assert 'latency_seconds_bucket{route="/auth/login",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/auth/login",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/auth/login",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{route="/auth/login"} 2' in lines
+
+
+@pytest.mark.asyncio
+async def test_request_stats__counted_through_middleware(tmp_path):
+    import httpx
+    from fastapi import FastAPI
+    from sqlalchemy import text
+    from src.infrastructure.postgres_db import Database, get_metrics, request_stats
+    from src.interface.instrumentation import metrics_middleware
+
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+
+    app = FastAPI()
+    app.middleware("http")(metrics_middleware)
+
+    @app.get("/stats/{item_id}")
+    async def stats_route(item_id: int):
+        async with database.session_factory() as session:
+            await session.execute(text("SELECT :id"), {"id": item_id})
+            await session.execute(text("SELECT 2"))
+
+        # События курсора выполняются в greenlet SQLAlchemy, но видят контекст запроса
+        return {"queries": request_stats.get().queries}
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/stats/1")
+    finally:
+        await database.dispose()
+
+    assert response.json() == {"queries": 2}
+    assert request_stats.get() is None
+
+    lines = get_metrics().render().splitlines()
+    assert 'http_request_db_queries_sum{route="/stats/{item_id}"} 2.0' in lines
+    assert 'http_request_db_queries_count{route="/stats/{item_id}"} 1' in lines
+
+
+@pytest.mark.asyncio
+async def test_pool_status__counts_only_waiting_callers(tmp_path):
+    import asyncio
+    from sqlalchemy import event
+    from src.infrastructure.postgres_db import Database, get_metrics
+
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=1)
+
+    # Соединение создается внутри _do_get: пул не исчерпан, никто не ждет
+    waiters_on_connect = []
+    event.listen(database.pool, "connect", lambda *_: waiters_on_connect.append(database.pool.waiters))
+
+    try:
+        first = await database.engine.connect()
+        second = await database.engine.connect()
+
+        assert waiters_on_connect == [0, 0]
+        assert database.pool_status() == {
+            "size": 1, "checked_in": 0, "checked_out": 2, "overflow": 1, "waiters": 0
+        }
+
+        async def checkout():
+            return await database.engine.connect()
+
+        third = asyncio.create_task(checkout())
+        while database.pool.waiters == 0:
+            await asyncio.sleep(0.01)
+
+        lines = get_metrics().render().splitlines()
+        assert "db_pool_waiters 1" in lines
+        assert "db_pool_checked_out 2" in lines
+
+        await first.close()
+        await (await third).close()
+        await second.close()
+
+        assert database.pool_status()["waiters"] == 0
+        assert database.pool_status()["checked_out"] == 0
+    finally:
+        await database.dispose()
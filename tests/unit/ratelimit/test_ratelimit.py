@@ -0,0 +1,92 @@
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "sliding_window"])
+async def test_backend__rejects_over_limit(algorithm):
+    from src.infrastructure.ratelimit import BACKENDS
+
+    backend = BACKENDS[algorithm](maxsize=100)
+
+    assert await backend.acquire("login:ip:1.2.3.4", limit=2, period=60) == 0
+    assert await backend.acquire("login:ip:1.2.3.4", limit=2, period=60) == 0
+
+    retry_after = await backend.acquire("login:ip:1.2.3.4", limit=2, period=60)
+
+    assert 0 < retry_after <= 60
+    assert await backend.acquire("login:ip:5.6.7.8", limit=2, period=60) == 0
+
+
+async def test_rate_limiter__429_per_email():
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from src.interface.dependencies import RateLimiter
+    from src.infrastructure.ratelimit import TokenBucketBackend
+
+    limiter = RateLimiter("login", per_ip=100, per_email=1, backend=TokenBucketBackend(maxsize=100))
+
+    def make_request(client_host):
+        body = b'{"email": "User@Example.com", "password": "x"}'
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return Request({"type": "http", "client": (client_host, 1), "headers": []}, receive)
+
+    await limiter(make_request("1.1.1.1"))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter(make_request("2.2.2.2"))
+
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) > 0
+
+
+@pytest.mark.parametrize(
+    "forwarded, trusted_proxies, expected",
+    [
+        ("1.1.1.1, 203.0.113.7", 1, "203.0.113.7"),
+        ("spoofed-1, 203.0.113.7, 10.0.0.2", 2, "203.0.113.7"),
+        ("203.0.113.7", 2, "203.0.113.7"),
+    ],
+)
+async def test_rate_limiter__client_address_from_trusted_proxies(monkeypatch, forwarded, trusted_proxies, expected):
+    from starlette.requests import Request
+
+    from src.interface import dependencies
+
+    monkeypatch.setattr(dependencies.settings, "rate_limit_trust_forwarded", True)
+    monkeypatch.setattr(dependencies.settings, "rate_limit_trusted_proxies", trusted_proxies)
+
+    request = Request(
+        {"type": "http", "client": ("10.0.0.1", 1), "headers": [(b"x-forwarded-for", forwarded.encode())]}
+    )
+
+    assert dependencies.RateLimiter.client_address(request) == expected
+
+
+async def test_rate_limiter__spoofed_forwarded_for_does_not_bypass_limit(monkeypatch):
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from src.interface import dependencies
+    from src.infrastructure.ratelimit import TokenBucketBackend
+
+    monkeypatch.setattr(dependencies.settings, "rate_limit_trust_forwarded", True)
+    monkeypatch.setattr(dependencies.settings, "rate_limit_trusted_proxies", 1)
+
+    limiter = dependencies.RateLimiter("register", per_ip=1, backend=TokenBucketBackend(maxsize=100))
+
+    def make_request(spoofed):
+        # Прокси дописывает реальный адрес клиента после присланного им значения
+        forwarded = f"{spoofed}, 203.0.113.7".encode()
+        return Request({"type": "http", "client": ("10.0.0.1", 1), "headers": [(b"x-forwarded-for", forwarded)]})
+
+    await limiter(make_request("1.1.1.1"))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter(make_request("2.2.2.2"))
+
+    assert exc_info.value.status_code == 429
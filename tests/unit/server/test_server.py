@@ -0,0 +1,155 @@
+import socket
+
+
+def test_resolve__auto_falls_back_without_optional_packages(monkeypatch):
+    from src import server
+
+    monkeypatch.setattr(server.importlib.util, "find_spec", lambda name: None)
+
+    assert server.resolve("auto", "uvloop") == "asyncio"
+    assert server.resolve("auto", "httptools") == "h11"
+    assert server.resolve("uvloop", "uvloop") == "uvloop"
+
+
+def test_resolve__auto_prefers_installed_packages(monkeypatch):
+    from src import server
+
+    monkeypatch.setattr(server.importlib.util, "find_spec", lambda name: object())
+
+    assert server.resolve("auto", "uvloop") == "uvloop"
+    assert server.resolve("auto", "httptools") == "httptools"
+
+
+def test_bind_socket__listens_before_workers_start():
+    from src.server import bind_socket
+
+    sock = bind_socket("127.0.0.1", 0, backlog=16)
+    try:
+        assert sock.get_inheritable()
+
+        # Ядро принимает соединение в очередь, даже пока ни один воркер не вызвал accept
+        client = socket.create_connection(sock.getsockname(), timeout=1)
+        client.close()
+    finally:
+        sock.close()
+
+
+def stub_worker(mode: str, sock, ready, loop: str, http: str) -> None:
+    """
+    Worker target for Supervisor tests, `mode` comes in place of the app.
+    """
+    import signal
+    import time
+
+    if mode == "fail":
+        raise SystemExit(1)
+    if mode == "ignore-term":
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    ready.set()
+    while True:
+        time.sleep(0.1)
+
+
+def supervisor(mode: str = "ready", **kwargs):
+    from src.server import Supervisor, bind_socket
+
+    options = {"workers": 2, "graceful_timeout": 1, "startup_timeout": 2, "restart_backoff": 0, "max_failures": 3}
+    options.update(kwargs)
+
+    return Supervisor(
+        mode, bind_socket("127.0.0.1", 0, backlog=16), loop="asyncio", http="h11", target=stub_worker, **options
+    )
+
+
+def start(supervisor) -> None:
+
+    for _ in range(supervisor.workers):
+        process, ready = supervisor.spawn()
+        assert ready
+        supervisor.processes.append(process)
+
+
+def shutdown(supervisor) -> None:
+
+    supervisor.stop(*supervisor.processes)
+    supervisor.sock.close()
+
+
+def test_supervisor__replaces_exited_worker():
+
+    server = supervisor()
+    start(server)
+    try:
+        crashed = server.processes[0]
+        crashed.kill()
+        crashed.join()
+
+        assert server.replace_exited() == True
+        assert len(server.processes) == 2
+        assert crashed not in server.processes
+        assert all(process.is_alive() for process in server.processes)
+        assert server.failures == 1
+    finally:
+        shutdown(server)
+
+
+def test_supervisor__backs_off_and_gives_up():
+
+    server = supervisor(restart_backoff=60)
+    start(server)
+    try:
+        server.processes[0].kill()
+        server.processes[0].join()
+
+        # Первый перезапуск ждет restart_backoff
+        assert server.replace_exited() == True
+        assert len(server.processes) == 1
+
+        server.restart_backoff = 0
+        server.app = "fail"
+
+        assert server.replace_exited() == True
+        assert server.replace_exited() == False
+        assert server.failures == 3
+        assert len(server.processes) == 1
+    finally:
+        shutdown(server)
+
+
+def test_supervisor__rolling_restart_aborted_when_new_worker_fails():
+
+    server = supervisor()
+    start(server)
+    old = list(server.processes)
+    try:
+        server.app = "fail"
+        server.rolling_restart()
+
+        assert server.processes == old
+        assert all(process.is_alive() for process in old)
+
+        server.app = "ready"
+        server.rolling_restart()
+
+        assert len(server.processes) == 2
+        assert not set(server.processes) & set(old)
+        assert not any(process.is_alive() for process in old)
+    finally:
+        shutdown(server)
+
+
+def test_supervisor__stop_kills_after_graceful_timeout():
+    import time
+
+    server = supervisor("ignore-term", workers=2, graceful_timeout=0.5)
+    start(server)
+
+    started = time.monotonic()
+    shutdown(server)
+    elapsed = time.monotonic() - started
+
+    assert not any(process.is_alive() for process in server.processes)
+    assert all(process.exitcode == -9 for process in server.processes)
+    # Общий срок на всех воркеров, а не graceful_timeout на каждого
+    assert 0.5 <= elapsed < 1
@@ -0,0 +1,112 @@
+import aiosmtplib
+import pytest
+
+from src.infrastructure.SMTPclient import SMTPConnectionPool
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeSMTP:
+    """
+    aiosmtplib.SMTP without a server, `noop_error` / `send_error` are raised once when set.
+    """
+
+    instances: list["FakeSMTP"] = []
+
+    def __init__(self, **kwargs):
+        self.is_connected = False
+        self.sent = []
+        self.noop_error: Exception | None = None
+        self.send_error: Exception | None = None
+        self.quit_called = False
+        FakeSMTP.instances.append(self)
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def login(self, username, password):
+        pass
+
+    async def noop(self):
+        if self.noop_error:
+            error, self.noop_error = self.noop_error, None
+            raise error
+
+    async def send_message(self, msg):
+        if self.send_error:
+            error, self.send_error = self.send_error, None
+            raise error
+        self.sent.append(msg)
+
+    async def quit(self):
+        self.quit_called = True
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.fixture
+def smtp_connections(monkeypatch):
+
+    FakeSMTP.instances = []
+    monkeypatch.setattr(aiosmtplib, "SMTP", FakeSMTP)
+    return FakeSMTP.instances
+
+
+async def send(pool: SMTPConnectionPool, message: str = "message") -> None:
+
+    async with pool.acquire() as connection:
+        await connection.send_message(message)
+
+
+async def test_pool__reuses_connection(smtp_connections):
+
+    pool = SMTPConnectionPool(size=2, max_messages=100, keepalive=60)
+
+    for _ in range(3):
+        await send(pool)
+
+    assert len(smtp_connections) == 1
+    assert smtp_connections[0].sent == ["message"] * 3
+
+
+async def test_pool__rotates_after_max_messages(smtp_connections):
+
+    pool = SMTPConnectionPool(size=1, max_messages=2, keepalive=60)
+
+    for _ in range(3):
+        await send(pool)
+
+    assert [len(smtp.sent) for smtp in smtp_connections] == [2, 1]
+    assert smtp_connections[0].quit_called == True
+
+
+async def test_pool__replaces_broken_idle_connection(smtp_connections):
+
+    # keepalive=0: перед повторным использованием соединение проверяется NOOP
+    pool = SMTPConnectionPool(size=1, max_messages=100, keepalive=0)
+    await send(pool)
+
+    smtp_connections[0].noop_error = ConnectionResetError("Connection reset by peer")
+    await send(pool)
+
+    assert len(smtp_connections) == 2
+    assert smtp_connections[0].is_connected == False
+    assert smtp_connections[1].sent == ["message"]
+
+
+async def test_pool__drops_connection_broken_while_sending(smtp_connections):
+
+    pool = SMTPConnectionPool(size=1, max_messages=100, keepalive=60)
+    await send(pool)
+
+    smtp_connections[0].send_error = aiosmtplib.SMTPServerDisconnected("Server disconnected")
+    with pytest.raises(aiosmtplib.SMTPServerDisconnected):
+        await send(pool)
+
+    await send(pool)
+
+    assert len(smtp_connections) == 2
+    assert smtp_connections[1].sent == ["message"]
+    assert pool._idle[0].smtp is smtp_connections[1]